@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import pandas as pd
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from excel_loader import load_table
+from backup_store import BACKUP_DIR, backup_workbook
 
 # 加载环境变量
 load_dotenv()
@@ -17,7 +18,7 @@ def add_row_numbers_and_notes():
     
     try:
         # 读取Excel文件
-        df = pd.read_excel(excel_file)
+        df = load_table(excel_file)
         print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
         
         # 显示当前列名
@@ -32,16 +33,16 @@ def add_row_numbers_and_notes():
         
         # 填充备注1列的内容（如果为空）
         if '备注1' in df.columns:
-            for idx, row in df.iterrows():
-                if pd.isna(row['备注1']) or str(row['备注1']).strip() == '':
-                    df.at[idx, '备注1'] = '无'
+            # 备注列读取为category类型，先转回普通值再填充
+            notes = df['备注1'].astype(object)
+            df['备注1'] = notes.where(notes.notna() & (notes.astype(str).str.strip() != ''), '无')
             print(f"✅ 已填充备注1列内容")
         
         # 填充备注2列的内容（如果为空）
         if '备注2' in df.columns:
-            for idx, row in df.iterrows():
-                if pd.isna(row['备注2']) or str(row['备注2']).strip() == '':
-                    df.at[idx, '备注2'] = '无'
+            # 备注列读取为category类型，先转回普通值再填充
+            notes = df['备注2'].astype(object)
+            df['备注2'] = notes.where(notes.notna() & (notes.astype(str).str.strip() != ''), '无')
             print(f"✅ 已填充备注2列内容")
         
         # 显示更新后的数据
@@ -49,10 +50,8 @@ def add_row_numbers_and_notes():
         print(df.head().to_string())
         
         # 备份原文件
-        backup_file = f"yxc_backup_before_add_notes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df_backup = pd.read_excel(excel_file)
-        df_backup.to_excel(backup_file, index=False)
-        print(f"💾 已创建备份文件: {backup_file}")
+        backup_workbook(excel_file)
+        print(f"💾 已备份原文件到: {BACKUP_DIR}")
         
         # 保存更新后的文件
         df.to_excel(excel_file, index=False)
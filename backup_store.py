@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+备份存储 - 按内容哈希去重的工作簿快照 + 行级增量，按日/周/月保留
+
+目录结构（BACKUP_DIR，默认 backups/）：
+  objects/<sha256>.xlsx   完整快照，原样保存工作簿
+  deltas/<sha256>.json    相对某个完整快照的行级增量（按行号对齐）
+  manifest.json           所有版本：时间、内容哈希、类型和对应的完整快照
+
+每个增量都直接相对它的完整快照（不串联），恢复任意版本最多读一个快照再套一个增量；
+删除过期版本时不会打断其他版本的恢复链。
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from excel_cache import file_digest
+from excel_loader import load_table
+from excel_schema import resolve_columns
+
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+
+# 距上个完整快照的版本数达到这个值、或改动的单元格超过一半时，保存新的完整快照
+FULL_EVERY = int(os.getenv('BACKUP_FULL_EVERY', '7'))
+
+# 保留策略：最近N天每天、最近N周每周、最近N个月每月各保留最后一个版本
+KEEP_DAILY = int(os.getenv('BACKUP_KEEP_DAILY', '7'))
+KEEP_WEEKLY = int(os.getenv('BACKUP_KEEP_WEEKLY', '4'))
+KEEP_MONTHLY = int(os.getenv('BACKUP_KEEP_MONTHLY', '12'))
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _paths():
+    """objects目录、deltas目录和manifest文件路径"""
+    return (os.path.join(BACKUP_DIR, 'objects'), os.path.join(BACKUP_DIR, 'deltas'),
+            os.path.join(BACKUP_DIR, 'manifest.json'))
+
+
+def _load_manifest():
+    """读取版本列表（按时间升序）"""
+    try:
+        with open(_paths()[2], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write_json(path, data):
+    """写JSON文件（临时文件 + 原子替换）"""
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_file, path)
+
+
+def _json_value(value):
+    """转换为可写入JSON的值"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _row_keys(df):
+    """行的对齐键：行号唯一时用行号，否则用行位置"""
+    row_col = resolve_columns(df.columns).get('row_number')
+    if row_col is not None:
+        keys = df[row_col].map(_json_value)
+        if keys.notna().all() and keys.is_unique:
+            return [str(key) for key in keys]
+    return [f"#{i}" for i in range(len(df))]
+
+
+def _diff(base, current):
+    """当前表格相对完整快照的行级增量，表头不同时返回None"""
+    if list(base.columns) != list(current.columns):
+        return None
+
+    base = base.set_axis(_row_keys(base), axis=0)
+    current = current.set_axis(_row_keys(current), axis=0)
+    common = current.index.intersection(base.index)
+
+    changed = {}
+    cells = 0
+    for column in current.columns:
+        old = base.loc[common, column].to_numpy(dtype=object)
+        new = current.loc[common, column].to_numpy(dtype=object)
+        old_missing, new_missing = pd.isna(old), pd.isna(new)
+        different = ((old != new) & ~(old_missing & new_missing)) | (old_missing != new_missing)
+        for pos in np.flatnonzero(different):
+            changed.setdefault(common[pos], {})[column] = _json_value(new[pos])
+            cells += 1
+
+    added = {key: {col: _json_value(value) for col, value in current.loc[key].items()}
+             for key in current.index.difference(base.index)}
+    return {
+        'header': [str(col) for col in current.columns],
+        'order': list(current.index),
+        'changed': changed,
+        'added': added,
+        'cells': cells + len(added) * len(current.columns),
+    }
+
+
+def _apply(base, delta):
+    """把增量套到完整快照上，得到对应版本的表格"""
+    base = base.set_axis(_row_keys(base), axis=0).astype(object)
+    rows = {key: base.loc[key].to_dict() for key in base.index}
+    for key, values in delta['added'].items():
+        rows[key] = values
+    for key, values in delta['changed'].items():
+        rows[key].update(values)
+    df = pd.DataFrame([rows[key] for key in delta['order']], columns=delta['header'])
+    return df.infer_objects().reset_index(drop=True)
+
+
+def backup_workbook(excel_file, now=None):
+    """
+    备份工作簿，返回本次版本的内容哈希
+
+    内容与最新版本相同时不新增版本；内容曾经出现过时只记录版本，不重复保存数据。
+    now 为版本时间，流水线传入北京时间的运行时间，日/周/月分段和按日期恢复都以它为准。
+    """
+    now = now or datetime.now()
+    objects_dir, deltas_dir, manifest_file = _paths()
+    os.makedirs(objects_dir, exist_ok=True)
+    os.makedirs(deltas_dir, exist_ok=True)
+
+    digest = file_digest(excel_file)
+    manifest = _load_manifest()
+    if manifest and manifest[-1]['sha'] == digest:
+        print(f"📦 {excel_file} 与最新备份相同，跳过备份")
+        return digest
+
+    known = next((entry for entry in reversed(manifest) if entry['sha'] == digest), None)
+    if known is not None:
+        entry = dict(known, time=now.strftime(TIME_FORMAT))
+        print(f"📦 {excel_file} 与 {known['time']} 的备份相同，只记录版本")
+    else:
+        entry = _store_version(excel_file, digest, manifest, now)
+
+    manifest.append(entry)
+    manifest = prune(manifest)
+    _write_json(manifest_file, manifest)
+    return digest
+
+
+def _store_version(excel_file, digest, manifest, now):
+    """保存新内容：能用增量就存增量，否则存完整快照"""
+    objects_dir, deltas_dir, _ = _paths()
+    entry = {'time': now.strftime(TIME_FORMAT), 'sha': digest, 'kind': 'full', 'base': digest}
+
+    # 基于最新版本所用的完整快照（快照本身的版本可能已按保留策略删除，文件仍被引用着）
+    base = manifest[-1]['base'] if manifest else None
+    if base is not None:
+        since_base = sum(1 for e in manifest if e['base'] == base)
+        if since_base < FULL_EVERY:
+            try:
+                current = load_table(excel_file)
+                delta = _diff(load_table(os.path.join(objects_dir, f"{base}.xlsx")), current)
+            except Exception as e:
+                print(f"⚠️ 计算增量失败，保存完整快照: {e}")
+                delta = None
+            if delta is not None and delta['cells'] <= current.size / 2:
+                _write_json(os.path.join(deltas_dir, f"{digest}.json"), dict(delta, base=base))
+                print(f"📦 已备份增量: {delta['cells']} 个单元格（基于快照 {base[:12]}）")
+                return dict(entry, kind='delta', base=base)
+
+    shutil.copy2(excel_file, os.path.join(objects_dir, f"{digest}.xlsx"))
+    print(f"📦 已备份完整快照: {digest[:12]}")
+    return entry
+
+
+def prune(manifest):
+    """按保留策略删除过期版本和不再被引用的文件，返回保留的版本列表"""
+    times = [datetime.strptime(entry['time'], TIME_FORMAT) for entry in manifest]
+    keep = set()
+
+    # 每个时间段只保留最后一个版本；最新版本和最新一天的第一个版本（当天重新运行前的状态）始终保留
+    for periods, bucket in ((KEEP_DAILY, lambda t: t.date()),
+                            (KEEP_WEEKLY, lambda t: tuple(t.isocalendar())[:2]),
+                            (KEEP_MONTHLY, lambda t: (t.year, t.month))):
+        recent = []
+        for i in range(len(manifest) - 1, -1, -1):
+            key = bucket(times[i])
+            if not recent or recent[-1][0] != key:
+                if len(recent) >= periods:
+                    break
+                recent.append((key, i))
+        keep.update(i for _, i in recent)
+    if manifest:
+        keep.add(len(manifest) - 1)
+        latest_day = times[-1].date()
+        keep.add(next(i for i, t in enumerate(times) if t.date() == latest_day))
+
+    kept = [entry for i, entry in enumerate(manifest) if i in keep]
+    removed = len(manifest) - len(kept)
+
+    # 删除不再被任何版本引用的快照和增量
+    objects_dir, deltas_dir, _ = _paths()
+    used_objects = {entry['base'] for entry in kept}
+    used_deltas = {entry['sha'] for entry in kept if entry['kind'] == 'delta'}
+    for directory, used, suffix in ((objects_dir, used_objects, '.xlsx'), (deltas_dir, used_deltas, '.json')):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if name.endswith(suffix) and name[:-len(suffix)] not in used:
+                os.remove(os.path.join(directory, name))
+    if removed:
+        print(f"🧹 按保留策略删除了 {removed} 个旧版本")
+    return kept
+
+
+def find_version(point):
+    """按内容哈希前缀或时间（取该时间及之前的最新版本）查找版本"""
+    manifest = _load_manifest()
+    for entry in reversed(manifest):
+        if entry['sha'].startswith(point):
+            return entry
+    try:
+        when = datetime.strptime(point, TIME_FORMAT)
+    except ValueError:
+        when = datetime.strptime(point, '%Y-%m-%d') + timedelta(days=1) - timedelta(seconds=1)
+    for entry in reversed(manifest):
+        if datetime.strptime(entry['time'], TIME_FORMAT) <= when:
+            return entry
+    return None
+
+
+def restore(point, out_file):
+    """
+    把某个版本恢复到out_file，返回该版本的信息
+
+    完整快照原样复制（保留格式）；增量版本由快照 + 增量重建数据。
+    """
+    entry = find_version(point)
+    if entry is None:
+        raise ValueError(f"没有找到 {point} 对应的备份")
+
+    objects_dir, deltas_dir, _ = _paths()
+    base_file = os.path.join(objects_dir, f"{entry['base']}.xlsx")
+    if entry['kind'] == 'full':
+        shutil.copy2(base_file, out_file)
+    else:
+        with open(os.path.join(deltas_dir, f"{entry['sha']}.json"), 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        _apply(load_table(base_file), delta).to_excel(out_file, index=False)
+    print(f"♻️ 已恢复 {entry['time']} 的备份到 {out_file}")
+    return entry
+
+
+def main():
+    """命令行：python backup_store.py list | backup [文件] | restore <时间或哈希> [输出文件] | prune"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'backup':
+        backup_workbook(sys.argv[2] if len(sys.argv) > 2 else 'yxc.xlsx')
+    elif command == 'restore' and len(sys.argv) > 2:
+        restore(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else 'yxc_restored.xlsx')
+    elif command == 'prune':
+        manifest = _load_manifest()
+        if manifest:
+            _write_json(_paths()[2], prune(manifest))
+    elif command == 'list':
+        for entry in _load_manifest():
+            print(f"{entry['time']}  {entry['sha'][:12]}  {entry['kind']}")
+    else:
+        print(main.__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+到期计算引擎性能测试 - 每日减1 + 到期检测 + 重置，从1千行到100万行
+"""
+
+import contextlib
+import io
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from expiry_engine import decrement_remaining, find_expired, reset_expired
+
+COLUMNS = {'remaining': '剩余', 'total': '总天', 'start_date': '开始时间'}
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def make_df(rows, seed=0):
+    """构造测试表格（约1/15的项目当天到期）"""
+    rng = np.random.default_rng(seed)
+    total = rng.choice([7, 10, 14, 30], size=rows)
+    return pd.DataFrame({
+        '行号': np.arange(1, rows + 1),
+        ' 店铺名称': np.array([f'店铺{i}' for i in range(rows)], dtype=object),
+        '地址': rng.choice(['西苇路', '民泰路', '匡衡路'], size=rows),
+        '总天': total,
+        '剩余': rng.integers(1, 16, size=rows),
+        '开始时间': rng.choice([20260810, 20260816, 20260822], size=rows),
+    })
+
+
+def run_once(df):
+    """执行一次完整的每日流程，返回耗时（秒）"""
+    start = time.perf_counter()
+    decrement_remaining(df, COLUMNS)
+    find_expired(df, COLUMNS)
+    reset_expired(df, COLUMNS, datetime.now())
+    return time.perf_counter() - start
+
+
+def main():
+    """主函数"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print("📊 到期计算引擎性能测试")
+    print(f"{'行数':>10} {'总耗时(ms)':>12} {'每行(ns)':>10}")
+
+    for rows in sizes:
+        df = make_df(rows)
+        # 重置项目的逐条日志不计入结果
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = min(run_once(df.copy()) for _ in range(3))
+        print(f"{rows:>10} {elapsed * 1000:>12.1f} {elapsed / rows * 1e9:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,15 @@
 import pandas as pd
 import schedule
 import time
-import smtplib
-import requests
+from http_transport import post_json
 import os
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from excel_loader import CHECK_FIELDS, load_table
+from smtp_transport import close_transports, send_mail
+from message_chunker import send_in_parts
 
 # 加载环境变量
 load_dotenv()
@@ -45,8 +47,8 @@ class ExpiryChecker:
     def read_excel_file(self):
         """读取Excel文件"""
         try:
-            # 尝试读取Excel文件
-            df = pd.read_excel(self.excel_file)
+            # 尝试读取Excel文件（到期检查只读取需要的列）
+            df = load_table(self.excel_file, CHECK_FIELDS)
             print(f"成功读取Excel文件: {self.excel_file}")
             print(f"表格形状: {df.shape}")
             print(f"列名: {list(df.columns)}")
@@ -125,11 +127,7 @@ class ExpiryChecker:
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             # 发送邮件
-            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-            server.starttls()
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("邮件通知发送成功")
             return True
@@ -148,21 +146,24 @@ class ExpiryChecker:
             config = self.notification_config['wechat']
             content = self.create_notification_content(expired_items, "微信")
             
-            # 发送到企业微信或钉钉webhook
-            payload = {
-                "msgtype": "text",
-                "text": {
-                    "content": content
+            # 发送到企业微信或钉钉webhook（到期项目多时按字节上限拆成多条）
+            def send_part(part):
+                payload = {
+                    "msgtype": "text",
+                    "text": {
+                        "content": part
+                    }
                 }
-            }
+                response = post_json(config['webhook_url'], payload)
+                if response.status_code != 200:
+                    print(f"微信通知发送失败: {response.status_code}")
+                    return False
+                return True
             
-            response = requests.post(config['webhook_url'], json=payload)
-            if response.status_code == 200:
+            if send_in_parts(send_part, content):
                 print("微信通知发送成功")
                 return True
-            else:
-                print(f"微信通知发送失败: {response.status_code}")
-                return False
+            return False
                 
         except Exception as e:
             print(f"发送微信通知失败: {e}")
@@ -185,7 +186,7 @@ class ExpiryChecker:
                 "message": content
             }
             
-            response = requests.post(config['api_url'], json=payload)
+            response = post_json(config['api_url'], payload)
             if response.status_code == 200:
                 print("短信通知发送成功")
                 return True
@@ -257,6 +258,8 @@ class ExpiryChecker:
         # 发送通知
         self.send_notifications(expired_items)
         
+        # 关闭本次运行共用的SMTP连接并输出耗时
+        close_transports()
         print("=== 检查任务完成 ===\n")
 
 def main():
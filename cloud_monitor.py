@@ -1,24 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import pandas as pd
-import requests
-import smtplib
+from http_transport import post_json
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import os
 import json
 from dotenv import load_dotenv
+from backup_store import BACKUP_DIR, backup_workbook
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from expiry_checker import ExpiryCheckerBase
+from expiry_engine import find_expired
+from run_watermark import get_beijing_time, write_last_run
+from notify_dispatcher import dispatch, enabled_senders
+from smtp_transport import close_transports, send_mail
 
 # 加载环境变量
 load_dotenv()
 
-class CloudExpiryChecker:
+class CloudExpiryChecker(ExpiryCheckerBase):
     def __init__(self):
         """初始化云平台监控器"""
+        super().__init__()
         self.excel_file = os.getenv('EXCEL_FILE', 'yxc.xlsx')
-        self.backup_dir = 'backups'
+        self.backup_dir = BACKUP_DIR
         
         # 确保备份目录存在
         if not os.path.exists(self.backup_dir):
@@ -47,16 +54,11 @@ class CloudExpiryChecker:
         }
     
     def backup_excel(self):
-        """备份Excel文件"""
+        """备份Excel文件（去重快照 + 行级增量，见 backup_store）"""
         try:
             if os.path.exists(self.excel_file):
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                backup_file = os.path.join(self.backup_dir, f'{self.excel_file.replace(".xlsx", "")}_backup_{timestamp}.xlsx')
-                
-                # 复制文件
-                import shutil
-                shutil.copy2(self.excel_file, backup_file)
-                print(f"💾 已备份Excel文件: {backup_file}")
+                backup_workbook(self.excel_file)
+                print(f"💾 已备份Excel文件到: {self.backup_dir}")
                 return True
         except Exception as e:
             print(f"❌ 备份Excel文件失败: {e}")
@@ -66,7 +68,8 @@ class CloudExpiryChecker:
         """读取Excel文件"""
         try:
             if os.path.exists(self.excel_file):
-                df = pd.read_excel(self.excel_file)
+                df = load_table(self.excel_file)
+                self.original_df = df.copy()
                 print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
                 return df
             else:
@@ -76,100 +79,23 @@ class CloudExpiryChecker:
             print(f"❌ 读取Excel文件失败: {e}")
             return None
     
-    def save_excel_file(self, df):
-        """保存Excel文件"""
-        try:
-            df.to_excel(self.excel_file, index=False)
-            print(f"✅ Excel文件已保存: {self.excel_file}")
-            return True
-        except Exception as e:
-            print(f"❌ 保存Excel文件失败: {e}")
-            return False
-    
     def find_columns(self, df):
         """查找关键列"""
-        columns = {}
-        
-        # 查找剩余天数列
-        possible_remaining = ['剩余天数', '剩余时间', '到期天数', '过期天数', '天数', 'days', 'remaining_days', '剩余', '到期', '过期']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_remaining:
-                if name in col_str:
-                    columns['remaining'] = col
-                    break
-            if 'remaining' in columns:
-                break
-        
-        # 查找总天数列
-        possible_total = ['总天数', '总时间', '总天', 'total_days', 'total', '天']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_total:
-                if name in col_str:
-                    columns['total'] = col
-                    break
-            if 'total' in columns:
-                break
-        
-        # 查找开始时间列
-        possible_start = ['开始时间', '开始日期', 'start_date', 'start_time', '开始']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_start:
-                if name in col_str:
-                    columns['start_date'] = col
-                    break
-            if 'start_date' in columns:
-                break
-        
+        columns = resolve_columns(df.columns)
         print(f"🎯 找到的列: {columns}")
         return columns
     
-    def update_remaining_days(self, df, columns):
-        """更新所有项目的剩余天数 - 每天减1"""
-        updated_count = 0
-        
-        for idx, row in df.iterrows():
-            current_remaining = row[columns['remaining']]
-            
-            # 如果当前剩余天数为0，跳过（这些会在update_expired_items中处理）
-            if pd.notna(current_remaining) and int(current_remaining) == 0:
-                print(f"⏭️  跳过减1: {row.get(' 店铺名称', f'行{idx+1}')} 已经是0天")
-                continue
-            
-            # 如果剩余天数不为0，每天减1
-            if pd.notna(current_remaining) and int(current_remaining) > 0:
-                old_remaining = int(current_remaining)
-                new_remaining = max(0, old_remaining - 1)  # 不能小于0
-                
-                df.at[idx, columns['remaining']] = new_remaining
-                updated_count += 1
-                print(f"📅 剩余天数减1: {row.get(' 店铺名称', f'行{idx+1}')} {old_remaining} → {new_remaining}")
-        
-        return updated_count
-    
     def check_expiry_items(self, df, columns):
         """检查剩余天数为0的项目"""
         expired_items = []
         
         try:
-            # 确保剩余天数列是数值类型
-            df[columns['remaining']] = pd.to_numeric(df[columns['remaining']], errors='coerce')
+            expired_items = find_expired(df, columns)
             
-            # 查找剩余天数为0的项目
-            expired_mask = df[columns['remaining']] == 0
-            expired_df = df[expired_mask]
-            
-            if not expired_df.empty:
-                print(f"🚨 发现 {len(expired_df)} 个剩余天数为0的项目:")
-                for idx, row in expired_df.iterrows():
-                    item_info = {
-                        'row': idx + 1,
-                        'data': row.to_dict()
-                    }
-                    expired_items.append(item_info)
-                    print(f"  行 {idx + 1}: {dict(row)}")
+            if expired_items:
+                print(f"🚨 发现 {len(expired_items)} 个剩余天数为0的项目:")
+                for item in expired_items:
+                    print(f"  行 {item['row']}: {item['data']}")
             else:
                 print("✅ 没有发现剩余天数为0的项目")
                 
@@ -178,50 +104,16 @@ class CloudExpiryChecker:
         
         return expired_items
     
-    def update_expired_items(self, df, columns):
-        """更新到期项目"""
-        updated_items = []
-        current_date = datetime.now()
-        
-        for idx, row in df.iterrows():
-            remaining = row[columns['remaining']]
-            total = row[columns['total']]
-            start_date = row[columns['start_date']]
-            
-            # 如果剩余天数为0，需要重置
-            if pd.notna(remaining) and int(remaining) == 0:
-                print(f"🔄 重置项目: {row.get(' 店铺名称', f'行{idx+1}')}")
-                
-                # 更新开始时间为今天
-                new_start_date = current_date.strftime('%Y%m%d')
-                df.at[idx, columns['start_date']] = int(new_start_date)
-                
-                # 重置剩余天数为总天数
-                df.at[idx, columns['remaining']] = total
-                
-                updated_items.append({
-                    'row': idx + 1,
-                    'name': row.get(' 店铺名称', f'行{idx+1}'),
-                    'address': row.get('地址', '未知地址'),
-                    'total_days': total,
-                    'old_start': start_date,
-                    'new_start': new_start_date
-                })
-        
-        return updated_items
-    
     def send_notifications(self, expired_items, updated_items):
         """发送通知"""
         print(f"📧 开始发送通知，共有 {len(expired_items)} 个到期项目，{len(updated_items)} 个重置项目")
         
-        # 发送邮件通知
-        self.send_email_notification(expired_items, updated_items)
-        
-        # 发送微信通知
-        self.send_wechat_notification(expired_items, updated_items)
-        
-        # 发送短信通知
-        self.send_sms_notification(expired_items, updated_items)
+        # 邮件、微信、短信并发发送
+        return dispatch(enabled_senders({
+            'email': lambda: self.send_email_notification(expired_items, updated_items),
+            'wechat': lambda: self.send_wechat_notification(expired_items, updated_items),
+            'sms': lambda: self.send_sms_notification(expired_items, updated_items),
+        }, self.notification_config))
     
     def send_email_notification(self, expired_items, updated_items):
         """发送邮件通知"""
@@ -246,15 +138,7 @@ class CloudExpiryChecker:
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             # 发送邮件
-            if config['smtp_port'] == 465:
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("✅ 邮件通知发送成功")
             return True
@@ -282,7 +166,7 @@ class CloudExpiryChecker:
                 }
             }
             
-            response = requests.post(config['webhook_url'], json=payload)
+            response = post_json(config['webhook_url'], payload)
             if response.status_code == 200:
                 print("✅ 微信通知发送成功")
                 return True
@@ -312,7 +196,7 @@ class CloudExpiryChecker:
                 "message": content
             }
             
-            response = requests.post(config['api_url'], json=payload)
+            response = post_json(config['api_url'], payload)
             if response.status_code == 200:
                 print("✅ 短信通知发送成功")
                 return True
@@ -362,14 +246,12 @@ class CloudExpiryChecker:
         """发送恭喜通知"""
         print("🎉 发送恭喜通知...")
         
-        # 发送恭喜邮件
-        self.send_congratulations_email()
-        
-        # 发送恭喜微信通知
-        self.send_congratulations_wechat()
-        
-        # 发送恭喜短信
-        self.send_congratulations_sms()
+        # 邮件、微信、短信并发发送
+        return dispatch(enabled_senders({
+            'email': self.send_congratulations_email,
+            'wechat': self.send_congratulations_wechat,
+            'sms': self.send_congratulations_sms,
+        }, self.notification_config))
     
     def send_congratulations_email(self):
         """发送恭喜邮件"""
@@ -409,15 +291,7 @@ class CloudExpiryChecker:
             
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
-            if config['smtp_port'] == 465:
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("✅ 恭喜邮件发送成功")
             return True
@@ -445,7 +319,7 @@ class CloudExpiryChecker:
                 }
             }
             
-            response = requests.post(config['webhook_url'], json=payload)
+            response = post_json(config['webhook_url'], payload)
             if response.status_code == 200:
                 print("✅ 恭喜微信通知发送成功")
                 return True
@@ -475,7 +349,7 @@ class CloudExpiryChecker:
                 "message": content
             }
             
-            response = requests.post(config['api_url'], json=payload)
+            response = post_json(config['api_url'], payload)
             if response.status_code == 200:
                 print("✅ 恭喜短信发送成功")
                 return True
@@ -489,7 +363,8 @@ class CloudExpiryChecker:
     
     def run_check(self):
         """执行智能检查流程"""
-        print(f"\n=== 开始执行智能检查任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+        self.current_date = get_beijing_time()
+        print(f"\n=== 开始执行智能检查任务 - {self.current_date.strftime('%Y-%m-%d %H:%M:%S')} ===")
         
         # 备份Excel文件
         self.backup_excel()
@@ -503,9 +378,13 @@ class CloudExpiryChecker:
         # 查找关键列
         columns = self.find_columns(df)
         
-        # 第一步：先更新剩余天数（每天减1）
-        updated_count = self.update_remaining_days(df, columns)
-        print(f"📅 更新了 {updated_count} 个项目的剩余天数（每天减1）")
+        # 第一步：先更新剩余天数（每天减1，日期模式下按到期日期推导）
+        needs_save = True
+        if self.expiry_mode == 'date':
+            needs_save = self.derive_remaining_days(df, columns)
+        else:
+            updated_count = self.update_remaining_days(df, columns)
+            print(f"📅 更新了 {updated_count} 个项目的剩余天数")
         
         # 第二步：检查到期项目（减1后可能变成0的项目）
         expired_items = self.check_expiry_items(df, columns)
@@ -519,15 +398,21 @@ class CloudExpiryChecker:
         updated_items = self.update_expired_items(df, columns)
         print(f"🔄 重置了 {len(updated_items)} 个到期项目")
         
-        # 保存更新后的Excel文件
-        if self.save_excel_file(df):
+        # 保存更新后的Excel文件（日期模式下只有重置或首次生成到期日期时才写入）
+        if not (needs_save or updated_items):
+            print("📄 日期模式下没有需要写入的变化，跳过保存")
+        elif self.save_excel_file(df):
             print("💾 Excel文件已更新并保存")
+            if self.expiry_mode != 'date':
+                write_last_run(self.excel_file, self.run_date())
         
         # 如果没有到期项目，发送恭喜通知
         if not expired_items:
             print("🎉 没有到期项目，发送恭喜通知")
             self.send_congratulations_notification()
         
+        # 关闭本次运行共用的SMTP连接并输出耗时
+        close_transports()
         print("=== 智能检查任务完成 ===\n")
 
 def main():
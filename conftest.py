@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共用的夹具 - 每个测试的缓存、备份和运行记录都放在自己的 tmp_path 里
+
+模块变量用 monkeypatch 修改，测试结束后自动还原，仓库里的 .yxc_cache、backups、last_run.json 不受影响。
+"""
+
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+import backup_store
+import excel_cache
+import excel_schema
+import font_resolver
+import rate_limiter
+import render_cache
+import run_watermark
+
+
+@pytest.fixture(autouse=True)
+def isolated_files(tmp_path, monkeypatch):
+    """把各模块的缓存目录和状态文件指向临时目录，并清空进程内缓存"""
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    monkeypatch.setattr(excel_schema, 'CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(excel_schema, 'SCHEMA_CACHE_FILE', str(cache_dir / 'schema_cache.json'))
+    monkeypatch.setattr(excel_schema, '_memory_cache', {})
+    monkeypatch.setattr(excel_cache, 'CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(excel_cache, '_digests', {})
+    monkeypatch.setattr(excel_cache, '_tables', {})
+    monkeypatch.setattr(render_cache, 'RENDER_DIR', str(cache_dir / 'renders'))
+    monkeypatch.setattr(render_cache, '_images', OrderedDict())
+    monkeypatch.setattr(font_resolver, 'CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(font_resolver, 'FONT_CACHE_FILE', str(cache_dir / 'font_cache.json'))
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_FILE', str(cache_dir / 'rate_limits.json'))
+    monkeypatch.setattr(backup_store, 'BACKUP_DIR', str(tmp_path / 'backups'))
+    monkeypatch.setattr(run_watermark, 'WATERMARK_FILE', str(tmp_path / 'last_run.json'))
+    return tmp_path
+
+
+@pytest.fixture
+def make_workbook(tmp_path):
+    """把数据写成 tmp_path 下的Excel文件并返回路径：make_workbook(数据, name='yxc.xlsx')"""
+    def write(data, name='yxc.xlsx'):
+        path = str(tmp_path / name)
+        pd.DataFrame(data).to_excel(path, index=False)
+        return path
+    return write
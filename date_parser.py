@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日期解析 - 整列一次性解析开始时间，按列识别格式，混合列才逐个回退
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# 支持的日期格式，按优先级排列
+DATE_FORMATS = [
+    '%Y%m%d',      # 20250403
+    '%Y-%m-%d',    # 2025-04-03
+    '%Y/%m/%d',    # 2025/04/03
+    '%Y年%m月%d日', # 2025年04月03日
+]
+
+
+def _normalize(values):
+    """统一转成字符串：整数值的浮点数（如 20250403.0）去掉小数部分"""
+    result = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        if isinstance(value, (float, np.floating)) and float(value).is_integer():
+            result[i] = str(int(value))
+        else:
+            result[i] = str(value).strip()
+    return result
+
+
+def _parse_uniques(uniques, formats):
+    """解析去重后的值：整列先尝试单一格式，不能全部解析时按格式顺序逐步补齐，返回 (结果, 用到的格式)"""
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype='datetime64[ns]')
+    if len(uniques) == 0:
+        return parsed, []
+
+    text = pd.Series(uniques, dtype=object)
+    for fmt in formats:
+        attempt = pd.to_datetime(text, format=fmt, errors='coerce')
+        if attempt.notna().all():
+            return attempt, [fmt]
+
+    # 混合格式：只对尚未解析的值继续尝试后面的格式
+    pending = np.ones(len(uniques), dtype=bool)
+    used = []
+    for fmt in formats:
+        if not pending.any():
+            break
+        attempt = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+        ok = attempt.notna()
+        if ok.any():
+            used.append(fmt)
+            parsed[attempt.index[ok]] = attempt[ok]
+            pending[attempt.index[ok]] = False
+    return parsed, used
+
+
+def parse_date_column(series, formats=DATE_FORMATS, label='开始时间', report=True):
+    """
+    一次性解析整列日期
+
+    返回 (datetime64列, 无法解析的行索引列表)。重复的值只解析一次；
+    report=True 时把无法解析的行汇总打印一次。
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        dates = pd.to_datetime(series)
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        return dates, []
+
+    # 先按原始值去重，每个不同的值只规范化、解析一次
+    codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=True)
+    normalized = _normalize(np.asarray(uniques, dtype=object))
+    parsed_uniques, used_formats = _parse_uniques(normalized, formats)
+
+    values = parsed_uniques.to_numpy(dtype='datetime64[ns]')
+    dates = np.full(len(codes), np.datetime64('NaT'), dtype='datetime64[ns]')
+    has_value = codes >= 0
+    dates[has_value] = values[codes[has_value]]
+
+    bad_positions = np.flatnonzero(has_value & np.isnat(dates))
+    bad_rows = series.index[bad_positions].tolist()
+    if report:
+        if len(used_formats) > 1:
+            print(f"📅 {label}列为混合格式: {', '.join(used_formats)}")
+        if len(bad_positions):
+            preview = ', '.join(f"行{pos + 1}({normalized[codes[pos]]})" for pos in bad_positions[:10])
+            more = f" 等{len(bad_positions)}行" if len(bad_positions) > 10 else ""
+            print(f"⚠️ {label}无法解析: {preview}{more}")
+    return pd.Series(dates, index=series.index, name=series.name), bad_rows
+
+
+def parse_date_value(value, formats=DATE_FORMATS):
+    """解析单个日期值，无法解析时返回None"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime):
+        return value
+    dates, _ = parse_date_column(pd.Series([value], dtype=object), formats, report=False)
+    parsed = dates.iloc[0]
+    return None if pd.isna(parsed) else parsed.to_pydatetime()
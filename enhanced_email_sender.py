@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 import pandas as pd
-import smtplib
 import os
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
@@ -11,8 +10,14 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from datetime import datetime
 from dotenv import load_dotenv
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from render_cache import get_render, put_render, render_key
+from raster_table import render_table, renderer_name, use_pillow
+from smtp_transport import send_mail
 import io
 import base64
+from font_resolver import setup_matplotlib_font
 
 # 加载环境变量
 load_dotenv()
@@ -35,13 +40,7 @@ class EnhancedEmailSender:
         """创建表格图片"""
         try:
             # 设置中文字体
-            plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-            plt.rcParams['axes.unicode_minus'] = False
-            
-            # 创建图形
-            fig, ax = plt.subplots(figsize=(20, 12))
-            ax.axis('tight')
-            ax.axis('off')
+            setup_matplotlib_font()
             
             # 准备表格数据
             table_data = []
@@ -57,6 +56,27 @@ class EnhancedEmailSender:
                     str(row.get('备注2', ''))
                 ])
             
+            # 同样的数据、标题和样式已经画过时直接用缓存的图片
+            current_date = datetime.now().strftime('%Y年%m月%d日')
+            title = f'{title} - {current_date}'
+            cache_key = render_key(table_data, title, ['enhanced-email', renderer_name()], 300)
+            cached = get_render(cache_key)
+            if cached is not None:
+                return cached
+            
+            if use_pillow():
+                zero_rows = [i for i, row in enumerate(table_data) if row[3] == '0']
+                img_buffer = render_table(table_data, ['行号', '店铺名称', '地址', '总天', '剩余', '开始时间', '备注1', '备注2'],
+                                          title, highlight=zero_rows, font_size=10, dpi=300, header_style=False,
+                                          highlight_fill='#ffcccc', highlight_color='red', highlight_columns=5)
+                put_render(cache_key, img_buffer.getvalue())
+                return img_buffer
+            
+            # 创建图形
+            fig, ax = plt.subplots(figsize=(20, 12))
+            ax.axis('tight')
+            ax.axis('off')
+            
             # 创建表格
             table = ax.table(
                 cellText=table_data,
@@ -72,9 +92,7 @@ class EnhancedEmailSender:
             table.scale(1, 2)
             
             # 设置标题（包含发送日期）
-            from datetime import datetime
-            current_date = datetime.now().strftime('%Y年%m月%d日')
-            plt.title(f'{title} - {current_date}', fontsize=16, fontweight='bold', pad=20)
+            plt.title(title, fontsize=16, fontweight='bold', pad=20)
             
             # 高亮剩余天数为0的行
             for i in range(1, len(table_data) + 1):
@@ -90,6 +108,7 @@ class EnhancedEmailSender:
             img_buffer.seek(0)
             
             plt.close()
+            put_render(cache_key, img_buffer.getvalue())
             return img_buffer
             
         except Exception as e:
@@ -192,15 +211,7 @@ class EnhancedEmailSender:
                 print("✅ 表格图片已添加到邮件")
             
             # 发送邮件
-            if config['smtp_port'] == 465:
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("✅ 增强版邮件发送成功！")
             print(f"📧 邮件已发送到: {config['to_email']}")
@@ -217,7 +228,7 @@ class EnhancedEmailSender:
         
         # 读取Excel文件
         try:
-            df = pd.read_excel(self.excel_file)
+            df = load_table(self.excel_file)
             print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
         except Exception as e:
             print(f"❌ 读取Excel文件失败: {e}")
@@ -246,44 +257,10 @@ class EnhancedEmailSender:
     
     def find_columns(self, df):
         """查找关键列"""
-        columns = {}
-        
-        # 查找剩余天数列
-        possible_remaining = ['剩余天数', '剩余时间', '到期天数', '过期天数', '天数', 'days', 'remaining_days', '剩余', '到期', '过期']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_remaining:
-                if name in col_str:
-                    columns['remaining'] = col
-                    break
-            if 'remaining' in columns:
-                break
-        
-        # 查找总天数列
-        possible_total = ['总天数', '总时间', '总天', 'total_days', 'total', '天']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_total:
-                if name in col_str:
-                    columns['total'] = col
-                    break
-            if 'total' in columns:
-                break
-        
-        # 查找开始时间列
-        possible_start = ['开始时间', '开始日期', 'start_date', 'start_time', '开始']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_start:
-                if name in col_str:
-                    columns['start_date'] = col
-                    break
-            if 'start_date' in columns:
-                break
-        
+        columns = resolve_columns(df.columns)
         print(f"🎯 找到的列: {columns}")
         return columns
-
+    
 def main():
     sender = EnhancedEmailSender()
     sender.send_real_data_email()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表格缓存 - 把解析好的表格以列式二进制格式存到缓存目录，按工作簿大小、修改时间和内容哈希自动失效
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+from excel_schema import CACHE_DIR
+
+try:
+    import pyarrow  # noqa: F401  有pyarrow时用feather格式
+    CACHE_FORMAT = 'feather'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+# EXCEL_CACHE=0 时关闭表格缓存
+CACHE_ENABLED = os.getenv('EXCEL_CACHE', '1') != '0'
+
+# 进程内缓存：文件状态 -> 内容哈希，(内容哈希, 列) -> 表格
+_digests = {}
+_tables = {}
+
+
+def file_digest(path):
+    """工作簿的内容哈希；大小和修改时间都没变时直接复用上次的结果"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    state = (stat.st_size, stat.st_mtime_ns)
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+    _digests[path] = (state, digest)
+    return digest
+
+
+def _fields_key(fields):
+    """读取的列集合对应的键"""
+    text = json.dumps(None if fields is None else list(fields))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+
+
+def _source_key(path):
+    """工作簿路径对应的键，用于清理同一文件的旧缓存"""
+    return hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+
+
+def _cache_file(path, digest, fields):
+    """缓存文件路径"""
+    name = f"table-{_source_key(path)}-{digest[:16]}-{_fields_key(fields)}.{CACHE_FORMAT}"
+    return os.path.join(CACHE_DIR, name)
+
+
+def _read_file(cache_file):
+    """读取缓存文件"""
+    if CACHE_FORMAT == 'feather':
+        import pandas as pd
+        return pd.read_feather(cache_file)
+    with open(cache_file, 'rb') as f:
+        return pickle.load(f)
+
+
+def _write_file(cache_file, df):
+    """写入缓存文件（临时文件 + 原子替换）"""
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        if CACHE_FORMAT == 'feather':
+            df.reset_index(drop=True).to_feather(tmp_file)
+        else:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def _remove_stale(path, digest):
+    """删除同一工作簿旧内容对应的缓存文件"""
+    prefix = f"table-{_source_key(path)}-"
+    current = f"{prefix}{digest[:16]}-"
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(prefix) and not name.startswith(current):
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def get_table(path, fields=None):
+    """取缓存的表格（返回副本），没有缓存或工作簿已变化时返回None"""
+    if not CACHE_ENABLED:
+        return None
+    try:
+        digest = file_digest(path)
+        key = (digest, _fields_key(fields))
+        df = _tables.get(key)
+        if df is None:
+            cache_file = _cache_file(path, digest, fields)
+            if not os.path.exists(cache_file):
+                return None
+            df = _read_file(cache_file)
+            _tables[key] = df
+        return df.copy()
+    except Exception as e:
+        print(f"⚠️ 读取表格缓存失败，重新解析Excel: {e}")
+        return None
+
+
+def put_table(path, fields, df):
+    """保存解析好的表格"""
+    if not CACHE_ENABLED:
+        return
+    try:
+        digest = file_digest(path)
+        _tables[(digest, _fields_key(fields))] = df.copy()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _write_file(_cache_file(path, digest, fields), df)
+        _remove_stale(path, digest)
+    except Exception as e:
+        print(f"⚠️ 保存表格缓存失败: {e}")
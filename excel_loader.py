@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel读取 - 只读流式打开工作簿，只取当前步骤需要的列，并指定列类型
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from excel_cache import get_table, put_table
+from excel_schema import resolve_columns
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不输出内存峰值
+    resource = None
+
+# 每日检查步骤需要的逻辑列
+CHECK_FIELDS = ('row_number', 'name', 'address', 'total', 'remaining', 'start_date', 'expiry')
+# 表格图片需要的逻辑列
+TABLE_FIELDS = ('row_number', 'name', 'address', 'total', 'remaining', 'start_date', 'notes')
+# 统计报告（剩余天数、备注分布）需要的逻辑列
+SUMMARY_FIELDS = ('remaining', 'notes')
+
+# 列类型：天数用int16，地址和备注用category
+DAY_FIELDS = ('total', 'remaining')
+CATEGORY_FIELDS = ('address', 'notes')
+
+# 文件超过这个大小时输出读取耗时和内存峰值（约1万行）
+LARGE_SHEET_BYTES = int(os.getenv('LARGE_SHEET_BYTES', str(512 * 1024)))
+
+
+def _day_series(values, name):
+    """天数列：没有空值且在范围内时用int16，否则保持数值类型"""
+    series = pd.to_numeric(pd.Series(values, name=name, dtype=object), errors='coerce')
+    if series.notna().all() and len(series) and (series % 1 == 0).all() \
+            and series.min() >= np.iinfo(np.int16).min and series.max() <= np.iinfo(np.int16).max:
+        return series.astype('int16')
+    return series
+
+
+def _selected_positions(header, fields):
+    """根据逻辑列选出需要读取的列位置，fields为None时读取全部列"""
+    if fields is None:
+        return list(range(len(header)))
+
+    columns = resolve_columns(header)
+    wanted = set()
+    for field in fields:
+        col = columns.get(field)
+        for name in (col if isinstance(col, list) else [col]):
+            if name is not None:
+                wanted.add(header.index(name))
+    return sorted(wanted)
+
+
+def _read_sheet(path, fields):
+    """只读流式读取第一个工作表，返回 (表头, 选中列的值)"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        while header and header[-1] is None:
+            header.pop()
+        header = [name if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+
+        positions = _selected_positions(header, fields)
+        data = [[] for _ in positions]
+        empty_tail = 0
+        for row in rows:
+            values = [row[pos] if pos < len(row) else None for pos in positions]
+            # 表格末尾带格式的空行不算数据
+            if all(value is None for value in values):
+                empty_tail += 1
+            else:
+                empty_tail = 0
+            for column, value in zip(data, values):
+                column.append(value)
+        if empty_tail:
+            data = [column[:-empty_tail] for column in data]
+    finally:
+        workbook.close()
+    return header, positions, data
+
+
+def load_table(path, fields=None, report=None, cache=True):
+    """
+    读取Excel表格
+
+    fields: 需要的逻辑列（见 excel_schema.SCHEMA_KEYWORDS，另有 'notes'），None表示全部列。
+    report: 是否输出读取耗时和内存峰值，None表示只在大表格时输出。
+    cache: 是否使用表格缓存（工作簿内容不变时直接读取上次解析的结果）。
+    """
+    if report is None:
+        report = os.path.getsize(path) >= LARGE_SHEET_BYTES
+    start = time.perf_counter()
+
+    if cache:
+        df = get_table(path, fields)
+        if df is not None:
+            if report:
+                print(f"⚡ 读取 {path}: 命中表格缓存，{len(df)} 行 × {len(df.columns)} 列，"
+                      f"耗时 {time.perf_counter() - start:.3f}s")
+            return df
+
+    header, positions, data = _read_sheet(path, fields)
+    columns = resolve_columns(header)
+    day_columns = {columns[field] for field in DAY_FIELDS if field in columns}
+    category_columns = {columns[field] for field in CATEGORY_FIELDS if field in columns and field != 'notes'}
+    category_columns.update(columns.get('notes', []))
+
+    series = {}
+    for pos, values in zip(positions, data):
+        name = header[pos]
+        if name in day_columns:
+            series[name] = _day_series(values, name)
+        elif name in category_columns:
+            series[name] = pd.Series(values, name=name, dtype='category')
+        else:
+            series[name] = pd.Series(values, name=name).infer_objects()
+    df = pd.DataFrame(series, columns=[header[pos] for pos in positions])
+    elapsed = time.perf_counter() - start
+    if cache:
+        put_table(path, fields, df)
+
+    if report:
+        message = f"📥 读取 {path}: {len(df)} 行 × {len(df.columns)} 列，耗时 {elapsed:.2f}s"
+        if resource is not None:
+            # ru_maxrss 在Linux上单位是KB，macOS上是字节
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak_mb = peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+            message += f"，进程内存峰值 {peak_mb:.1f}MB"
+        print(message)
+    return df
+
+
+def main():
+    """命令行：python excel_loader.py [文件] [逻辑列...]，输出解析和读缓存的耗时及内存峰值"""
+    path = sys.argv[1] if len(sys.argv) > 1 else 'yxc.xlsx'
+    fields = sys.argv[2:] or None
+    df = load_table(path, fields, report=True)
+    print(df.dtypes)
+    # 再读一次，第二次走表格缓存
+    load_table(path, fields, report=True)
+
+
+if __name__ == "__main__":
+    main()
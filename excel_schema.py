@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表头解析 - 把Excel列名映射到逻辑列，按表头哈希缓存，所有脚本共用
+"""
+
+import hashlib
+import json
+import os
+
+# 缓存目录（表头映射、表格缓存等都放在这里）
+CACHE_DIR = os.getenv('YXC_CACHE_DIR', '.yxc_cache')
+SCHEMA_CACHE_FILE = os.path.join(CACHE_DIR, 'schema_cache.json')
+
+# 逻辑列及其关键词，按优先级排列；解析顺序决定冲突时哪个逻辑列先占用
+SCHEMA_KEYWORDS = {
+    'row_number': ['行号', '序号'],
+    'name': ['店铺名称', '店铺', '名称', 'name'],
+    'address': ['地址', 'address'],
+    'expiry': ['到期日期', 'expiry_date'],
+    'start_date': ['开始时间', '开始日期', 'start_date', 'start_time', '开始'],
+    'total': ['总天数', '总时间', '总天', 'total_days', 'total', '天'],
+    'remaining': ['剩余天数', '剩余时间', '到期天数', '过期天数', '天数', 'days', 'remaining_days', '剩余', '到期', '过期'],
+}
+NOTES_KEYWORD = '备注'
+
+_memory_cache = {}
+
+
+def header_hash(header):
+    """表头的哈希值（列名顺序敏感）"""
+    text = json.dumps([str(col) for col in header], ensure_ascii=False)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _scan(header):
+    """扫描表头，返回 逻辑列 -> 列位置（备注为位置列表）"""
+    names = [str(col).strip().lower() for col in header]
+    claimed = set()
+    positions = {}
+
+    # 第一轮：列名与关键词完全相同
+    for field, keywords in SCHEMA_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in names and names.index(keyword) not in claimed:
+                positions[field] = names.index(keyword)
+                claimed.add(positions[field])
+                break
+
+    # 第二轮：包含匹配。所有逻辑列按关键词优先级轮流尝试，'天'这类宽泛的关键词
+    # 排在最后，不会抢走本该属于其他逻辑列的列；已被占用的列不再分配
+    rounds = max(len(keywords) for keywords in SCHEMA_KEYWORDS.values())
+    for rank in range(rounds):
+        for field, keywords in SCHEMA_KEYWORDS.items():
+            if field in positions or rank >= len(keywords):
+                continue
+            match = next((i for i, name in enumerate(names) if keywords[rank] in name and i not in claimed), None)
+            if match is not None:
+                positions[field] = match
+                claimed.add(match)
+
+    positions['notes'] = [i for i, name in enumerate(names) if NOTES_KEYWORD in name and i not in claimed]
+    return positions
+
+
+def _load_persisted():
+    """读取持久化的表头映射"""
+    try:
+        with open(SCHEMA_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _persist(key, positions):
+    """保存表头映射（临时文件 + 原子替换）"""
+    try:
+        cache = _load_persisted()
+        cache[key] = positions
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{SCHEMA_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, SCHEMA_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ 保存表头映射失败: {e}")
+
+
+def resolve_columns(header):
+    """
+    解析表头，返回 {'remaining': 列名, 'total': 列名, 'start_date': 列名, 'name': 列名,
+    'address': 列名, 'notes': [列名, ...], ...}，找不到的逻辑列不出现在结果中。
+
+    同一表头只扫描一次：先查进程内缓存，再查按表头哈希持久化的映射。
+    """
+    header = list(header)
+    key = header_hash(header)
+
+    positions = _memory_cache.get(key)
+    if positions is None:
+        positions = _load_persisted().get(key)
+        if positions is None:
+            positions = _scan(header)
+            _persist(key, positions)
+        _memory_cache[key] = positions
+
+    columns = {field: header[pos] for field, pos in positions.items() if field != 'notes'}
+    columns['notes'] = [header[pos] for pos in positions.get('notes', [])]
+    return columns
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel写入 - 只把本次运行改动过的单元格写回原工作簿，保留格式、列宽和其他工作表
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+def _cell_value(value):
+    """转换为openpyxl可写入的Python值"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and np.isnan(value):
+            return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def changed_cells(before, after):
+    """
+    对比运行前后的表格，返回 {列名: [(行位置, 新值), ...]}
+
+    两边都为空值视为未改动；before中没有的列视为新增列，行数不同时整列写入。
+    """
+    changes = {}
+    for column in after.columns:
+        new_values = after[column].to_numpy(dtype=object)
+        if column not in before.columns or len(before) != len(after):
+            changes[column] = list(enumerate(new_values))
+            continue
+
+        old_values = before[column].to_numpy(dtype=object)
+        old_missing = pd.isna(old_values)
+        new_missing = pd.isna(new_values)
+        with np.errstate(invalid='ignore'):
+            different = (old_values != new_values) & ~(old_missing & new_missing)
+        different |= old_missing != new_missing
+        positions = np.flatnonzero(different)
+        if len(positions):
+            changes[column] = [(pos, new_values[pos]) for pos in positions]
+    return changes
+
+
+def patch_excel_cells(path, changes):
+    """把改动写入第一个工作表对应的单元格（表头在第1行），通过临时文件原子替换，返回写入的单元格数"""
+    workbook = load_workbook(path)
+    sheet = workbook.worksheets[0]
+    header = {cell.value: cell.column for cell in sheet[1] if cell.value is not None}
+
+    written = 0
+    for column, cells in changes.items():
+        col_idx = header.get(column)
+        if col_idx is None:
+            # 新增列追加到最后
+            col_idx = sheet.max_column + 1
+            sheet.cell(row=1, column=col_idx, value=column)
+            header[column] = col_idx
+        for pos, value in cells:
+            sheet.cell(row=int(pos) + 2, column=col_idx, value=_cell_value(value))
+            written += 1
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_file = tempfile.mkstemp(prefix='.', suffix='.xlsx', dir=directory)
+    os.close(fd)
+    try:
+        workbook.save(tmp_file)
+        if os.path.exists(path):
+            os.chmod(tmp_file, os.stat(path).st_mode & 0o777)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return written
+
+
+def save_changes(path, before, after):
+    """只写回改动过的单元格，没有改动时不写文件；返回写入的单元格数"""
+    changes = changed_cells(before, after)
+    if not changes:
+        print(f"📄 {path} 没有改动，跳过写入")
+        return 0
+
+    written = patch_excel_cells(path, changes)
+    print(f"✏️ 已更新 {path} 中 {written} 个单元格（{len(changes)} 列）")
+    return written
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+到期检查基类 - smart_monitor、github_monitor、cloud_monitor 共用的剩余天数更新、到期重置和表格保存
+"""
+
+import os
+
+import pandas as pd
+
+from excel_writer import save_changes
+from expiry_engine import advance_remaining, derive_remaining, ensure_expiry_dates, reset_expired
+from run_watermark import elapsed_days, get_beijing_time
+
+
+class ExpiryCheckerBase:
+    """各监控器共用的部分，子类负责设置 excel_file、读取表格和发送通知"""
+
+    def __init__(self):
+        # 剩余天数模式: decrement=每天减1写回表格, date=按到期日期推导（无重置时不写表格）
+        self.expiry_mode = os.getenv('EXPIRY_MODE', 'decrement').lower()
+        # 读取时的表格快照，保存时只写回与它不同的单元格
+        self.original_df = pd.DataFrame()
+        # 本次运行的北京时间，run_check开始时取一次；运行记录和剩余天数都按这个日期
+        self.current_date = None
+
+    def run_date(self):
+        """本次运行的北京时间（Actions上datetime.now()是UTC），与监控流水线写同一天的运行记录"""
+        if self.current_date is None:
+            self.current_date = get_beijing_time()
+        return self.current_date
+
+    def save_excel_file(self, df):
+        """保存Excel文件"""
+        try:
+            # 只写回改动过的单元格，保留原表格的格式
+            save_changes(self.excel_file, self.original_df, df)
+            self.original_df = df.copy()
+            print(f"✅ Excel文件已保存: {self.excel_file}")
+            return True
+        except Exception as e:
+            print(f"❌ 保存Excel文件失败: {e}")
+            return False
+
+    def update_remaining_days(self, df, columns):
+        """更新所有项目的剩余天数 - 每天减1，距上次运行超过1天时一次性补上漏掉的天数"""
+        current_date = self.run_date()
+        updated_count, _ = advance_remaining(df, columns, elapsed_days(self.excel_file, current_date), current_date)
+        return updated_count
+
+    def derive_remaining_days(self, df, columns):
+        """日期模式：按到期日期推导剩余天数，返回是否需要写回表格（首次生成到期日期列）"""
+        added = ensure_expiry_dates(df, columns)
+        changed = derive_remaining(df, columns, self.run_date())
+        print(f"📅 按到期日期推导剩余天数，{changed} 个项目与表格中的值不同")
+        return added
+
+    def update_expired_items(self, df, columns):
+        """更新到期项目"""
+        return reset_expired(df, columns, self.run_date())
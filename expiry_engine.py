@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+到期计算引擎 - 以整列NumPy掩码运算完成每日减1、到期检测和重置
+"""
+
+import numpy as np
+import pandas as pd
+
+from date_parser import parse_date_column
+
+
+def _remaining_values(df, columns):
+    """取剩余天数列的数值视图（与原逻辑的int()截断一致）"""
+    remaining = pd.to_numeric(df[columns['remaining']], errors='coerce').to_numpy(dtype='float64')
+    return np.trunc(remaining)
+
+
+def _row_numbers(df, positions, columns=None):
+    """取行号列，没有行号列时使用 位置+1"""
+    row_col = (columns or {}).get('row_number', '行号')
+    if row_col in df.columns:
+        return df[row_col].to_numpy()[positions]
+    return df.index.to_numpy()[positions] + 1
+
+
+def _column_values(df, columns, field, default_col, positions):
+    """按逻辑列取指定位置的值，列不存在时返回None"""
+    col = columns.get(field, default_col)
+    return df[col].to_numpy()[positions] if col in df.columns else None
+
+
+def _assign(df, column, mask, values):
+    """按掩码整列写回，必要时先放宽列类型"""
+    series = df[column]
+    values = np.asarray(values)
+    if values.dtype.kind == 'O' and len(values) and pd.api.types.infer_dtype(values, skipna=False) == 'integer':
+        values = values.astype('int64')
+    if values.dtype.kind == 'f' and not np.isnan(values).any() and np.all(values == np.trunc(values)):
+        values = values.astype('int64')
+
+    kind = series.dtype.kind
+    if kind in 'iu' and values.dtype.kind == 'f':
+        series = series.astype('float64')
+    elif kind in 'iuf' and values.dtype.kind not in 'iuf':
+        series = series.astype(object)
+    elif kind not in 'iufO':
+        series = series.astype(object)
+
+    data = series.to_numpy(copy=True)
+    data[mask] = values
+    df[column] = data
+
+
+def decrement_remaining(df, columns):
+    """所有剩余天数大于0的项目减1（为0的项目留给重置处理），返回更新数量"""
+    remaining = _remaining_values(df, columns)
+    mask = remaining > 0
+    count = int(mask.sum())
+    if count:
+        _assign(df, columns['remaining'], mask, np.maximum(remaining[mask] - 1, 0))
+    zero_count = int((remaining == 0).sum())
+    if zero_count:
+        print(f"⏭️  跳过减1: {zero_count} 个项目已经是0天")
+    return count
+
+
+def expired_mask(df, columns):
+    """剩余天数为0的布尔掩码"""
+    return _remaining_values(df, columns) == 0
+
+
+def find_expired(df, columns, index=None):
+    """检查剩余天数为0的项目，返回 [{'row': 行号, 'data': 行字典}, ...]；index为已建好的 ExpiryIndex 时直接查索引"""
+    # 与原逻辑一致：剩余天数列转为数值类型
+    df[columns['remaining']] = pd.to_numeric(df[columns['remaining']], errors='coerce')
+    if index is not None:
+        positions = np.sort(index.equal(0))
+    else:
+        positions = np.flatnonzero(df[columns['remaining']].to_numpy() == 0)
+    if len(positions) == 0:
+        return []
+
+    rows = _row_numbers(df, positions, columns)
+    records = df.iloc[positions].to_dict('records')
+    return [{'row': row, 'data': data} for row, data in zip(rows.tolist(), records)]
+
+
+def reset_expired(df, columns, current_date):
+    """
+    把剩余天数为0的项目重置：开始时间改为今天，剩余天数恢复为总天数
+
+    日期模式下按到期日期重置（见 restart_cycle）：漏跑几天后再重置，周期不会往后推迟。
+    """
+    mask = expired_mask(df, columns)
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return []
+
+    start_col = columns['start_date']
+    old_starts = df[start_col].to_numpy()[positions]
+    totals = df[columns['total']].to_numpy()[positions]
+    today = pd.Timestamp(current_date.strftime('%Y-%m-%d'))
+
+    if 'expiry' in columns:
+        expiry = _to_datetime(df[columns['expiry']], EXPIRY_COLUMN).iloc[positions]
+        last_reset, new_expiry = restart_cycle(expiry, totals, today)
+        # 到期日期无法解析的项目仍从今天开始
+        last_reset = last_reset.fillna(today)
+        _assign(df, columns['expiry'], mask, _format_like(new_expiry, df[columns['expiry']]).to_numpy(dtype=object))
+        _assign(df, columns['remaining'], mask,
+                (new_expiry - today).dt.days.to_numpy(dtype='float64'))
+    else:
+        last_reset = pd.Series(today, index=range(len(positions)))
+        _assign(df, columns['remaining'], mask, totals)
+
+    # 保持与原始数据类型一致：整数列写整数，其他写字符串
+    new_starts = last_reset.dt.strftime('%Y%m%d').to_numpy(dtype=object)
+    _assign(df, start_col, mask, _format_like(last_reset, df[start_col]).to_numpy(dtype=object))
+
+    rows = _row_numbers(df, positions, columns)
+    names = _column_values(df, columns, 'name', ' 店铺名称', positions)
+    addresses = _column_values(df, columns, 'address', '地址', positions)
+
+    updated_items = []
+    for i, row in enumerate(rows.tolist()):
+        name = names[i] if names is not None else f'行{row}'
+        print(f"🔄 重置项目: {name}")
+        updated_items.append({
+            'row': row,
+            'name': name,
+            'address': addresses[i] if addresses is not None else '未知地址',
+            'total_days': totals[i],
+            'old_start': old_starts[i],
+            'new_start': new_starts[i]
+        })
+    return updated_items
+
+
+# ---------------------------------------------------------------------------
+# 补跑：距上次成功运行过了多天时，一次性补上所有漏掉的天数
+# ---------------------------------------------------------------------------
+
+def catch_up_remaining(df, columns, elapsed, current_date):
+    """
+    补上 elapsed 天（相当于逐天执行"减1、到0重置"，最后一天只减1不重置），返回 (更新数量, 漏跑期间已重置的项目)
+
+    剩余天数r0的项目在第 max(r0,1) 天到0并重置为总天，之后每隔总天数再到0一次：
+    最后一次重置在第 last = first + k*总天 天，今天的剩余天数为 总天 - (elapsed - last)；
+    last正好是今天时剩余天数置为0，交给正常的到期检查和重置处理。
+    """
+    remaining = _remaining_values(df, columns)
+    total = np.trunc(pd.to_numeric(df[columns['total']], errors='coerce').to_numpy(dtype='float64'))
+    today = pd.Timestamp(current_date.strftime('%Y-%m-%d'))
+    last_run = today - pd.Timedelta(days=elapsed)
+
+    with np.errstate(invalid='ignore'):
+        active = remaining >= 0
+        first = np.maximum(remaining, 1)
+        crossed = active & (first <= elapsed)
+        cyclic = crossed & (total >= 1)
+
+        new_remaining = remaining.copy()
+        not_yet = active & ~crossed
+        new_remaining[not_yet] = remaining[not_yet] - elapsed
+        # 总天数无效的项目到0后无法重置，留给正常流程处理
+        new_remaining[crossed & ~cyclic] = 0
+
+        safe_total = np.where(cyclic, total, 1)
+        k = np.where(cyclic, (elapsed - first) // safe_total, 0)
+        last = first + k * safe_total
+        due_today = cyclic & (last == elapsed)
+        new_remaining[cyclic] = np.where(due_today, 0, total - (elapsed - last))[cyclic]
+
+        changed = active & (new_remaining != remaining)
+    count = int(changed.sum())
+    if count:
+        _assign(df, columns['remaining'], active, new_remaining[active])
+
+    # 漏跑期间发生过重置的项目：开始时间改为最后一次重置的日期
+    with np.errstate(invalid='ignore'):
+        reset_days = np.where(due_today, last - safe_total, last)
+        was_reset = cyclic & (reset_days >= first)
+    positions = np.flatnonzero(was_reset)
+    missed_items = []
+    if len(positions):
+        start_col = columns['start_date']
+        reset_dates = last_run + pd.to_timedelta(reset_days[positions], unit='D')
+        text = reset_dates.strftime('%Y%m%d')
+        if pd.api.types.is_integer_dtype(df[start_col]):
+            _assign(df, start_col, was_reset, np.asarray(text, dtype='int64'))
+        else:
+            _assign(df, start_col, was_reset, np.asarray(text, dtype=object))
+
+        resets = np.where(due_today, k, k + 1)[positions]
+        rows = _row_numbers(df, positions, columns)
+        names = _column_values(df, columns, 'name', ' 店铺名称', positions)
+        for i, row in enumerate(rows.tolist()):
+            missed_items.append({
+                'row': row,
+                'name': names[i] if names is not None else f'行{row}',
+                'resets': int(resets[i]),
+                'last_reset': text[i],
+            })
+    return count, missed_items
+
+
+def advance_remaining(df, columns, elapsed, current_date):
+    """
+    按距上次运行的天数更新剩余天数，返回 (更新数量, 漏跑期间已重置的项目)
+
+    elapsed为None（没有运行记录）或1时与每天减1相同；为0或负数时说明今天已经运行过，不再减1。
+    """
+    if elapsed is None or elapsed == 1:
+        return decrement_remaining(df, columns), []
+    if elapsed <= 0:
+        print("⏭️  今天已经更新过剩余天数，跳过减1")
+        return 0, []
+
+    print(f"⏩ 距上次运行已过 {elapsed} 天，一次性补上漏掉的天数")
+    count, missed_items = catch_up_remaining(df, columns, elapsed, current_date)
+    for item in missed_items:
+        print(f"🔄 漏跑期间已重置 {item['resets']} 次: 行 {item['row']} {item['name']}，"
+              f"开始时间改为 {item['last_reset']}")
+    return count, missed_items
+
+
+# ---------------------------------------------------------------------------
+# 日期模式：保存绝对到期日期，剩余天数在读取时由 (到期日期 - 今天) 推导
+# ---------------------------------------------------------------------------
+
+EXPIRY_COLUMN = '到期日期'
+
+
+def _to_datetime(series, label):
+    """把日期列整列解析为datetime64（无法解析的为NaT，并汇总提示）"""
+    return parse_date_column(series, label=label)[0]
+
+
+def _format_like(dates, like):
+    """把datetime64按照参照列的类型格式化为YYYYMMDD（整数列写整数，其他写字符串）"""
+    text = dates.dt.strftime('%Y%m%d')
+    if pd.api.types.is_integer_dtype(like):
+        return pd.to_numeric(text, errors='coerce').astype('Int64' if text.isna().any() else 'int64')
+    return text.astype(object)
+
+
+def ensure_expiry_dates(df, columns):
+    """缺少到期日期列时，按 开始时间 + 总天 计算一次；返回是否新增了该列"""
+    columns['expiry'] = EXPIRY_COLUMN
+    if EXPIRY_COLUMN in df.columns:
+        return False
+
+    start = _to_datetime(df[columns['start_date']], '开始时间')
+    total = pd.to_numeric(df[columns['total']], errors='coerce')
+    expiry = start + pd.to_timedelta(total, unit='D')
+    df[EXPIRY_COLUMN] = _format_like(expiry, df[columns['start_date']])
+    print(f"📅 已根据开始时间和总天数生成 {EXPIRY_COLUMN} 列")
+    return True
+
+
+def restart_cycle(expiry, total, today):
+    """
+    到期项目的新周期，返回 (新的开始时间, 新的到期日期)，两个都是datetime64的Series
+
+    项目在到期日期重置，之后每隔总天数再到期一次：新的开始时间是今天及以前最后一次到期的日期
+    last_reset = 到期日期 + ((今天 - 到期日期) // 总天) * 总天，新的到期日期为 last_reset + 总天。
+    Excel日期模式和SQLite存储共用；总天数无效（为空或小于1）的项目结果为NaT。
+    """
+    expiry = pd.Series(pd.to_datetime(np.asarray(expiry)))
+    total = pd.to_numeric(pd.Series(np.asarray(total, dtype=object)), errors='coerce')
+    total = total.where(total >= 1)
+    overdue = (today - expiry).dt.days.clip(lower=0)
+    last_reset = expiry + pd.to_timedelta(overdue // total * total, unit='D')
+    return last_reset, last_reset + pd.to_timedelta(total, unit='D')
+
+
+def derive_remaining(df, columns, current_date):
+    """按 (到期日期 - 今天) 推导剩余天数（不能为负数），返回剩余天数发生变化的项目数量"""
+    today = pd.Timestamp(current_date.strftime('%Y-%m-%d'))
+    expiry = _to_datetime(df[columns['expiry']], EXPIRY_COLUMN)
+    days = (expiry - today).dt.days.to_numpy(dtype='float64')
+    valid = ~np.isnan(days)
+    remaining = np.maximum(days[valid], 0)
+
+    old = _remaining_values(df, columns)[valid]
+    changed = int((old != remaining).sum())
+    _assign(df, columns['remaining'], valid, remaining)
+    return changed
+
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+到期索引 - 按剩余天数排好序的行位置，区间查询和最紧急的前K个都用二分查找
+"""
+
+import numpy as np
+import pandas as pd
+
+# 到期分布（备注3）：剩余天数 <3 即将到期，<7 1周内到期，其余正常
+EXPIRY_BUCKETS = (('即将到期', 3), ('1周内到期', 7))
+NORMAL_BUCKET = '正常'
+
+
+class ExpiryIndex:
+    """剩余天数的排序索引；剩余天数为空的行不参与区间查询，按"正常"计入分布"""
+
+    def __init__(self, remaining):
+        values = pd.to_numeric(pd.Series(remaining), errors='coerce').to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[valid], kind='stable')
+        self.size = len(values)
+        self.positions = valid[order]          # 按剩余天数升序排列的行位置
+        self.values = values[self.positions]   # 对应的剩余天数
+
+    @classmethod
+    def from_frame(cls, df, columns):
+        """按表格的剩余天数列建立索引"""
+        return cls(df[columns['remaining']])
+
+    def between(self, low=-np.inf, high=np.inf):
+        """剩余天数在 [low, high] 内的行位置，按剩余天数升序"""
+        start = np.searchsorted(self.values, low, side='left')
+        stop = np.searchsorted(self.values, high, side='right')
+        return self.positions[start:stop]
+
+    def equal(self, days):
+        """剩余天数等于days的行位置"""
+        return self.between(days, days)
+
+    def within(self, days):
+        """days天内（剩余天数 < days）到期的行位置"""
+        stop = np.searchsorted(self.values, days, side='left')
+        return self.positions[:stop]
+
+    def top_k(self, k):
+        """最紧急的前k个行位置（剩余天数最小）"""
+        return self.positions[:k]
+
+    def bucket_counts(self):
+        """到期分布的数量"""
+        counts = {}
+        previous = 0
+        for label, limit in EXPIRY_BUCKETS:
+            stop = np.searchsorted(self.values, limit, side='left')
+            counts[label] = int(stop - previous)
+            previous = stop
+        counts[NORMAL_BUCKET] = int(self.size - previous)
+        return counts
+
+    def bucket_labels(self):
+        """每一行的到期分布标签（按原行顺序）"""
+        labels = np.full(self.size, NORMAL_BUCKET, dtype=object)
+        previous = 0
+        for label, limit in EXPIRY_BUCKETS:
+            stop = np.searchsorted(self.values, limit, side='left')
+            labels[self.positions[previous:stop]] = label
+            previous = stop
+        return labels
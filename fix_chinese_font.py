@@ -6,6 +6,8 @@ import matplotlib.font_manager as fm
 import platform
 import os
 
+from font_resolver import resolve_cjk_font
+
 def list_available_fonts():
     """列出所有可用的中文字体"""
     print("🔍 检查系统中可用的中文字体...")
@@ -76,41 +78,17 @@ def install_fonts_linux():
     print("  sudo yum install wqy-microhei-fonts wqy-zenhei-fonts")
 
 def create_font_config():
-    """创建字体配置文件"""
-    system = platform.system()
-    
-    if system == 'Darwin':  # macOS
-        font_list = ['PingFang SC', 'Hiragino Sans GB', 'STHeiti', 'SimHei', 'Arial Unicode MS']
-    elif system == 'Windows':  # Windows
-        font_list = ['SimHei', 'Microsoft YaHei', 'KaiTi', 'FangSong']
-    else:  # Linux
-        font_list = ['WenQuanYi Micro Hei', 'WenQuanYi Zen Hei', 'Noto Sans CJK SC', 'SimHei']
-    
-    config_code = f'''# 字体配置代码
-import matplotlib.pyplot as plt
-import platform
+    """创建字体配置文件（font_config.py 通过 font_resolver 使用缓存的字体路径）"""
+    config_code = '''# 字体配置代码
+from font_resolver import setup_matplotlib_font
+
 
 def setup_chinese_font():
-    """设置中文字体"""
-    system = platform.system()
-    
-    if system == 'Darwin':  # macOS
-        font_list = {font_list}
-    elif system == 'Windows':  # Windows
-        font_list = {font_list}
-    else:  # Linux
-        font_list = {font_list}
-    
-    # 尝试设置字体
-    for font in font_list:
-        try:
-            plt.rcParams['font.sans-serif'] = [font]
-            plt.rcParams['axes.unicode_minus'] = False
-            print(f"✅ 使用字体: {{font}}")
-            return font
-        except:
-            continue
-    
+    """设置中文字体（由 font_resolver 解析并缓存字体路径）"""
+    font_list = setup_matplotlib_font()
+    if len(font_list) > 1:
+        print(f"✅ 使用字体: {font_list[0]}")
+        return font_list[0]
     print("⚠️ 未找到合适的中文字体")
     return None
 
@@ -156,7 +134,10 @@ def main():
         for font in working_fonts:
             print(f"  - {font}")
         
-        # 创建配置文件
+        # 解析并缓存中文字体路径，创建配置文件
+        resolved = resolve_cjk_font()
+        if resolved is not None:
+            print(f"🔤 已缓存字体路径: {resolved['family']} -> {resolved['path']}")
         create_font_config()
         
         print(f"\n🎉 建议在代码中使用: {working_fonts[0]}")
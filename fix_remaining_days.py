@@ -6,7 +6,11 @@
 
 import pandas as pd
 from datetime import datetime
-import shutil
+
+from date_parser import parse_date_column
+from excel_loader import load_table
+from excel_writer import save_changes
+from backup_store import BACKUP_DIR, backup_workbook
 
 def fix_remaining_days():
     """修复剩余天数计算"""
@@ -14,14 +18,15 @@ def fix_remaining_days():
     
     # 备份原文件（如果可能的话）
     try:
-        shutil.copy2('yxc.xlsx', 'yxc_backup_before_fix.xlsx')
-        print("✅ 已备份原文件: yxc_backup_before_fix.xlsx")
+        backup_workbook('yxc.xlsx')
+        print(f"✅ 已备份原文件到: {BACKUP_DIR}")
     except Exception as e:
         print(f"⚠️ 备份失败，继续执行: {e}")
     
     # 读取Excel文件
-    df = pd.read_excel('yxc.xlsx')
+    df = load_table('yxc.xlsx')
     print(f"✅ 读取Excel文件，共 {len(df)} 行数据")
+    original_df = df.copy()
     
     # 查找关键列
     columns = {
@@ -33,39 +38,23 @@ def fix_remaining_days():
     current_date = datetime.now()
     print(f"📅 当前日期: {current_date.strftime('%Y%m%d')}")
     
-    # 重新计算剩余天数
-    fixed_count = 0
-    for idx, row in df.iterrows():
-        start_date_str = str(row[columns['start_date']])
-        total_days = int(row[columns['total']])
-        old_remaining = int(row[columns['remaining']])
-        
-        # 解析开始时间
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y%m%d')
-            
-            # 计算已过去的天数
-            days_passed = (current_date - start_date).days
-            
-            # 计算正确的剩余天数
-            correct_remaining = max(0, total_days - days_passed)
-            
-            # 更新剩余天数
-            df.at[idx, columns['remaining']] = correct_remaining
-            
-            store_name = row.get(' 店铺名称', f'行{idx+1}')
-            print(f"📊 {store_name}: 开始{start_date_str}, 总{total_days}天, 已过{days_passed}天, {old_remaining}→{correct_remaining}")
-            
-            if old_remaining != correct_remaining:
-                fixed_count += 1
-                
-        except Exception as e:
-            print(f"❌ 处理行{idx+1}失败: {e}")
+    # 重新计算剩余天数（整列解析开始时间，无法解析的行会汇总提示并保持原值）
+    start_dates, bad_rows = parse_date_column(df[columns['start_date']])
+    total_days = pd.to_numeric(df[columns['total']], errors='coerce')
+    old_remaining = pd.to_numeric(df[columns['remaining']], errors='coerce')
+    
+    # 计算已过去的天数和正确的剩余天数
+    days_passed = (pd.Timestamp(current_date.strftime('%Y-%m-%d')) - start_dates).dt.days
+    correct_remaining = (total_days - days_passed).clip(lower=0)
+    valid = correct_remaining.notna()
+    df.loc[valid, columns['remaining']] = correct_remaining[valid].astype('int64')
+    
+    fixed_count = int((valid & (correct_remaining != old_remaining)).sum())
     
     print(f"\n✅ 修复了 {fixed_count} 个项目的剩余天数")
     
     # 保存修复后的文件
-    df.to_excel('yxc.xlsx', index=False)
+    save_changes('yxc.xlsx', original_df, df)
     print("💾 已保存修复后的Excel文件")
     
     # 显示修复后的状态
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import pandas as pd
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
+from excel_loader import load_table
+from backup_store import BACKUP_DIR, backup_workbook
 
 # 加载环境变量
 load_dotenv()
@@ -17,7 +18,7 @@ def main():
     
     try:
         # 读取Excel文件
-        df = pd.read_excel(excel_file)
+        df = load_table(excel_file)
         print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
         
         # 查找开始时间列
@@ -49,7 +50,7 @@ def main():
             
             # 计算新的开始日期：今天减去已经过去的天数
             # 假设剩余天数应该是当前剩余天数，那么已经过去的天数 = 总天数 - 当前剩余天数
-            days_passed = total_days - current_remaining
+            days_passed = int(total_days - current_remaining)
             
             # 新的开始日期 = 今天 - 已经过去的天数
             new_start_date = today - timedelta(days=days_passed)
@@ -66,9 +67,8 @@ def main():
             df.at[idx, start_date_col] = int(new_start_date_str)
         
         # 保存文件
-        backup_file = f"{excel_file.replace('.xlsx', '')}_backup_before_fix.xlsx"
-        df.to_excel(backup_file, index=False)
-        print(f"\n💾 已备份原文件为: {backup_file}")
+        backup_workbook(excel_file)
+        print(f"\n💾 已备份原文件到: {BACKUP_DIR}")
         
         df.to_excel(excel_file, index=False)
         print(f"✅ 已更新Excel文件: {excel_file}")
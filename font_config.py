@@ -1,28 +1,13 @@
 # 字体配置代码
-import matplotlib.pyplot as plt
-import platform
+from font_resolver import setup_matplotlib_font
+
 
 def setup_chinese_font():
-    """设置中文字体"""
-    system = platform.system()
-    
-    if system == 'Darwin':  # macOS
-        font_list = ['PingFang SC', 'Hiragino Sans GB', 'STHeiti', 'SimHei', 'Arial Unicode MS']
-    elif system == 'Windows':  # Windows
-        font_list = ['PingFang SC', 'Hiragino Sans GB', 'STHeiti', 'SimHei', 'Arial Unicode MS']
-    else:  # Linux
-        font_list = ['PingFang SC', 'Hiragino Sans GB', 'STHeiti', 'SimHei', 'Arial Unicode MS']
-    
-    # 尝试设置字体
-    for font in font_list:
-        try:
-            plt.rcParams['font.sans-serif'] = [font]
-            plt.rcParams['axes.unicode_minus'] = False
-            print(f"✅ 使用字体: {font}")
-            return font
-        except:
-            continue
-    
+    """设置中文字体（由 font_resolver 解析并缓存字体路径）"""
+    font_list = setup_matplotlib_font()
+    if len(font_list) > 1:
+        print(f"✅ 使用字体: {font_list[0]}")
+        return font_list[0]
     print("⚠️ 未找到合适的中文字体")
     return None
 
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中文字体解析 - 找一次能显示中文的字体文件并记住路径，之后直接加载，不再重建matplotlib字体缓存
+
+fontManager.__init__() 会重新扫描系统里的所有字体，每次要花几秒；这里只检查已知的字体文件
+（找不到时才扫描字体目录），结果保存在缓存目录的 font_cache.json 中。
+"""
+
+import glob
+import json
+import os
+from functools import lru_cache
+
+from excel_schema import CACHE_DIR
+
+FONT_CACHE_FILE = os.path.join(CACHE_DIR, 'font_cache.json')
+
+# 按优先级排列的中文字体文件：文泉驿、Noto CJK、冬青黑体、苹方、黑体、雅黑
+CJK_FONT_FILES = [
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/System/Library/Fonts/Hiragino Sans GB.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:/Windows/Fonts/simhei.ttf',
+    'C:/Windows/Fonts/msyh.ttc',
+]
+
+# 已知路径都不存在时，在这些目录里按文件名关键词查找
+FONT_DIRS = ['/usr/share/fonts', '/usr/local/share/fonts', os.path.expanduser('~/.fonts'),
+             os.path.expanduser('~/.local/share/fonts'), '/System/Library/Fonts', '/Library/Fonts',
+             'C:/Windows/Fonts']
+FONT_KEYWORDS = ['wqy', 'notosanscjk', 'notosanssc', 'sourcehansans', 'hiragino', 'pingfang',
+                 'stheiti', 'simhei', 'msyh', 'droidsansfallback']
+
+# 用来检查字体是否真的包含中文字形
+PROBE_TEXT = '店铺监控'
+
+
+def _file_state(path):
+    """字体文件的大小和修改时间，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def renders_cjk(path):
+    """字体文件是否包含检查用的中文字形"""
+    try:
+        from matplotlib.ft2font import FT2Font
+        font = FT2Font(path)
+        return all(font.get_char_index(ord(char)) for char in PROBE_TEXT)
+    except Exception:
+        return False
+
+
+def _family_name(path):
+    """字体文件的字体族名称"""
+    from matplotlib.ft2font import FT2Font
+    return FT2Font(path).family_name
+
+
+def _candidates():
+    """按优先级列出候选字体文件：先已知路径，再扫描字体目录"""
+    for path in CJK_FONT_FILES:
+        if os.path.exists(path):
+            yield path
+    for directory in FONT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for path in sorted(glob.glob(os.path.join(directory, '**', '*.tt[fc]'), recursive=True) +
+                           glob.glob(os.path.join(directory, '**', '*.otf'), recursive=True)):
+            name = os.path.basename(path).lower().replace('-', '').replace('_', '').replace(' ', '')
+            if any(keyword in name for keyword in FONT_KEYWORDS):
+                yield path
+
+
+def _load_cache():
+    """读取上次解析的结果，字体文件已变化或不存在时返回None"""
+    try:
+        with open(FONT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('path') and _file_state(cached['path']) == cached.get('state'):
+        return cached
+    return None
+
+
+def _save_cache(resolved):
+    """保存解析结果（临时文件 + 原子替换）"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{FONT_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(resolved, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, FONT_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ 保存字体缓存失败: {e}")
+
+
+@lru_cache(maxsize=None)
+def resolve_cjk_font():
+    """
+    能显示中文的字体，返回 {'path': 字体文件, 'family': 字体族名称}，找不到时返回None
+
+    先用缓存的结果；没有缓存或字体文件变了才重新检查候选字体。
+    """
+    cached = _load_cache()
+    if cached is not None:
+        return {'path': cached['path'], 'family': cached['family']}
+
+    for path in _candidates():
+        if renders_cjk(path):
+            resolved = {'path': path, 'family': _family_name(path), 'state': _file_state(path)}
+            _save_cache(resolved)
+            print(f"🔤 找到中文字体: {resolved['family']} ({path})")
+            return {'path': path, 'family': resolved['family']}
+
+    print("⚠️ 未找到中文字体，中文可能显示为方框")
+    return None
+
+
+@lru_cache(maxsize=None)
+def _register_font():
+    """把解析到的中文字体注册到matplotlib（每个进程一次），返回字体族名称"""
+    resolved = resolve_cjk_font()
+    if resolved is None:
+        return None
+    try:
+        import matplotlib.font_manager as fm
+        fm.fontManager.addfont(resolved['path'])
+        return resolved['family']
+    except Exception as e:
+        print(f"⚠️ 注册字体失败 {resolved['path']}: {e}")
+        return None
+
+
+def setup_matplotlib_font():
+    """把中文字体设为matplotlib的默认字体，返回字体列表（不重建字体缓存）"""
+    import matplotlib.pyplot as plt
+
+    family = _register_font()
+    font_list = [family, 'DejaVu Sans'] if family else ['DejaVu Sans']
+    plt.rcParams['font.sans-serif'] = font_list
+    plt.rcParams['axes.unicode_minus'] = False
+    return font_list
+
+
+def main():
+    """命令行：解析并缓存中文字体（可在安装字体后运行一次）"""
+    if os.path.exists(FONT_CACHE_FILE):
+        os.remove(FONT_CACHE_FILE)
+    resolved = resolve_cjk_font()
+    if resolved is not None:
+        print(f"✅ 中文字体: {resolved['family']} -> {resolved['path']}")
+
+
+if __name__ == "__main__":
+    main()
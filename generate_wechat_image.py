@@ -1,22 +1,23 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
 from datetime import datetime
 import os
 
+from excel_loader import TABLE_FIELDS, load_table
+from font_resolver import setup_matplotlib_font
+
 def generate_wechat_image():
     """生成适合微信群发送的图片"""
     try:
         # 读取Excel文件
-        df = pd.read_excel('yxc.xlsx')
+        df = load_table('yxc.xlsx', TABLE_FIELDS)
         print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
         
         # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+        setup_matplotlib_font()
         
         # 创建图形（适合手机屏幕的尺寸）
         fig, ax = plt.subplots(figsize=(12, 16))
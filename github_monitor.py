@@ -4,26 +4,32 @@
 GitHub Actions监控脚本 - 执行一次检查
 """
 
-import pandas as pd
-import smtplib
 import requests
 import os
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from dotenv import load_dotenv
+from backup_store import BACKUP_DIR, backup_workbook
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from render_cache import get_render, put_render, render_key
+from raster_table import render_table, renderer_name, use_pillow
+from expiry_checker import ExpiryCheckerBase
+from expiry_engine import find_expired
+from run_watermark import get_beijing_time, write_last_run
+from smtp_transport import close_transports, send_mail
 import io
+from font_resolver import setup_matplotlib_font
 
 # 加载环境变量
 load_dotenv()
 
-class GitHubExpiryChecker:
+class GitHubExpiryChecker(ExpiryCheckerBase):
     def __init__(self):
+        super().__init__()
         self.excel_file = "yxc.xlsx"
-        self.backup_file = "yxc_backup.xlsx"
         self.notification_config = {
             'email': {
                 'enabled': os.getenv('EMAIL_ENABLED', 'false').lower() == 'true',
@@ -45,19 +51,19 @@ class GitHubExpiryChecker:
             }
         }
     
-    def backup_excel(self):
-        """备份Excel文件"""
+    def backup_excel(self, now=None):
+        """备份Excel文件（去重快照 + 行级增量，见 backup_store），now 为版本时间"""
         try:
-            import shutil
-            shutil.copy2(self.excel_file, self.backup_file)
-            print(f"✅ Excel文件已备份: {self.backup_file}")
+            backup_workbook(self.excel_file, now)
+            print(f"✅ Excel文件已备份到: {BACKUP_DIR}")
         except Exception as e:
             print(f"❌ 备份失败: {e}")
     
     def read_excel_file(self):
         """读取Excel文件"""
         try:
-            df = pd.read_excel(self.excel_file)
+            df = load_table(self.excel_file)
+            self.original_df = df.copy()
             print(f"✅ 成功读取Excel文件: {self.excel_file}")
             print(f"📊 表格形状: {df.shape}")
             return df
@@ -65,139 +71,23 @@ class GitHubExpiryChecker:
             print(f"❌ 读取Excel文件失败: {e}")
             return None
     
-    def save_excel_file(self, df):
-        """保存Excel文件"""
-        try:
-            df.to_excel(self.excel_file, index=False)
-            print(f"✅ Excel文件已保存: {self.excel_file}")
-            return True
-        except Exception as e:
-            print(f"❌ 保存Excel文件失败: {e}")
-            return False
-    
     def find_columns(self, df):
         """查找关键列"""
-        columns = {}
-        
-        # 查找剩余天数列
-        possible_remaining = ['剩余天数', '剩余时间', '到期天数', '过期天数', '天数', 'days', 'remaining_days', '剩余', '到期', '过期']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_remaining:
-                if name in col_str:
-                    columns['remaining'] = col
-                    break
-            if 'remaining' in columns:
-                break
-        
-        # 查找总天数列
-        possible_total = ['总天数', '总时间', '总天', 'total_days', 'total', '天']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_total:
-                if name in col_str:
-                    columns['total'] = col
-                    break
-            if 'total' in columns:
-                break
-        
-        # 查找开始时间列
-        possible_start = ['开始时间', '开始日期', 'start_date', 'start_time', '开始']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_start:
-                if name in col_str:
-                    columns['start_date'] = col
-                    break
-            if 'start_date' in columns:
-                break
-        
+        columns = resolve_columns(df.columns)
         print(f"🎯 找到的列: {columns}")
         return columns
     
-    def update_expired_items(self, df, columns):
-        """更新到期项目"""
-        updated_items = []
-        current_date = datetime.now()
-        
-        for idx, row in df.iterrows():
-            remaining = row[columns['remaining']]
-            total = row[columns['total']]
-            start_date = row[columns['start_date']]
-            
-            # 如果剩余天数为0，需要重置
-            if pd.notna(remaining) and int(remaining) == 0:
-                row_num = row.get('行号', idx+1)
-                print(f"🔄 重置项目: {row.get(' 店铺名称', f'行{row_num}')}")
-                
-                # 更新开始时间为今天
-                new_start_date = current_date.strftime('%Y%m%d')
-                # 确保日期格式正确，保持与原始数据类型一致
-                if pd.api.types.is_integer_dtype(df[columns['start_date']]):
-                    df.at[idx, columns['start_date']] = int(new_start_date)
-                else:
-                    df.at[idx, columns['start_date']] = str(new_start_date)
-                
-                # 重置剩余天数为总天数
-                df.at[idx, columns['remaining']] = total
-                
-                updated_items.append({
-                    'row': row.get('行号', idx + 1),
-                    'name': row.get(' 店铺名称', f'行{row.get("行号", idx+1)}'),
-                    'address': row.get('地址', '未知地址'),
-                    'total_days': total,
-                    'old_start': start_date,
-                    'new_start': new_start_date
-                })
-        
-        return updated_items
-    
-    def update_remaining_days(self, df, columns):
-        """更新所有项目的剩余天数 - 每天减1"""
-        updated_count = 0
-        
-        for idx, row in df.iterrows():
-            current_remaining = row[columns['remaining']]
-            
-            # 如果当前剩余天数为0，跳过（这些会在update_expired_items中处理）
-            if pd.notna(current_remaining) and int(current_remaining) == 0:
-                row_num = row.get('行号', idx+1)
-                print(f"⏭️  跳过减1: {row.get(' 店铺名称', f'行{row_num}')} 已经是0天")
-                continue
-            
-            # 如果剩余天数不为0，每天减1
-            if pd.notna(current_remaining) and int(current_remaining) > 0:
-                old_remaining = int(current_remaining)
-                new_remaining = max(0, old_remaining - 1)  # 不能小于0
-                
-                df.at[idx, columns['remaining']] = new_remaining
-                updated_count += 1
-                row_num = row.get('行号', idx+1)
-                print(f"📅 剩余天数减1: {row.get(' 店铺名称', f'行{row_num}')} {old_remaining} → {new_remaining}")
-        
-        return updated_count
-    
     def check_expiry_items(self, df, columns):
         """检查剩余天数为0的项目"""
         expired_items = []
         
         try:
-            # 确保剩余天数列是数值类型
-            df[columns['remaining']] = pd.to_numeric(df[columns['remaining']], errors='coerce')
+            expired_items = find_expired(df, columns)
             
-            # 查找剩余天数为0的项目
-            expired_mask = df[columns['remaining']] == 0
-            expired_df = df[expired_mask]
-            
-            if not expired_df.empty:
-                print(f"🚨 发现 {len(expired_df)} 个剩余天数为0的项目:")
-                for idx, row in expired_df.iterrows():
-                    item_info = {
-                        'row': row.get('行号', idx + 1),
-                        'data': row.to_dict()
-                    }
-                    expired_items.append(item_info)
-                    print(f"  行 {row.get('行号', idx + 1)}: {dict(row)}")
+            if expired_items:
+                print(f"🚨 发现 {len(expired_items)} 个剩余天数为0的项目:")
+                for item in expired_items:
+                    print(f"  行 {item['row']}: {item['data']}")
             else:
                 print("✅ 没有发现剩余天数为0的项目")
                 
@@ -209,15 +99,6 @@ class GitHubExpiryChecker:
     def create_table_image(self, df, title="项目监控表"):
         """创建表格图片"""
         try:
-            # 设置中文字体
-            plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-            plt.rcParams['axes.unicode_minus'] = False
-            
-            # 创建图形
-            fig, ax = plt.subplots(figsize=(16, 10))
-            ax.axis('tight')
-            ax.axis('off')
-            
             # 准备表格数据
             table_data = []
             for idx, row in df.iterrows():
@@ -229,6 +110,30 @@ class GitHubExpiryChecker:
                     str(row.get('开始时间', ''))
                 ])
             
+            # 同样的数据、标题和样式已经画过时直接用缓存的图片
+            cache_key = render_key(table_data, title, ['github-monitor', renderer_name()], 300)
+            cached = get_render(cache_key)
+            if cached is not None:
+                return cached
+            
+            if use_pillow():
+                zero_rows = [i for i, row in enumerate(table_data) if row[3] == '0']
+                img_buffer = render_table(table_data, ['店铺名称', '地址', '总天', '剩余', '开始时间'], title,
+                                          highlight=zero_rows, font_size=10, dpi=300, header_style=False,
+                                          highlight_fill='#ffcccc', highlight_color='red')
+                put_render(cache_key, img_buffer.getvalue())
+                return img_buffer
+            
+            import matplotlib.pyplot as plt
+            
+            # 设置中文字体
+            setup_matplotlib_font()
+            
+            # 创建图形
+            fig, ax = plt.subplots(figsize=(16, 10))
+            ax.axis('tight')
+            ax.axis('off')
+            
             # 创建表格
             table = ax.table(
                 cellText=table_data,
@@ -260,121 +165,131 @@ class GitHubExpiryChecker:
             img_buffer.seek(0)
             
             plt.close()
+            put_render(cache_key, img_buffer.getvalue())
             return img_buffer
             
         except Exception as e:
             print(f"❌ 创建表格图片失败: {e}")
             return None
     
-    def send_email_notification(self, expired_items, updated_items, df=None):
-        """发送邮件通知"""
-        if not self.notification_config['email']['enabled']:
-            print("邮件通知未启用")
-            return False
+    def build_email_message(self, expired_items, updated_items, df=None, image=None, pages=None):
+        """
+        生成通知邮件，返回 (邮件, 收件人列表)
+
+        image为已生成的表格图片字节，pages为分页图片字节列表，都没有时根据df生成。
+        """
+        config = self.notification_config['email']
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        try:
-            config = self.notification_config['email']
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # 创建邮件内容
-            subject = f"智能监控报告 - {len(expired_items)}个到期项目，{len(updated_items)}个项目已重置"
+        # 创建表格图片（分页模式下每页一张，按页序内嵌）
+        if image is None and not pages and df is not None:
+            table_image = self.create_table_image(df, "项目监控状态表")
+            image = table_image.getvalue() if table_image else None
+        images = [image] if image else list(pages or [])
+        image_tags = ''.join(f'<img src="cid:table_image_{number}" alt="项目状态表" style="max-width: 100%; height: auto;">'
+                             for number in range(1, len(images) + 1))
+        
+        # 创建邮件内容
+        subject = f"智能监控报告 - {len(expired_items)}个到期项目，{len(updated_items)}个项目已重置"
+        
+        # HTML邮件内容
+        html_body = f"""
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 20px; }}
+                .header {{ background-color: #f0f0f0; padding: 15px; border-radius: 5px; }}
+                .section {{ margin: 20px 0; }}
+                .expired {{ background-color: #ffebee; padding: 10px; border-left: 4px solid #f44336; }}
+                .updated {{ background-color: #e8f5e8; padding: 10px; border-left: 4px solid #4caf50; }}
+                .table-section {{ margin: 20px 0; }}
+                .footer {{ margin-top: 30px; font-size: 12px; color: #666; }}
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h2>🤖 智能监控报告</h2>
+                <p><strong>时间:</strong> {current_time}</p>
+                <p><strong>到期项目数量:</strong> {len(expired_items)}</p>
+                <p><strong>重置项目数量:</strong> {len(updated_items)}</p>
+            </div>
             
-            # HTML邮件内容
-            html_body = f"""
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                    .header {{ background-color: #f0f0f0; padding: 15px; border-radius: 5px; }}
-                    .section {{ margin: 20px 0; }}
-                    .expired {{ background-color: #ffebee; padding: 10px; border-left: 4px solid #f44336; }}
-                    .updated {{ background-color: #e8f5e8; padding: 10px; border-left: 4px solid #4caf50; }}
-                    .table-section {{ margin: 20px 0; }}
-                    .footer {{ margin-top: 30px; font-size: 12px; color: #666; }}
-                </style>
-            </head>
-            <body>
-                <div class="header">
-                    <h2>🤖 智能监控报告</h2>
-                    <p><strong>时间:</strong> {current_time}</p>
-                    <p><strong>到期项目数量:</strong> {len(expired_items)}</p>
-                    <p><strong>重置项目数量:</strong> {len(updated_items)}</p>
-                </div>
-                
-                <div class="section">
-                    <h3>📊 当前项目状态表</h3>
-                    <p>以下是当前所有项目的状态表格：</p>
-                    <img src="cid:table_image" alt="项目状态表" style="max-width: 100%; height: auto;">
-                </div>
+            <div class="section">
+                <h3>📊 当前项目状态表</h3>
+                <p>以下是当前所有项目的状态表格：</p>
+                {image_tags}
+            </div>
+        """
+        
+        if expired_items:
+            html_body += """
+            <div class="section expired">
+                <h3>🚨 到期项目详情</h3>
+                <ul>
             """
-            
-            if expired_items:
-                html_body += """
-                <div class="section expired">
-                    <h3>🚨 到期项目详情</h3>
-                    <ul>
-                """
-                for item in expired_items:
-                    item_data = item['data']
-                    store_name = item_data.get(' 店铺名称', '未知店铺')
-                    address = item_data.get('地址', '未知地址')
-                    total_days = item_data.get('总天', '未知')
-                    html_body += f"<li><strong>行 {item['row']}:</strong> {store_name} - {address} - {total_days}天</li>"
-                html_body += "</ul></div>"
-            
-            if updated_items:
-                html_body += """
-                <div class="section updated">
-                    <h3>🔄 已重置项目</h3>
-                    <ul>
-                """
-                for item in updated_items:
-                    html_body += f"<li><strong>行 {item['row']}:</strong> {item['name']} - {item['address']} - 重置为{item['total_days']}天</li>"
-                html_body += "</ul></div>"
-            
+            for item in expired_items:
+                item_data = item['data']
+                store_name = item_data.get(' 店铺名称', '未知店铺')
+                address = item_data.get('地址', '未知地址')
+                total_days = item_data.get('总天', '未知')
+                html_body += f"<li><strong>行 {item['row']}:</strong> {store_name} - {address} - {total_days}天</li>"
+            html_body += "</ul></div>"
+        
+        if updated_items:
             html_body += """
-                <div class="footer">
-                    <p>此邮件由智能监控系统自动发送，请及时处理到期项目！</p>
-                    <p>如有问题，请联系系统管理员。</p>
-                </div>
-            </body>
-            </html>
+            <div class="section updated">
+                <h3>🔄 已重置项目</h3>
+                <ul>
             """
-            
-            # 创建邮件对象
-            msg = MIMEMultipart('related')
-            msg['From'] = config['username']
-            
-            # 处理多个接收者
-            to_emails = [email.strip() for email in config['to_email'].split(',')]
-            msg['To'] = ', '.join(to_emails)
-            msg['Subject'] = subject
-            
-            # 添加HTML内容
-            html_part = MIMEText(html_body, 'html', 'utf-8')
-            msg.attach(html_part)
-            
-            # 创建并添加表格图片
-            if df is not None:
-                table_image = self.create_table_image(df, "项目监控状态表")
-                if table_image:
-                    image_part = MIMEImage(table_image.getvalue())
-                    image_part.add_header('Content-ID', '<table_image>')
-                    image_part.add_header('Content-Disposition', 'inline', filename='table.png')
-                    msg.attach(image_part)
-                    print("✅ 表格图片已添加到邮件")
+            for item in updated_items:
+                html_body += f"<li><strong>行 {item['row']}:</strong> {item['name']} - {item['address']} - 重置为{item['total_days']}天</li>"
+            html_body += "</ul></div>"
+        
+        html_body += """
+            <div class="footer">
+                <p>此邮件由智能监控系统自动发送，请及时处理到期项目！</p>
+                <p>如有问题，请联系系统管理员。</p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        # 创建邮件对象
+        msg = MIMEMultipart('related')
+        msg['From'] = config['username']
+        
+        # 处理多个接收者
+        to_emails = [email.strip() for email in config['to_email'].split(',')]
+        msg['To'] = ', '.join(to_emails)
+        msg['Subject'] = subject
+        
+        # 添加HTML内容
+        html_part = MIMEText(html_body, 'html', 'utf-8')
+        msg.attach(html_part)
+        
+        # 添加表格图片
+        for number, data in enumerate(images, 1):
+            image_part = MIMEImage(data)
+            image_part.add_header('Content-ID', f'<table_image_{number}>')
+            image_part.add_header('Content-Disposition', 'inline', filename=f'table_{number}.png')
+            msg.attach(image_part)
+        if images:
+            print(f"✅ {len(images)} 张表格图片已添加到邮件")
+        
+        return msg, to_emails
+    
+    def send_email_notification(self, expired_items, updated_items, df=None, image=None):
+        """发送邮件通知（image为已生成的表格图片字节，没有时根据df生成）"""
+        if not self.notification_config['email']['enabled']:
+            print("邮件通知未启用")
+            return False
+        
+        try:
+            msg, to_emails = self.build_email_message(expired_items, updated_items, df, image)
             
             # 发送邮件
-            if config['smtp_port'] == 465:
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg, to_addrs=to_emails)
-            server.quit()
+            send_mail(self.notification_config['email'], msg, to_addrs=to_emails)
             
             print("✅ 增强版邮件通知发送成功")
             print(f"📧 邮件已发送到: {', '.join(to_emails)}")
@@ -421,7 +336,8 @@ GitHub监控报告 - 项目到期提醒
     
     def run_check(self):
         """执行一次检查流程"""
-        print(f"\n=== 开始执行GitHub监控任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+        self.current_date = get_beijing_time()
+        print(f"\n=== 开始执行GitHub监控任务 - {self.current_date.strftime('%Y-%m-%d %H:%M:%S')} ===")
         
         # 备份Excel文件
         self.backup_excel()
@@ -435,9 +351,13 @@ GitHub监控报告 - 项目到期提醒
         # 查找关键列
         columns = self.find_columns(df)
         
-        # 第一步：先更新剩余天数（每天减1）
-        updated_count = self.update_remaining_days(df, columns)
-        print(f"📅 更新了 {updated_count} 个项目的剩余天数（每天减1）")
+        # 第一步：先更新剩余天数（每天减1，日期模式下按到期日期推导）
+        needs_save = True
+        if self.expiry_mode == 'date':
+            needs_save = self.derive_remaining_days(df, columns)
+        else:
+            updated_count = self.update_remaining_days(df, columns)
+            print(f"📅 更新了 {updated_count} 个项目的剩余天数")
         
         # 第二步：检查到期项目（减1后可能变成0的项目）
         expired_items = self.check_expiry_items(df, columns)
@@ -453,10 +373,16 @@ GitHub监控报告 - 项目到期提醒
         updated_items = self.update_expired_items(df, columns)
         print(f"🔄 重置了 {len(updated_items)} 个到期项目")
         
-        # 保存更新后的Excel文件
-        if self.save_excel_file(df):
+        # 保存更新后的Excel文件（日期模式下只有重置或首次生成到期日期时才写入）
+        if not (needs_save or updated_items):
+            print("📄 日期模式下没有需要写入的变化，跳过保存")
+        elif self.save_excel_file(df):
             print("💾 Excel文件已更新并保存")
+            if self.expiry_mode != 'date':
+                write_last_run(self.excel_file, self.run_date())
         
+        # 关闭本次运行共用的SMTP连接并输出耗时
+        close_transports()
         print("=== GitHub监控任务完成 ===\n")
 
 def main():
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP连接复用 - 所有webhook和短信接口共用一个保持连接的 requests.Session，统一超时和重试
+
+同一个机器人的文字消息和图片消息走同一个TLS连接；服务器返回5xx/429，或企业微信、钉钉返回
+限流错误码时，按指数退避重试。只在请求确定没有送达时重试（连接失败、连接超时、5xx、限流），
+读超时不重试，避免群里收到重复消息。
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import acquire, is_webhook
+
+# 连接超时和读超时（秒）
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+
+# 最多重试次数和退避的初始等待（秒），第n次重试等待 HTTP_BACKOFF * 2^(n-1)，最长 HTTP_BACKOFF_MAX
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '1'))
+HTTP_BACKOFF_MAX = 30.0
+
+# 需要退避重试的业务错误码：-1 系统繁忙、45009 接口调用超过限制（企业微信），130101 发送太快（钉钉）
+THROTTLE_ERRCODES = {-1, 45009, 130101}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """进程内共用的Session（连接池可同时给多个发送线程使用）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def close_session():
+    """关闭连接池"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _errcode(response):
+    """JSON响应中的errcode，没有时返回None"""
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get('errcode') if isinstance(body, dict) else None
+
+
+def _retry_reason(response):
+    """响应需要重试时返回原因，否则返回None"""
+    if response.status_code >= 500 or response.status_code == 429:
+        return f"HTTP {response.status_code}"
+    errcode = _errcode(response)
+    if errcode in THROTTLE_ERRCODES:
+        return f"errcode {errcode}"
+    return None
+
+
+def _backoff(attempt, response=None):
+    """第attempt次重试前的等待时间，服务器给了Retry-After时按它等待"""
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), HTTP_BACKOFF_MAX)
+    return min(HTTP_BACKOFF * 2 ** (attempt - 1), HTTP_BACKOFF_MAX)
+
+
+def request(method, url, retries=None, **kwargs):
+    """
+    发送HTTP请求，返回最后一次的响应；重试用完仍连接失败时抛出异常
+
+    kwargs 与 requests 相同，未指定 timeout 时使用 (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)。
+    上传文件等请求体只能读一次时传 retries=0。
+    """
+    retries = HTTP_RETRIES if retries is None else retries
+    kwargs.setdefault('timeout', (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    attempt = 0
+    while True:
+        # 群机器人按每个地址的配额排队（重试同样占配额）
+        if is_webhook(url):
+            acquire(url)
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            # ConnectTimeout 是 ConnectionError 的子类；ReadTimeout 不是，直接抛出
+            if attempt >= retries:
+                raise
+            attempt += 1
+            wait = _backoff(attempt)
+            print(f"⚠️ 连接失败，{wait:.0f}秒后第{attempt}次重试: {e}")
+            time.sleep(wait)
+            continue
+
+        reason = _retry_reason(response)
+        if reason is None or attempt >= retries:
+            return response
+        attempt += 1
+        wait = _backoff(attempt, response)
+        print(f"⚠️ 服务器繁忙（{reason}），{wait:.0f}秒后第{attempt}次重试")
+        time.sleep(wait)
+
+
+def post_json(url, payload, **kwargs):
+    """POST JSON请求体（webhook和短信接口）"""
+    return request('POST', url, json=payload, **kwargs)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片编码 - 发送前把表格图片压到字节预算以内：调色板量化 + PNG最大压缩，仍超出时按比例降低分辨率
+
+表格只有白底、黑字、灰色表头和红色高亮几种颜色，转成调色板PNG后通常只有原图的三分之一；
+企业微信图片消息上限2MB，且base64后的JSON请求体还要再大三分之一。
+"""
+
+import io
+import os
+import time
+
+from PIL import Image
+
+# 图片大小上限（字节，企业微信为2MB），分页渲染也按这个上限控制每页行数
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(2 * 1024 * 1024)))
+
+# 调色板颜色数（0表示不量化，保留RGB）和最低缩放比例
+IMAGE_COLORS = int(os.getenv('IMAGE_COLORS', '64'))
+IMAGE_MIN_SCALE = float(os.getenv('IMAGE_MIN_SCALE', '0.5'))
+
+
+def _save_png(image, dpi):
+    """按最大压缩保存PNG"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True, dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+def _next_scale(scale, size, max_bytes):
+    """下一次的缩放比例：文件大小约与面积成正比，按超出比例的平方根缩小，每次至少缩小5%"""
+    target = scale * (max_bytes / size) ** 0.5 * 0.95
+    return max(IMAGE_MIN_SCALE, min(target, scale - 0.05))
+
+
+def encode_image(data, max_bytes=None, colors=None):
+    """
+    把PNG字节压到 max_bytes 以内，返回 (图片字节, 编码设置)
+
+    编码设置: {'bytes', 'original_bytes', 'colors', 'scale', 'dpi', 'seconds'}；
+    编码后没有变小且原图不超过预算时返回原图，无法解析的数据原样返回。
+    """
+    max_bytes = IMAGE_MAX_BYTES if max_bytes is None else max_bytes
+    colors = IMAGE_COLORS if colors is None else colors
+    start = time.perf_counter()
+    settings = {'bytes': len(data), 'original_bytes': len(data), 'colors': None, 'scale': 1.0,
+                'dpi': None, 'seconds': 0.0}
+
+    try:
+        source = Image.open(io.BytesIO(data))
+        dpi = float(source.info.get('dpi', (72, 72))[0])
+        settings['dpi'] = round(dpi)
+        rgb = source.convert('RGB')
+    except Exception as e:
+        print(f"⚠️ 无法解析图片，按原样发送: {e}")
+        return data, settings
+
+    scale = 1.0
+    while True:
+        frame = rgb
+        if scale < 1.0:
+            frame = rgb.resize((max(1, round(rgb.width * scale)), max(1, round(rgb.height * scale))),
+                               Image.Resampling.LANCZOS)
+        if colors:
+            frame = frame.quantize(colors=colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        encoded = _save_png(frame, dpi * scale)
+        if len(encoded) <= max_bytes or scale <= IMAGE_MIN_SCALE:
+            break
+        scale = _next_scale(scale, len(encoded), max_bytes)
+
+    settings['seconds'] = time.perf_counter() - start
+    if len(encoded) >= len(data) and len(data) <= max_bytes:
+        print(f"🗜️ 图片编码未变小，发送原图: {len(data) / 1024:.0f}KB")
+        return data, settings
+
+    settings.update(bytes=len(encoded), colors=colors or None, scale=round(scale, 3), dpi=round(dpi * scale))
+    palette = f"{colors}色调色板" if colors else "RGB"
+    print(f"🗜️ 图片编码: {len(data) / 1024:.0f}KB -> {len(encoded) / 1024:.0f}KB"
+          f"（{palette}, 缩放{scale:.0%}, dpi {settings['dpi']}, {settings['seconds']:.2f}秒）")
+    if len(encoded) > max_bytes:
+        print(f"⚠️ 图片缩小到 {IMAGE_MIN_SCALE:.0%} 仍超过 {max_bytes / 1024:.0f}KB 上限")
+    return encoded, settings
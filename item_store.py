@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目存储 - 用SQLite保存项目，按到期日期建索引；yxc.xlsx作为导入/导出格式
+
+剩余天数不入库，读取时按 (到期日期 - 今天) 推导；查询"今天到期/N天内到期"走到期日期索引。
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from date_parser import parse_date_column
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from excel_writer import save_changes
+from expiry_engine import restart_cycle
+
+# STORAGE_BACKEND=sqlite 时使用本存储，excel（默认）时直接读写yxc.xlsx
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'excel').lower()
+ITEM_DB = os.getenv('ITEM_DB', 'yxc.db')
+
+# 入库的逻辑列；其他列（备注等）按原列名存为JSON
+ITEM_FIELDS = ('row_number', 'name', 'address', 'total', 'start_date')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    row_number  INTEGER PRIMARY KEY,
+    name        TEXT,
+    address     TEXT,
+    total_days  INTEGER,
+    start_date  TEXT,      -- YYYYMMDD
+    expiry_date TEXT,      -- YYYY-MM-DD，字符串顺序即日期顺序
+    extra       TEXT       -- 其他列的JSON
+);
+CREATE INDEX IF NOT EXISTS idx_items_expiry ON items(expiry_date);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _plain(value):
+    """转换为可入库/可写JSON的Python值"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def _start_text(value):
+    """开始时间按原样存为文本，整数形式的浮点数去掉小数部分"""
+    value = _plain(value)
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _day(current_date):
+    """日期的 YYYY-MM-DD 形式"""
+    return current_date.strftime('%Y-%m-%d')
+
+
+class ItemStore:
+    def __init__(self, path=None):
+        self.path = path or ITEM_DB
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def _meta(self, key, default=None):
+        """读取元数据（JSON）"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def count(self):
+        """项目数量"""
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def import_excel(self, excel_file, current_date):
+        """
+        从Excel导入（替换全部项目），返回导入的项目数
+
+        到期日期 = 开始时间 + 总天（与日期模式的 ensure_expiry_dates 一致）；开始时间或总天为空时
+        按 今天 + 表格中的剩余天数 计算。表格中的剩余天数可能是几天前运行后留下的，不能作为依据。
+        """
+        df = load_table(excel_file)
+        columns = resolve_columns(df.columns)
+        today = pd.Timestamp(_day(current_date))
+
+        if 'row_number' in columns:
+            row_numbers = pd.to_numeric(df[columns['row_number']], errors='coerce')
+        else:
+            row_numbers = pd.Series(np.arange(1, len(df) + 1), index=df.index)
+        total = pd.to_numeric(df[columns['total']], errors='coerce')
+        remaining = pd.to_numeric(df[columns['remaining']], errors='coerce')
+        start, _ = parse_date_column(df[columns['start_date']])
+        expiry = (start + pd.to_timedelta(total, unit='D')).fillna(today + pd.to_timedelta(remaining, unit='D'))
+
+        mapped = {columns[field] for field in ITEM_FIELDS + ('remaining', 'expiry') if field in columns}
+        extra_columns = [col for col in df.columns if col not in mapped]
+        names = df[columns['name']] if 'name' in columns else pd.Series([None] * len(df), index=df.index)
+        addresses = df[columns['address']] if 'address' in columns else pd.Series([None] * len(df), index=df.index)
+        raw_starts = df[columns['start_date']]
+
+        rows = []
+        for i in range(len(df)):
+            extra = {col: _plain(df[col].iat[i]) for col in extra_columns}
+            row_number = row_numbers.iat[i]
+            rows.append((
+                int(row_number) if pd.notna(row_number) else i + 1,
+                _plain(names.iat[i]),
+                _plain(addresses.iat[i]),
+                _plain(total.iat[i]),
+                _start_text(raw_starts.iat[i]),
+                _plain(expiry.iat[i]),
+                json.dumps(extra, ensure_ascii=False),
+            ))
+
+        meta = {
+            'header': [str(col) for col in df.columns],
+            'columns': {field: col for field, col in columns.items() if field != 'notes'},
+            'start_date_integer': bool(pd.api.types.is_integer_dtype(raw_starts)),
+        }
+        with self.conn:
+            self.conn.execute("DELETE FROM items")
+            self.conn.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                  [(key, json.dumps(value, ensure_ascii=False)) for key, value in meta.items()])
+        print(f"📥 已从 {excel_file} 导入 {len(rows)} 个项目到 {self.path}")
+        return len(rows)
+
+    def to_frame(self, current_date, where='', params=()):
+        """按Excel的列名和列顺序返回项目（where为SQL条件），剩余天数由到期日期推导"""
+        header = self._meta('header', [])
+        columns = self._meta('columns', {})
+        query = f"SELECT * FROM items {'WHERE ' + where if where else ''} ORDER BY row_number"
+        items = pd.read_sql_query(query, self.conn, params=params)
+
+        today = pd.Timestamp(_day(current_date))
+        expiry = pd.to_datetime(items['expiry_date'], errors='coerce')
+        remaining = (expiry - today).dt.days.clip(lower=0)
+        start = items['start_date']
+        expiry_text = expiry.dt.strftime('%Y%m%d')
+        if self._meta('start_date_integer', False):
+            # 开始时间原来是整数列时，开始时间和到期日期都按整数导出
+            start, expiry_text = [
+                values.astype('int64') if values.notna().all() else values.astype('Int64')
+                for values in (pd.to_numeric(start, errors='coerce'), pd.to_numeric(expiry_text, errors='coerce'))
+            ]
+
+        values = {
+            columns.get('row_number'): items['row_number'],
+            columns.get('name'): items['name'],
+            columns.get('address'): items['address'],
+            columns.get('total'): items['total_days'],
+            columns.get('remaining'): remaining.astype('int64') if remaining.notna().all() else remaining,
+            columns.get('start_date'): start,
+            columns.get('expiry'): expiry_text,
+        }
+        extras = pd.DataFrame([json.loads(text) for text in items['extra']], index=items.index)
+
+        df = pd.DataFrame(index=items.index)
+        for col in header:
+            if col in values:
+                df[col] = values[col]
+            elif col in extras.columns:
+                df[col] = extras[col]
+            else:
+                df[col] = None
+        return df
+
+    def expiring(self, current_date, days=0):
+        """到期日期在 今天+days 之前（含已过期）的项目，返回 [{'row': 行号, 'data': 行字典}, ...]"""
+        limit = _day(current_date + timedelta(days=days))
+        rows = [row['row_number'] for row in self.conn.execute(
+            "SELECT row_number FROM items WHERE expiry_date <= ? ORDER BY row_number", (limit,))]
+        if not rows:
+            return []
+        df = self.to_frame(current_date, 'expiry_date <= ?', (limit,))
+        return [{'row': row, 'data': data} for row, data in zip(rows, df.to_dict('records'))]
+
+    def reset_expired(self, current_date, commit=True):
+        """
+        到期项目重置，返回重置的项目列表；commit=False 时不提交，由调用方在通知放入发件箱后提交
+
+        新周期由 expiry_engine.restart_cycle 计算（与Excel日期模式相同）：开始时间为今天及以前
+        最后一次到期的日期，漏跑期间的周期不会被丢掉。总天数为空或小于1的项目无法重置，跳过并提示。
+        """
+        expired = self.conn.execute(
+            "SELECT row_number, name, address, total_days, start_date, expiry_date FROM items "
+            "WHERE expiry_date <= ? ORDER BY row_number", (_day(current_date),)).fetchall()
+        rows = []
+        for row in expired:
+            if row['total_days'] is None or int(row['total_days']) < 1:
+                print(f"⚠️ 项目 {row['name'] or '行' + str(row['row_number'])} 的总天数无效，无法重置")
+                continue
+            rows.append(row)
+        if not rows:
+            return []
+
+        last_reset, new_expiry = restart_cycle([row['expiry_date'] for row in rows],
+                                               [row['total_days'] for row in rows],
+                                               pd.Timestamp(_day(current_date)))
+        new_starts = last_reset.dt.strftime('%Y%m%d').tolist()
+        self.conn.executemany("UPDATE items SET start_date = ?, expiry_date = ? WHERE row_number = ?",
+                              zip(new_starts, new_expiry.dt.strftime('%Y-%m-%d').tolist(),
+                                  [row['row_number'] for row in rows]))
+        if commit:
+            self.conn.commit()
+
+        updated_items = []
+        for row, new_start_date in zip(rows, new_starts):
+            name = row['name'] or f"行{row['row_number']}"
+            print(f"🔄 重置项目: {name}")
+            updated_items.append({
+                'row': row['row_number'],
+                'name': name,
+                'address': row['address'] or '未知地址',
+                'total_days': int(row['total_days']),
+                'old_start': row['start_date'],
+                'new_start': new_start_date
+            })
+        return updated_items
+
+    def export_excel(self, excel_file, current_date):
+        """导出到Excel：文件已存在时只写回改动过的单元格，返回写入的单元格数"""
+        df = self.to_frame(current_date)
+        if not os.path.exists(excel_file):
+            df.to_excel(excel_file, index=False)
+            print(f"📤 已导出 {len(df)} 个项目到 {excel_file}")
+            return df.size
+        return save_changes(excel_file, load_table(excel_file), df)
+
+
+def main():
+    """命令行：python item_store.py import|export|expiring [Excel文件或天数]"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'expiring'
+    store = ItemStore()
+    now = datetime.now()
+    try:
+        if command == 'import':
+            store.import_excel(sys.argv[2] if len(sys.argv) > 2 else 'yxc.xlsx', now)
+        elif command == 'export':
+            store.export_excel(sys.argv[2] if len(sys.argv) > 2 else 'yxc.xlsx', now)
+        elif command == 'expiring':
+            days = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+            items = store.expiring(now, days)
+            print(f"📅 {days} 天内到期的项目: {len(items)} 个")
+            for item in items:
+                print(f"  行 {item['row']}: {item['data']}")
+        else:
+            print(f"❌ 未知命令: {command}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
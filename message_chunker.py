@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+消息分段 - 按UTF-8字节数把长文本拆成尽量少的几条消息，在条目边界（行、分布字典的项）处断开并加上编号
+
+企业微信和钉钉的文本消息最长2048字节，超出的消息会被整条拒收；
+剩余天数、备注的分布字典会随表格变长，一个汉字占3个字节。
+"""
+
+import os
+import re
+
+TEXT_MAX_BYTES = int(os.getenv('TEXT_MAX_BYTES', '2048'))
+
+
+def utf8_len(text):
+    """UTF-8字节数"""
+    return len(text.encode('utf-8'))
+
+
+def _label(number, count):
+    """分段编号"""
+    return f"（{number}/{count}）\n"
+
+
+def _cut_bytes(text, budget):
+    """单个条目本身就超长时按字符切开（不会切断多字节字符）"""
+    pieces, current, size = [], '', 0
+    for char in text:
+        width = utf8_len(char)
+        if current and size + width > budget:
+            pieces.append(current)
+            current, size = '', 0
+        current += char
+        size += width
+    return pieces + ([current] if current else [])
+
+
+def _tokens(lines, budget):
+    """
+    依次产生 (连接符, 片段)：每行开头的连接符是换行；超过 budget 的行在 ", " 处（分布字典的各项）
+    拆成片段，后续片段直接接在前一个片段后面，仍超长的项按字符切开
+    """
+    for line in lines:
+        pieces = re.split(r'(?<=, )', line) if utf8_len(line) > budget else [line]
+        first = True
+        for piece in pieces:
+            for fragment in (_cut_bytes(piece, budget) if utf8_len(piece) > budget else [piece]):
+                yield ('\n' if first else ''), fragment
+                first = False
+
+
+def _pack(lines, budget):
+    """按顺序把片段装进每段不超过 budget 字节的消息（顺序装箱时贪心即为最少段数）"""
+    parts, current, size = [], None, 0
+    for joiner, token in _tokens(lines, budget):
+        width = utf8_len(token) + len(joiner)
+        if current is not None and size + width > budget:
+            parts.append(current)
+            current = None
+        if current is None:
+            current, size = token, utf8_len(token)
+        else:
+            current += joiner + token
+            size += width
+    if current is not None:
+        parts.append(current)
+    return [part.strip('\n') for part in parts]
+
+
+def chunk_message(text, max_bytes=None):
+    """
+    把文本拆成每条不超过 max_bytes 字节的消息列表，不超长时原样返回一条
+
+    多条时每条开头加 "（i/n）" 编号，编号占用的字节也计算在内。
+    """
+    max_bytes = TEXT_MAX_BYTES if max_bytes is None else max_bytes
+    if utf8_len(text) <= max_bytes:
+        return [text]
+
+    lines = text.strip('\n').split('\n')
+    count = 2
+    while True:
+        parts = _pack(lines, max_bytes - utf8_len(_label(count, count)))
+        if len(parts) <= count:
+            break
+        count = len(parts)
+    return [_label(number, len(parts)) + part for number, part in enumerate(parts, 1)]
+
+
+def send_in_parts(send, text, max_bytes=None):
+    """按顺序逐条发送拆分后的消息，有一条失败就停止，全部成功时返回True"""
+    parts = chunk_message(text, max_bytes)
+    if len(parts) > 1:
+        print(f"✂️ 消息 {utf8_len(text)} 字节，超过 {max_bytes or TEXT_MAX_BYTES} 字节上限，分为 {len(parts)} 条发送")
+    for number, part in enumerate(parts, 1):
+        if not send(part):
+            print(f"❌ 第 {number}/{len(parts)} 条消息发送失败")
+            return False
+    return True
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一命令行入口 - 各子命令只在需要时才导入pandas、matplotlib、requests等重量级模块
+
+  python -m monitor_cli check [--days 7]      查看今天到期和N天内到期的项目（只读）
+  python -m monitor_cli render [--out 文件]    生成表格图片（--pages 分页）
+  python -m monitor_cli notify [--test]       执行完整的每日流水线并发送通知
+  python -m monitor_cli simulate [--days 14]  预演之后N天每天到期和重置的项目（不写表格）
+  python -m monitor_cli bench                 各阶段的导入和执行耗时
+"""
+
+import argparse
+import os
+import sys
+import time
+
+EXCEL_FILE = os.getenv('EXCEL_FILE', 'yxc.xlsx')
+
+
+def _load(path, fields=None):
+    """读取表格和列映射（只需要pandas和openpyxl），fields为需要的逻辑列"""
+    from excel_loader import load_table
+    from excel_schema import resolve_columns
+
+    df = load_table(path, fields)
+    return df, resolve_columns(df.columns)
+
+
+def _names(df, columns, positions):
+    """行位置对应的 "行号 店铺名称" 列表"""
+    name_col = columns.get('name', ' 店铺名称')
+    row_col = columns.get('row_number', '行号')
+    labels = []
+    for pos in positions:
+        row = df.iloc[int(pos)]
+        number = row[row_col] if row_col in df.columns else int(pos) + 1
+        labels.append(f"行{number} {row.get(name_col, '')}")
+    return labels
+
+
+def cmd_check(args):
+    """查看今天到期和N天内到期的项目"""
+    from excel_loader import CHECK_FIELDS
+    from expiry_index import ExpiryIndex
+
+    df, columns = _load(args.file, CHECK_FIELDS)
+    index = ExpiryIndex.from_frame(df, columns)
+    expired = index.equal(0)
+    expired_set = set(expired.tolist())
+    upcoming = [pos for pos in index.within(args.days) if pos not in expired_set]
+
+    print(f"📊 共 {len(df)} 个项目，到期分布: {index.bucket_counts()}")
+    if len(expired):
+        print(f"🚨 今天到期 {len(expired)} 个: {'、'.join(_names(df, columns, expired))}")
+    else:
+        print("🎉 今天没有到期的项目")
+    if upcoming:
+        print(f"⏰ {args.days} 天内到期 {len(upcoming)} 个: {'、'.join(_names(df, columns, upcoming))}")
+    return 1 if len(expired) else 0
+
+
+def cmd_render(args):
+    """生成表格图片"""
+    from excel_loader import TABLE_FIELDS
+    from wechat_with_image_fix import WeChatImageSender
+
+    df, columns = _load(args.file, TABLE_FIELDS)
+    sender = WeChatImageSender()
+    if args.pages:
+        pages = sender.create_table_pages(df)
+        stem, ext = os.path.splitext(args.out)
+        for number, page in enumerate(pages, 1):
+            with open(f"{stem}_{number}{ext}", 'wb') as f:
+                f.write(page)
+        print(f"✅ 已保存 {len(pages)} 页图片: {stem}_1{ext} ...")
+        return 0 if pages else 1
+
+    image = sender.create_table_image(df)
+    if image is None:
+        return 1
+    with open(args.out, 'wb') as f:
+        f.write(image.getvalue())
+    print(f"✅ 已保存表格图片: {args.out}")
+    return 0
+
+
+def cmd_notify(args):
+    """执行完整的每日流水线"""
+    from monitor_pipeline import MonitorPipeline
+
+    pipeline = MonitorPipeline()
+    pipeline.excel_file = pipeline.checker.excel_file = args.file
+    if args.test:
+        pipeline.test_mode = True
+    results = pipeline.run()
+    return 0 if all(results.values()) else 1
+
+
+def cmd_simulate(args):
+    """按每日流程（减1、到期检查、重置）预演之后N天，不写回表格"""
+    import contextlib
+    import io
+    from datetime import timedelta
+
+    from excel_loader import CHECK_FIELDS
+    from expiry_engine import decrement_remaining, find_expired, reset_expired
+    from run_watermark import get_beijing_time
+
+    df, columns = _load(args.file, CHECK_FIELDS)
+    today = get_beijing_time()
+    name_col = columns.get('name', ' 店铺名称')
+    for day in range(1, args.days + 1):
+        current_date = today + timedelta(days=day)
+        with contextlib.redirect_stdout(io.StringIO()):
+            decrement_remaining(df, columns)
+            expired = find_expired(df, columns)
+            reset_expired(df, columns, current_date)
+        if expired:
+            names = '、'.join(f"行{item['row']} {item['data'].get(name_col, '')}" for item in expired)
+            print(f"📅 {current_date.strftime('%Y-%m-%d')} 到期 {len(expired)} 个: {names}")
+    return 0
+
+
+def cmd_bench(args):
+    """各阶段的导入和执行耗时"""
+    timings = []
+
+    def stage(label, func):
+        start = time.perf_counter()
+        result = func()
+        timings.append((label, time.perf_counter() - start))
+        return result
+
+    stage('导入 pandas/openpyxl', lambda: __import__('excel_loader'))
+    df, columns = stage('读取表格', lambda: _load(args.file))
+    stage('导入 到期计算', lambda: __import__('expiry_engine'))
+    index = stage('建立到期索引', lambda: __import__('expiry_index').ExpiryIndex.from_frame(df, columns))
+    stage('导入 requests/smtplib', lambda: (__import__('requests'), __import__('smtplib')))
+    stage('导入 matplotlib/渲染', lambda: __import__('wechat_with_image_fix'))
+    sender = __import__('wechat_with_image_fix').WeChatImageSender()
+    # 关闭渲染缓存，量的是实际绘制时间
+    __import__('render_cache').RENDER_CACHE_ENABLED = False
+    stage('绘制表格图片', lambda: sender.create_table_image(df, index))
+
+    print(f"\n{'阶段':<20} {'耗时(ms)':>10}")
+    for label, elapsed in timings:
+        print(f"{label:<20} {elapsed * 1000:>10.1f}")
+    return 0
+
+
+def build_parser():
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog='monitor_cli', description='店铺到期监控')
+    parser.add_argument('--file', default=EXCEL_FILE, help='Excel文件（默认 yxc.xlsx）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    check = subparsers.add_parser('check', help='查看今天到期和N天内到期的项目')
+    check.add_argument('--days', type=int, default=7)
+    check.set_defaults(func=cmd_check)
+
+    render = subparsers.add_parser('render', help='生成表格图片')
+    render.add_argument('--out', default='table.png')
+    render.add_argument('--pages', action='store_true', help='分页生成')
+    render.set_defaults(func=cmd_render)
+
+    notify = subparsers.add_parser('notify', help='执行每日流水线并发送通知')
+    notify.add_argument('--test', action='store_true', help='测试模式，不发送通知')
+    notify.set_defaults(func=cmd_notify)
+
+    simulate = subparsers.add_parser('simulate', help='预演之后N天的到期和重置')
+    simulate.add_argument('--days', type=int, default=14)
+    simulate.set_defaults(func=cmd_simulate)
+
+    bench = subparsers.add_parser('bench', help='各阶段耗时')
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    """主函数，返回退出码"""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"❌ {args.command} 执行失败: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
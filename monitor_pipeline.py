@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日监控流水线 - 读取一次表格、计算一次剩余天数、生成一次报告，再分发到邮件、企业微信、钉钉和短信
+"""
+
+import email
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from http_transport import post_json
+from dotenv import load_dotenv
+
+from dingtalk_solution import DingTalkSender
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from excel_writer import save_changes
+from expiry_engine import advance_remaining, derive_remaining, ensure_expiry_dates, find_expired, reset_expired
+from expiry_index import ExpiryIndex
+from github_monitor import GitHubExpiryChecker
+from item_store import ITEM_DB, STORAGE_BACKEND, ItemStore
+from message_chunker import chunk_message
+from notification_outbox import OUTBOX_DB, NotificationOutbox
+from smtp_transport import close_transports, send_mail
+from run_watermark import elapsed_days, write_last_run
+from table_pages import pages_enabled
+from text_state import STATE_FILE, export_state, sync_workbook
+from wechat_with_image_fix import WeChatImageSender, get_beijing_time
+
+# 加载环境变量
+load_dotenv()
+
+# 报告中列出的最紧急项目：剩余天数 <7 的前5个
+URGENT_TOP_K = 5
+URGENT_DAYS = 7
+
+
+def channel_enabled(flag, configured):
+    """渠道开关：没有设置时，配置了地址就启用"""
+    value = os.getenv(flag) or ('true' if configured else 'false')
+    return value.lower() == 'true' and bool(configured)
+
+
+def build_stats(df, columns, index=None):
+    """统计总数、剩余天数分布、备注分布、到期分布和一周内最紧急的项目"""
+    remaining = pd.to_numeric(df[columns['remaining']], errors='coerce')
+    if index is None:
+        index = ExpiryIndex(remaining)
+
+    urgent_positions = index.top_k(URGENT_TOP_K)
+    urgent_positions = urgent_positions[index.values[:len(urgent_positions)] < URGENT_DAYS]
+    names = df[columns['name']] if 'name' in columns else pd.Series(df.index + 1, index=df.index).astype(str)
+    urgent = [(str(names.iat[pos]), int(remaining.iat[pos])) for pos in urgent_positions]
+
+    notes = {}
+    for column in columns.get('notes', []):
+        counts = df[column].dropna().astype(str).value_counts()
+        if len(counts):
+            notes[column] = counts.to_dict()
+
+    return {
+        'total': len(df),
+        'remaining': {int(k): int(v) for k, v in remaining.dropna().value_counts().items()},
+        'notes': notes,
+        'buckets': index.bucket_counts(),
+        'urgent': urgent,
+    }
+
+
+class MonitorReport:
+    """一次运行的报告：统计、到期和重置项目、表格图片，所有通知渠道共用"""
+
+    def __init__(self, run_time, stats, expired_items, updated_items, image, missed_items=None, pages=None):
+        self.run_time = run_time
+        self.stats = stats
+        self.expired_items = expired_items
+        self.updated_items = updated_items
+        self.image = image  # PNG字节，生成失败时为None
+        self.missed_items = missed_items or []  # 漏跑期间到期并已补上重置的项目
+        self.pages = pages or []  # 分页模式下按页序排列的PNG字节
+
+    def image_buffer(self):
+        """每个渠道拿到各自的图片缓冲区"""
+        return io.BytesIO(self.image) if self.image else None
+
+    def image_buffers(self):
+        """群消息要按顺序发送的图片：分页模式下是各页，否则是整张表"""
+        if self.pages:
+            return [io.BytesIO(page) for page in self.pages]
+        return [self.image_buffer()] if self.image else []
+
+    def summary_text(self):
+        """群消息的统计文本"""
+        lines = [
+            f"📊 店铺监控数据报告 - {self.run_time.strftime('%Y年%m月%d日 %H:%M')}",
+            "",
+            "📈 数据统计：",
+            f"• 总店铺数：{self.stats['total']}个",
+            f"• 剩余天数分布：{self.stats['remaining']}",
+        ]
+        for column, counts in self.stats['notes'].items():
+            lines.append(f"• {column}分布：{counts}")
+        lines.append(f"• 到期分布：{self.stats['buckets']}")
+        if self.stats['urgent']:
+            urgent = '、'.join(f"{name}({days}天)" for name, days in self.stats['urgent'])
+            lines.append(f"• 最紧急：{urgent}")
+        lines.append(f"• 今日到期：{len(self.expired_items)}个，已重置：{len(self.updated_items)}个")
+        if self.missed_items:
+            lines.append(f"• 漏跑期间到期并已补上重置：{len(self.missed_items)}个")
+        lines += ["", "详细数据请查看下方图片表格。"]
+        return "\n".join(lines)
+
+
+class MonitorPipeline:
+    def __init__(self):
+        self.excel_file = os.getenv('EXCEL_FILE', 'yxc.xlsx')
+        # 剩余天数模式: decrement=每天减1写回表格, date=按到期日期推导（无重置时不写表格）
+        self.expiry_mode = os.getenv('EXPIRY_MODE', 'decrement').lower()
+        # 存储方式: excel=直接读写yxc.xlsx, sqlite=项目存在SQLite中，yxc.xlsx作为导入/导出格式
+        self.storage_backend = STORAGE_BACKEND
+        self.item_db = ITEM_DB
+        # 文本状态（按行号排序的CSV/JSONL）：设置后以它为准，运行前生成yxc.xlsx，运行后写回
+        self.state_file = STATE_FILE
+        # 通知发件箱：消息先存入SQLite再投递，失败的下次运行时重发
+        self.outbox_db = OUTBOX_DB
+        self.unqueued = []  # 本次运行没能放入发件箱的渠道
+        # 分页模式：表格拆成多张图片按顺序发送（TABLE_PAGES=auto 或每页行数）
+        self.paginate = pages_enabled()
+        # 测试模式：照常计算和保存，但不发送任何通知
+        self.test_mode = os.getenv('TEST_MODE', 'false').lower() == 'true'
+
+        self.checker = GitHubExpiryChecker()
+        self.checker.excel_file = self.excel_file
+        self.wechat = WeChatImageSender()
+        self.dingtalk = DingTalkSender()
+
+        sms = self.checker.notification_config['sms']
+        self.channels = {
+            'email': self.checker.notification_config['email']['enabled'],
+            'wechat': channel_enabled('WECHAT_ENABLED', self.wechat.webhook_url),
+            'dingtalk': channel_enabled('DINGTALK_ENABLED', self.dingtalk.webhook_url),
+            'sms': sms['enabled'] and bool(sms['api_url']),
+        }
+
+    def render_images(self, df, index):
+        """生成表格图片，返回 (整张表PNG字节, 各页PNG字节)；分页模式下只画分页，邮件里的表格由邮件自己生成"""
+        if self.paginate:
+            print("🖼️  分页创建表格图片...")
+            return None, self.wechat.create_table_pages(df, index)
+        print("🖼️  创建表格图片...")
+        image_buffer = self.wechat.create_table_image(df, index)
+        return (image_buffer.getvalue() if image_buffer else None), []
+
+    def compute(self, df, columns, current_date):
+        """更新剩余天数、找出到期项目、生成报告、重置到期项目，返回 (报告, 是否需要写回表格)"""
+        needs_save = True
+        missed_items = []
+        if self.expiry_mode == 'date':
+            needs_save = ensure_expiry_dates(df, columns)
+            changed = derive_remaining(df, columns, current_date)
+            print(f"📅 按到期日期推导剩余天数，{changed} 个项目与表格中的值不同")
+        else:
+            # 每天减1；距上次运行超过1天时一次性补上漏掉的天数，今天已运行过则不再减1
+            elapsed = elapsed_days(self.excel_file, current_date)
+            updated_count, missed_items = advance_remaining(df, columns, elapsed, current_date)
+            print(f"📅 更新了 {updated_count} 个项目的剩余天数")
+
+        # 到期查询、统计和图片共用一份到期索引
+        index = ExpiryIndex.from_frame(df, columns)
+        expired_items = find_expired(df, columns, index)
+        print(f"🚨 发现 {len(expired_items)} 个剩余天数为0的项目")
+
+        # 统计和图片在重置之前生成，这样还能看到今天到期的项目
+        stats = build_stats(df, columns, index)
+        image, pages = self.render_images(df, index)
+
+        updated_items = reset_expired(df, columns, current_date)
+        print(f"🔄 重置了 {len(updated_items)} 个到期项目")
+
+        report = MonitorReport(current_date, stats, expired_items, updated_items, image, missed_items, pages)
+        return report, needs_save or bool(updated_items)
+
+    def compute_from_store(self, store, current_date):
+        """SQLite存储：按到期日期索引查询到期项目并重置，返回 (报告, 重置前的表格)"""
+        if store.count() == 0:
+            store.import_excel(self.excel_file, current_date)
+
+        df = store.to_frame(current_date)
+        columns = resolve_columns(df.columns)
+        expired_items = store.expiring(current_date)
+        print(f"🚨 发现 {len(expired_items)} 个已到期的项目")
+
+        index = ExpiryIndex.from_frame(df, columns)
+        stats = build_stats(df, columns, index)
+        image, pages = self.render_images(df, index)
+
+        updated_items = store.reset_expired(current_date, commit=False)
+        print(f"🔄 重置了 {len(updated_items)} 个到期项目")
+        return MonitorReport(current_date, stats, expired_items, updated_items, image, pages=pages), df
+
+    def run_excel(self, current_date):
+        """直接读写Excel，返回 (报告, 表格)"""
+        try:
+            df = load_table(self.excel_file)
+        except Exception as e:
+            print(f"❌ 读取Excel文件失败，流水线终止: {e}")
+            return None, None
+        original_df = df.copy()
+        columns = resolve_columns(df.columns)
+        print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
+
+        report, needs_save = self.compute(df, columns, current_date)
+
+        # 先把通知放入发件箱再保存：保存后崩溃时，重置过的项目的通知已经落盘，下次运行会发出
+        try:
+            self.unqueued = self.enqueue(report)
+        except Exception as e:
+            print(f"❌ 写入通知发件箱失败，不保存表格，流水线终止: {e}")
+            return None, None
+        if not needs_save:
+            print("📄 日期模式下没有需要写入的变化，跳过保存")
+        else:
+            try:
+                if save_changes(self.excel_file, original_df, df):
+                    print("💾 Excel文件已更新并保存")
+                else:
+                    print("📄 表格没有变化，未写入文件")
+                if self.expiry_mode != 'date':
+                    write_last_run(self.excel_file, current_date)
+            except Exception as e:
+                print(f"❌ 保存Excel文件失败: {e}")
+        return report, df
+
+    def run_store(self, current_date):
+        """项目存在SQLite中，处理完后导出到Excel，返回 (报告, 表格)"""
+        store = ItemStore(self.item_db)
+        try:
+            report, df = self.compute_from_store(store, current_date)
+            # 重置尚未提交：通知放入发件箱后再提交，崩溃时重置随事务回滚，下次运行重新检测
+            self.unqueued = self.enqueue(report)
+            store.conn.commit()
+            try:
+                if store.export_excel(self.excel_file, current_date):
+                    print(f"💾 已导出到 {self.excel_file}")
+                else:
+                    print(f"📄 {self.excel_file} 没有变化，未写入文件")
+            except Exception as e:
+                print(f"❌ 导出Excel文件失败: {e}")
+            return report, df
+        except Exception as e:
+            print(f"❌ 读取项目存储失败，流水线终止: {e}")
+            return None, None
+        finally:
+            store.close()
+
+    def outbox_parts(self, channel, report):
+        """一个渠道要发送的消息 [(类型, 内容字节), ...]，按发送顺序排列"""
+        if channel in ('wechat', 'dingtalk'):
+            # 统计文本先按字节上限拆好，每段单独入箱，重试时不会重复发送已送达的段
+            texts = [('text', part.encode('utf-8')) for part in chunk_message(report.summary_text())]
+            return texts + [('image', image.getvalue()) for image in report.image_buffers()]
+        # 邮件和短信只在有到期项目时发送
+        if not report.expired_items:
+            print(f"{'📧' if channel == 'email' else '📱'} 没有到期项目，不发送{'邮件' if channel == 'email' else '短信'}")
+            return []
+        if channel == 'email':
+            # 图片用重置前生成的（分页模式下为各页图片），不根据重置后的表格重新生成
+            msg, _ = self.checker.build_email_message(report.expired_items, report.updated_items,
+                                                      image=report.image, pages=report.pages)
+            return [('email', msg.as_bytes())]
+        content = self.checker.create_notification_content(report.expired_items, report.updated_items, "短信")
+        return [('sms', content.encode('utf-8'))]
+
+    def deliver(self, channel, kind, body):
+        """发送发件箱中的一条消息，成功时返回True"""
+        if kind == 'text':
+            return getattr(self, channel).send_text_message(body.decode('utf-8'))
+        if kind == 'image':
+            return getattr(self, channel).send_image_message(io.BytesIO(body))
+        if kind == 'email':
+            msg = email.message_from_bytes(body)
+            send_mail(self.checker.notification_config['email'], msg,
+                      to_addrs=[address.strip() for address in msg['To'].split(',')])
+            print(f"✅ 邮件通知已发送到: {msg['To']}")
+            return True
+
+        config = self.checker.notification_config['sms']
+        payload = {
+            "api_key": config['api_key'],
+            "phone": config['phone_number'],
+            "message": body.decode('utf-8')
+        }
+        response = post_json(config['api_url'], payload)
+        if response.status_code == 200:
+            print("✅ 短信通知发送成功")
+            return True
+        print(f"❌ 短信通知发送失败: {response.status_code}")
+        return False
+
+    def enqueue(self, report):
+        """
+        把同一份报告的各渠道消息放入发件箱，返回没能生成消息的渠道
+
+        同一天、同一渠道、同一批项目的消息只入箱一次，重新运行不会重复发送。
+        """
+        if self.test_mode:
+            return []
+
+        run_date = report.run_time.strftime('%Y-%m-%d')
+        items = report.expired_items + report.updated_items + report.missed_items
+        failed = []
+        outbox = NotificationOutbox(self.outbox_db)
+        try:
+            for channel, enabled in self.channels.items():
+                if not enabled:
+                    continue
+                if outbox.seen(run_date, channel, items):
+                    print(f"📬 {channel} 今天的通知已在发件箱中，不重复发送")
+                    continue
+                try:
+                    added = outbox.enqueue(run_date, channel, items, self.outbox_parts(channel, report))
+                    print(f"📤 {channel} 通知已放入发件箱（{added}条）")
+                except Exception as e:
+                    print(f"❌ 生成 {channel} 通知失败: {e}")
+                    failed.append(channel)
+        finally:
+            outbox.close()
+        return failed
+
+    def notify(self, report):
+        """把报告放入发件箱并投递，返回 {渠道: 是否全部送达}"""
+        return self.deliver_queued(self.enqueue(report))
+
+    def deliver_queued(self, unqueued=()):
+        """
+        投递发件箱中待发的消息（包括以前运行中没有送达、已过退避时间的），返回 {渠道: 是否全部送达}
+
+        unqueued 为本次没能生成消息的渠道，结果中记为失败。
+        """
+        if self.test_mode:
+            print("🧪 测试模式，不发送通知")
+            return {}
+
+        enabled = []
+        for channel, channel_on in self.channels.items():
+            if channel_on:
+                enabled.append(channel)
+            else:
+                print(f"⏭️  {channel} 通知未启用")
+        outbox = NotificationOutbox(self.outbox_db)
+        try:
+            # 各渠道并发投递，耗时等于最慢的渠道
+            results = outbox.drain(self.deliver, enabled)
+        finally:
+            outbox.close()
+        return {channel: success and channel not in unqueued for channel, success in results.items()}
+
+    def drain_outbox(self, due_only=True):
+        """只投递发件箱中待发的消息，不重新计算报告，返回 {渠道: 是否全部送达}"""
+        outbox = NotificationOutbox(self.outbox_db)
+        try:
+            return outbox.drain(self.deliver, [channel for channel, on in self.channels.items() if on], due_only)
+        finally:
+            outbox.close()
+            close_transports()
+
+    def run(self):
+        """执行一次完整流程，返回 {渠道: 是否成功}"""
+        current_date = get_beijing_time()
+        print(f"\n=== 开始执行监控流水线 - {current_date.strftime('%Y-%m-%d %H:%M:%S')} ===")
+
+        if self.state_file:
+            try:
+                sync_workbook(self.excel_file, self.state_file)
+            except Exception as e:
+                print(f"❌ 根据文本状态生成Excel失败，流水线终止: {e}")
+                return {}
+
+        # 版本时间用北京时间的运行时间，与运行日期一致
+        self.checker.backup_excel(current_date.replace(tzinfo=None))
+        if self.storage_backend == 'sqlite':
+            report, df = self.run_store(current_date)
+        else:
+            report, df = self.run_excel(current_date)
+        if report is None:
+            return {}
+
+        if self.state_file:
+            try:
+                export_state(self.excel_file, self.state_file)
+            except Exception as e:
+                print(f"❌ 写入文本状态失败: {e}")
+
+        results = self.deliver_queued(self.unqueued)
+        close_transports()
+        for channel, success in results.items():
+            print(f"  {'✅' if success else '❌'} {channel}")
+        print("=== 监控流水线完成 ===\n")
+        return results
+
+
+def main():
+    """主函数"""
+    MonitorPipeline().run()
+
+
+if __name__ == "__main__":
+    main()
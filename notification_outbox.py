@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知发件箱 - 每条通知先按幂等键存入SQLite，再由发送逻辑逐条投递并标记已送达
+
+表格已经重置之后企业微信发送失败，这条到期提醒原来就丢了；同一天重新运行又会重复发送。
+现在消息先落盘：失败的消息留在发件箱里，下次运行（或 python notification_outbox.py drain）
+按退避时间原样重发，不用重新计算报告；同一天、同一渠道、同一批项目的通知只入箱一次。
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+OUTBOX_DB = os.getenv('OUTBOX_DB', 'outbox.db')
+
+# 失败后第n次重试前等待 OUTBOX_BACKOFF * 2^(n-1) 秒，失败 OUTBOX_MAX_ATTEMPTS 次后不再重试
+OUTBOX_BACKOFF = float(os.getenv('OUTBOX_BACKOFF', '300'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+
+# 已送达和已放弃的记录保留天数（保留幂等键，消息内容在送达时就清空）
+OUTBOX_KEEP_DAYS = int(os.getenv('OUTBOX_KEEP_DAYS', '30'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT UNIQUE NOT NULL,  -- 运行日期|渠道|项目集合哈希|序号
+    run_date        TEXT NOT NULL,         -- YYYY-MM-DD
+    channel         TEXT NOT NULL,
+    kind            TEXT NOT NULL,         -- text / image / email / sms
+    body            BLOB,                  -- 文本为UTF-8，图片为PNG，邮件为MIME；送达后清空
+    status          TEXT NOT NULL DEFAULT 'pending',  -- pending / delivered / failed
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt    REAL NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    created_at      TEXT NOT NULL,
+    delivered_at    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(status, channel, id);
+CREATE INDEX IF NOT EXISTS idx_outbox_run ON outbox(run_date, channel);
+"""
+
+
+def items_digest(items):
+    """项目集合的哈希：到期、重置、漏跑补上的项目行号，与顺序无关"""
+    rows = sorted({int(item['row']) for item in items if item.get('row') is not None})
+    return hashlib.sha256(','.join(map(str, rows)).encode('utf-8')).hexdigest()[:16]
+
+
+class NotificationOutbox:
+    """SQLite发件箱；各渠道在不同线程中投递，共用一个连接并加锁"""
+
+    def __init__(self, path=OUTBOX_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self):
+        """清理过期记录并关闭"""
+        cutoff = (datetime.now() - timedelta(days=OUTBOX_KEEP_DAYS)).strftime('%Y-%m-%d')
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE status != 'pending' AND run_date < ?", (cutoff,))
+        self.conn.close()
+
+    def seen(self, run_date, channel, items):
+        """
+        这一天这个渠道的通知是否已经入箱过
+
+        同一批项目算重复；项目为空（重新运行时到期项目已在第一次运行中重置）时，
+        只要当天已经有这个渠道的通知也算重复。
+        """
+        digest = items_digest(items)
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM outbox WHERE idempotency_key LIKE ? LIMIT 1",
+                                 (f"{run_date}|{channel}|{digest}|%",)).fetchone():
+                return True
+            if digest != items_digest([]):
+                return False
+            return self.conn.execute("SELECT 1 FROM outbox WHERE run_date = ? AND channel = ? LIMIT 1",
+                                     (run_date, channel)).fetchone() is not None
+
+    def enqueue(self, run_date, channel, items, parts):
+        """
+        把一个渠道的消息按顺序入箱，parts 为 [(类型, 内容字节), ...]，返回新入箱的条数
+
+        幂等键为 运行日期|渠道|项目集合哈希|序号，已存在的消息不重复入箱。
+        """
+        digest = items_digest(items)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        added = 0
+        with self.lock, self.conn:
+            for number, (kind, body) in enumerate(parts):
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO outbox (idempotency_key, run_date, channel, kind, body, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (f"{run_date}|{channel}|{digest}|{number}", run_date, channel, kind, body, now))
+                added += cursor.rowcount
+        return added
+
+    def pending(self, channel, due_only=True):
+        """渠道待投递的消息（按入箱顺序）"""
+        query = "SELECT * FROM outbox WHERE status = 'pending' AND channel = ?"
+        params = [channel]
+        if due_only:
+            query += " AND next_attempt <= ?"
+            params.append(time.time())
+        with self.lock:
+            return self.conn.execute(query + " ORDER BY id", params).fetchall()
+
+    def mark_delivered(self, message_id):
+        """标记已送达并清空消息内容"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE outbox SET status = 'delivered', body = NULL, delivered_at = ?, "
+                              "attempts = attempts + 1, last_error = NULL WHERE id = ?", (now, message_id))
+
+    def mark_failed(self, message_id, error):
+        """记录失败，按指数退避安排下次重试；次数用完后标记为放弃"""
+        with self.lock, self.conn:
+            attempts = self.conn.execute("SELECT attempts FROM outbox WHERE id = ?",
+                                         (message_id,)).fetchone()['attempts'] + 1
+            status = 'failed' if attempts >= OUTBOX_MAX_ATTEMPTS else 'pending'
+            next_attempt = time.time() + OUTBOX_BACKOFF * 2 ** (attempts - 1)
+            self.conn.execute("UPDATE outbox SET attempts = ?, status = ?, next_attempt = ?, last_error = ? "
+                              "WHERE id = ?", (attempts, status, next_attempt, error, message_id))
+        return status
+
+    def drain_channel(self, channel, deliver, due_only=True):
+        """按顺序投递一个渠道的待发消息，某条失败后后面的留到下次，全部送达时返回True"""
+        for message in self.pending(channel, due_only):
+            try:
+                success = bool(deliver(channel, message['kind'], message['body']))
+                error = None if success else '发送失败'
+            except Exception as e:
+                success, error = False, str(e)
+            if success:
+                self.mark_delivered(message['id'])
+                continue
+            status = self.mark_failed(message['id'], error)
+            if status == 'failed':
+                print(f"❌ {channel} 消息 #{message['id']} 已失败 {OUTBOX_MAX_ATTEMPTS} 次，不再重试: {error}")
+            else:
+                print(f"⚠️ {channel} 消息 #{message['id']} 发送失败，留在发件箱中稍后重试: {error}")
+            return False
+        return True
+
+    def drain(self, deliver, channels, due_only=True):
+        """
+        各渠道并发投递，等所有渠道投递完再返回 {渠道: 是否全部送达}
+
+        不套用 NOTIFY_TIMEOUT：限流排队可能比它长，超时返回后连接被关闭，投递线程发出的消息
+        记不上已送达，下次运行会重发。每条消息的耗时由HTTP/SMTP超时和限流排队上限约束。
+        """
+        from notify_dispatcher import dispatch, succeeded
+
+        return succeeded(dispatch({
+            channel: (lambda channel=channel: self.drain_channel(channel, deliver, due_only))
+            for channel in channels
+        }, timeouts={channel: None for channel in channels}))
+
+    def summary(self):
+        """各渠道各状态的消息数"""
+        with self.lock:
+            rows = self.conn.execute("SELECT channel, status, COUNT(*) AS count FROM outbox "
+                                     "GROUP BY channel, status ORDER BY channel, status").fetchall()
+        return [(row['channel'], row['status'], row['count']) for row in rows]
+
+
+def main():
+    """命令行：list 查看发件箱，drain 立即重发所有待发消息（不等退避时间）"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'list':
+        outbox = NotificationOutbox(OUTBOX_DB)
+        try:
+            for channel, status, count in outbox.summary():
+                print(f"📬 {channel}: {status} {count} 条")
+        finally:
+            outbox.close()
+    elif command == 'drain':
+        from monitor_pipeline import MonitorPipeline
+        results = MonitorPipeline().drain_outbox(due_only=False)
+        sys.exit(0 if all(results.values()) else 1)
+    else:
+        print("用法: python notification_outbox.py [list|drain]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知分发 - 所有启用的渠道同时发送，每个渠道单独限时，汇总成一份运行结果
+
+逐个渠道发送时，SMTP登录慢会拖住企业微信的提醒；并发发送后通知阶段的耗时等于最慢的渠道。
+超时的渠道记为失败，发送线程是守护线程，不会阻止进程退出。
+"""
+
+import os
+import threading
+import time
+
+# 每个渠道的发送时限（秒），可用 NOTIFY_TIMEOUT_<渠道> 单独设置，如 NOTIFY_TIMEOUT_EMAIL=90
+NOTIFY_TIMEOUT = float(os.getenv('NOTIFY_TIMEOUT', '60'))
+
+
+def channel_timeout(channel):
+    """渠道的发送时限"""
+    return float(os.getenv(f'NOTIFY_TIMEOUT_{channel.upper()}', NOTIFY_TIMEOUT))
+
+
+def enabled_senders(senders, notification_config):
+    """只保留 notification_config 中已启用的渠道"""
+    enabled = {}
+    for channel, send in senders.items():
+        if notification_config[channel]['enabled']:
+            enabled[channel] = send
+        else:
+            print(f"⏭️  {channel} 通知未启用")
+    return enabled
+
+
+def _run(send, outcome):
+    """在发送线程中调用发送函数，记录结果和耗时"""
+    start = time.perf_counter()
+    try:
+        outcome['success'] = bool(send())
+        outcome['status'] = 'ok' if outcome['success'] else 'failed'
+    except Exception as e:
+        outcome['status'] = 'error'
+        outcome['error'] = str(e)
+    outcome['seconds'] = time.perf_counter() - start
+
+
+def dispatch(senders, timeouts=None):
+    """
+    并发调用 {渠道: 发送函数}，返回 {渠道: {'success', 'status', 'seconds', 'error'}}
+
+    status: ok=发送成功, failed=发送函数返回False, error=抛出异常, timeout=超过时限仍未返回。
+    timeouts 可以按渠道覆盖时限，未指定的渠道用 channel_timeout，为None的渠道等到发送函数返回为止。
+    """
+    timeouts = timeouts or {}
+    outcomes, threads = {}, {}
+    start = time.perf_counter()
+    for channel, send in senders.items():
+        outcomes[channel] = {'success': False, 'status': 'timeout', 'seconds': None, 'error': None}
+        thread = threading.Thread(target=_run, args=(send, outcomes[channel]),
+                                  name=f'notify-{channel}', daemon=True)
+        thread.start()
+        threads[channel] = thread
+
+    for channel, thread in threads.items():
+        timeout = timeouts.get(channel, channel_timeout(channel))
+        if timeout is None:
+            thread.join()
+            continue
+        thread.join(max(0.0, start + timeout - time.perf_counter()))
+        if thread.is_alive():
+            outcomes[channel] = {'success': False, 'status': 'timeout',
+                                 'seconds': time.perf_counter() - start, 'error': '发送超时'}
+
+    print_summary(outcomes, time.perf_counter() - start)
+    return outcomes
+
+
+def print_summary(outcomes, elapsed):
+    """打印本次通知的汇总"""
+    if not outcomes:
+        return
+    icons = {'ok': '✅', 'failed': '❌', 'error': '❌', 'timeout': '⏰'}
+    print(f"📊 通知汇总（并发发送，总耗时 {elapsed:.1f}秒）:")
+    for channel, outcome in outcomes.items():
+        detail = f" - {outcome['error']}" if outcome['error'] else ''
+        print(f"  {icons[outcome['status']]} {channel}: {outcome['status']} ({outcome['seconds']:.1f}秒){detail}")
+
+
+def succeeded(outcomes):
+    """{渠道: 是否成功}"""
+    return {channel: outcome['success'] for channel, outcome in outcomes.items()}
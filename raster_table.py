@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+栅格表格渲染 - 用Pillow直接在画布上排版和绘制表格，不经过matplotlib的ax.table
+
+matplotlib逐个单元格设置样式再按高dpi保存，98行的表格要几秒；这里按缓存的字宽算好列宽，
+一次画完网格和文字，输出同样的表头底色和红色高亮行。设置 TABLE_RENDERER=pillow 后各个
+create_table_image 改用这个渲染器。
+"""
+
+import io
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from font_resolver import resolve_cjk_font
+
+# 表格渲染器: matplotlib（默认）或 pillow
+TABLE_RENDERER = os.getenv('TABLE_RENDERER', 'matplotlib').lower()
+
+HEADER_FILL = '#f0f0f0'
+HEADER_COLOR = '#333333'
+HIGHLIGHT_FILL = '#ff9999'
+HIGHLIGHT_COLOR = '#990000'
+GRID_COLOR = '#000000'
+
+
+def renderer_name():
+    """当前使用的表格渲染器（渲染缓存的键里包含它）"""
+    return TABLE_RENDERER
+
+
+def use_pillow():
+    """是否使用Pillow渲染器"""
+    return renderer_name() == 'pillow'
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """加载指定像素大小的中文字体（由 font_resolver 解析），找不到时用Pillow自带字体"""
+    resolved = resolve_cjk_font()
+    if resolved is not None:
+        try:
+            return ImageFont.truetype(resolved['path'], size)
+        except OSError as e:
+            print(f"⚠️ 加载字体失败 {resolved['path']}: {e}")
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=None)
+def _char_width(font, char):
+    """单个字符的宽度（按字体缓存）"""
+    return font.getlength(char)
+
+
+@lru_cache(maxsize=None)
+def _line_height(font):
+    """字体的行高（上伸 + 下伸）"""
+    ascent, descent = font.getmetrics()
+    return ascent + descent
+
+
+def text_width(font, text):
+    """文字宽度：各字符宽度之和"""
+    return int(round(sum(_char_width(font, char) for char in text)))
+
+
+def render_table(rows, headers, title, highlight=(), font_size=8, dpi=150, row_scale=2.0,
+                 header_style=True, highlight_fill=HIGHLIGHT_FILL, highlight_color=HIGHLIGHT_COLOR,
+                 highlight_columns=None):
+    """
+    把表格画成PNG，返回BytesIO
+
+    rows: 每行各单元格的文字；highlight: 需要高亮的行位置；
+    font_size/dpi 与matplotlib的含义相同（磅 × dpi / 72 = 像素）；row_scale 为行高相对字体行高的倍数；
+    header_style: 表头是否加灰色底色和粗体；highlight_columns: 只高亮前N列，None表示整行。
+    """
+    px = max(int(round(font_size * dpi / 72)), 6)
+    font = load_font(px)
+    title_font = load_font(px * 2)
+    padding = px
+    row_height = int(round(_line_height(font) * row_scale))
+
+    cells = [[str(value) for value in row] for row in rows]
+    widths = [text_width(font, str(header)) for header in headers]
+    for row in cells:
+        for j, text in enumerate(row):
+            widths[j] = max(widths[j], text_width(font, text))
+    widths = [width + 2 * padding for width in widths]
+
+    table_width = sum(widths)
+    title_height = _line_height(title_font) + 2 * padding
+    width = max(table_width, text_width(title_font, title)) + 2 * padding
+    height = title_height + row_height * (len(cells) + 1) + 2 * padding
+
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.text((width // 2, padding + title_height // 2), title, font=title_font, fill='black',
+              anchor='mm', stroke_width=1, stroke_fill='black')
+
+    highlight = set(highlight)
+    fill_columns = len(headers) if highlight_columns is None else highlight_columns
+    lefts = [(width - table_width) // 2]
+    for w in widths:
+        lefts.append(lefts[-1] + w)
+    top = padding + title_height
+
+    for i, row in enumerate([list(map(str, headers))] + cells):
+        y = top + i * row_height
+        is_header = i == 0
+        is_highlight = not is_header and (i - 1) in highlight
+        if is_header and header_style:
+            draw.rectangle([lefts[0], y, lefts[-1], y + row_height], fill=HEADER_FILL)
+        elif is_highlight:
+            draw.rectangle([lefts[0], y, lefts[fill_columns], y + row_height], fill=highlight_fill)
+
+        for j, text in enumerate(row):
+            bold = (is_header and header_style) or (is_highlight and j < fill_columns)
+            color = HEADER_COLOR if is_header and header_style else (
+                highlight_color if is_highlight and j < fill_columns else 'black')
+            draw.text(((lefts[j] + lefts[j + 1]) // 2, y + row_height // 2), text, font=font, fill=color,
+                      anchor='mm', stroke_width=1 if bold else 0, stroke_fill=color)
+
+    # 网格线
+    bottom = top + row_height * (len(cells) + 1)
+    for i in range(len(cells) + 2):
+        y = top + i * row_height
+        draw.line([(lefts[0], y), (lefts[-1], y)], fill=GRID_COLOR, width=1)
+    for x in lefts:
+        draw.line([(x, top), (x, bottom)], fill=GRID_COLOR, width=1)
+
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format='PNG', optimize=False)
+    img_buffer.seek(0)
+    return img_buffer
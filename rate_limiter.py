@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+webhook限流 - 每个机器人地址一个令牌桶，状态保存在本地文件中并加文件锁，多个进程共用同一份配额
+
+企业微信群机器人每分钟最多20条消息，钉钉类似。分页图片或同时运行的多个脚本（守护进程、
+手动运行的 setup_wechat_bot.py 测试等）超出配额后会被限流丢消息；这里在发送前排队等待令牌。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有fcntl时只在进程内限流
+    fcntl = None
+
+from excel_schema import CACHE_DIR
+
+RATE_LIMIT_FILE = os.getenv('RATE_LIMIT_FILE', os.path.join(CACHE_DIR, 'rate_limits.json'))
+
+# 每个机器人每分钟的消息数（桶容量相同，允许一次发满一分钟的配额），0表示不限流
+RATE_LIMIT_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', '20'))
+
+# 最长排队时间（秒），超过后不再等待直接发送
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '120'))
+
+# 需要限流的机器人地址
+WEBHOOK_PREFIXES = ('https://qyapi.weixin.qq.com/cgi-bin/webhook/', 'https://oapi.dingtalk.com/robot/')
+
+
+def is_webhook(url):
+    """是否为需要限流的群机器人地址"""
+    return url.startswith(WEBHOOK_PREFIXES)
+
+
+def bucket_key(url):
+    """状态文件中的键：地址的哈希（不把webhook的key写到磁盘上）"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+
+
+class _FileLock:
+    """状态文件旁的 .lock 文件上的排他锁"""
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(RATE_LIMIT_FILE) or '.', exist_ok=True)
+        self.handle = open(f"{RATE_LIMIT_FILE}.lock", 'a')
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+
+
+def _load_state():
+    try:
+        with open(RATE_LIMIT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state):
+    tmp_file = f"{RATE_LIMIT_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, RATE_LIMIT_FILE)
+
+
+def _take(key, rate, capacity, now):
+    """在锁内补充令牌并尝试取一个，返回还需要等待的秒数（0表示已取到）"""
+    state = _load_state()
+    bucket = state.get(key, {'tokens': capacity, 'updated': now})
+    tokens = min(capacity, bucket['tokens'] + max(0.0, now - bucket['updated']) * rate)
+    if tokens >= 1:
+        state[key] = {'tokens': tokens - 1, 'updated': now}
+        _save_state(state)
+        return 0.0
+    state[key] = {'tokens': tokens, 'updated': now}
+    _save_state(state)
+    return (1 - tokens) / rate
+
+
+def acquire(url, per_minute=None, max_wait=None):
+    """
+    发送前取一个令牌，配额用完时排队等待，返回等待的秒数
+
+    等待超过 max_wait 时不再等待，由服务器的限流错误码和 http_transport 的退避重试兜底。
+    """
+    per_minute = RATE_LIMIT_PER_MINUTE if per_minute is None else per_minute
+    max_wait = RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+    if per_minute <= 0:
+        return 0.0
+
+    rate = per_minute / 60.0
+    key = bucket_key(url)
+    start = time.time()
+    announced = False
+    while True:
+        # 令牌桶按墙上时间计算，不同进程之间可以比较
+        now = time.time()
+        with _FileLock():
+            wait = _take(key, rate, per_minute, now)
+        waited = now - start
+        if wait == 0:
+            return waited
+        if waited + wait > max_wait:
+            print(f"⚠️ 机器人配额排队超过 {max_wait:.0f}秒，直接发送")
+            return waited
+        if not announced:
+            print(f"⏳ 机器人配额已用完（每分钟{per_minute:.0f}条），等待 {wait:.1f}秒")
+            announced = True
+        time.sleep(wait)
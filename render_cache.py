@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染缓存 - 表格图片按 (行内容哈希, 标题, 样式, dpi) 缓存PNG，内存和磁盘都按最近使用淘汰
+
+同一次运行里同一份数据要发给多个渠道时，只用matplotlib画一次。
+"""
+
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict
+
+from excel_schema import CACHE_DIR
+
+RENDER_DIR = os.path.join(CACHE_DIR, 'renders')
+
+# RENDER_CACHE=0 时关闭渲染缓存
+RENDER_CACHE_ENABLED = os.getenv('RENDER_CACHE', '1') != '0'
+
+# 内存里最多保留的图片数，磁盘上所有图片的总大小上限
+MEMORY_ITEMS = int(os.getenv('RENDER_CACHE_ITEMS', '16'))
+DISK_BYTES = int(os.getenv('RENDER_CACHE_BYTES', str(50 * 1024 * 1024)))
+
+# 进程内缓存：键 -> PNG字节，按最近使用排序
+_images = OrderedDict()
+
+
+def render_key(rows, title, style, dpi):
+    """缓存键：表格每个单元格的文字、标题（含日期）、样式名和dpi"""
+    text = json.dumps([rows, title, style, dpi], ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _cache_file(key):
+    """缓存文件路径"""
+    return os.path.join(RENDER_DIR, f"{key}.png")
+
+
+def _remember(key, data):
+    """放进内存缓存，超过条数时淘汰最久没用的"""
+    _images[key] = data
+    _images.move_to_end(key)
+    while len(_images) > MEMORY_ITEMS:
+        _images.popitem(last=False)
+
+
+def _evict_disk():
+    """磁盘缓存超过大小上限时，按最后使用时间从旧到新删除"""
+    entries = []
+    for name in os.listdir(RENDER_DIR):
+        if name.endswith('.png'):
+            stat = os.stat(os.path.join(RENDER_DIR, name))
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= DISK_BYTES:
+            break
+        try:
+            os.remove(os.path.join(RENDER_DIR, name))
+            total -= size
+        except OSError:
+            pass
+
+
+def get_render(key):
+    """取缓存的图片（新的BytesIO），没有时返回None"""
+    if not RENDER_CACHE_ENABLED:
+        return None
+    try:
+        data = _images.get(key)
+        if data is None:
+            cache_file = _cache_file(key)
+            if not os.path.exists(cache_file):
+                return None
+            with open(cache_file, 'rb') as f:
+                data = f.read()
+            os.utime(cache_file)  # 更新最后使用时间
+        _remember(key, data)
+        print("⚡ 表格图片命中渲染缓存")
+        return io.BytesIO(data)
+    except Exception as e:
+        print(f"⚠️ 读取渲染缓存失败，重新绘制: {e}")
+        return None
+
+
+def put_render(key, data):
+    """保存绘制好的PNG字节"""
+    if not RENDER_CACHE_ENABLED or not data:
+        return
+    try:
+        _remember(key, data)
+        os.makedirs(RENDER_DIR, exist_ok=True)
+        cache_file = _cache_file(key)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, cache_file)
+        _evict_disk()
+    except Exception as e:
+        print(f"⚠️ 保存渲染缓存失败: {e}")
+
+
+def clear_memory():
+    """清空进程内缓存"""
+    _images.clear()
@@ -6,7 +6,10 @@
 
 import pandas as pd
 from datetime import datetime
-import shutil
+
+from excel_loader import load_table
+from excel_writer import save_changes
+from backup_store import BACKUP_DIR, backup_workbook
 
 def reset_expired_items():
     """重置过期项目"""
@@ -14,14 +17,15 @@ def reset_expired_items():
     
     # 备份原文件
     try:
-        shutil.copy2('yxc.xlsx', 'yxc_backup_before_reset.xlsx')
-        print("✅ 已备份原文件: yxc_backup_before_reset.xlsx")
+        backup_workbook('yxc.xlsx')
+        print(f"✅ 已备份原文件到: {BACKUP_DIR}")
     except Exception as e:
         print(f"⚠️ 备份失败，继续执行: {e}")
     
     # 读取Excel文件
-    df = pd.read_excel('yxc.xlsx')
+    df = load_table('yxc.xlsx')
     print(f"✅ 读取Excel文件，共 {len(df)} 行数据")
+    original_df = df.copy()
     
     # 查找关键列
     columns = {
@@ -63,7 +67,7 @@ def reset_expired_items():
     print(f"\n✅ 重置了 {reset_count} 个过期项目")
     
     # 保存重置后的文件
-    df.to_excel('yxc.xlsx', index=False)
+    save_changes('yxc.xlsx', original_df, df)
     print("💾 已保存重置后的Excel文件")
     
     # 显示重置后的状态
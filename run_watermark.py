@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行记录 - 保存每个工作簿上次成功更新剩余天数的日期，用于补上漏跑的天数
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+# 记录文件需要和yxc.xlsx一起提交，GitHub Actions每次运行才能读到上次的日期
+WATERMARK_FILE = os.getenv('WATERMARK_FILE', 'last_run.json')
+
+
+def get_beijing_time():
+    """获取北京时间"""
+    # 创建北京时区 (UTC+8)
+    beijing_tz = timezone(timedelta(hours=8))
+    
+    # 检查是否在GitHub Actions环境中
+    if os.getenv('GITHUB_ACTIONS') == 'true':
+        # GitHub Actions使用UTC时间，需要转换为北京时间
+        utc_now = datetime.now(timezone.utc)
+        beijing_time = utc_now.astimezone(beijing_tz)
+        print(f"🌍 GitHub Actions环境，UTC时间: {utc_now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
+        print(f"🇨🇳 转换为北京时间: {beijing_time.strftime('%Y-%m-%d %H:%M:%S')} CST")
+    else:
+        # 本地环境，直接获取北京时间
+        beijing_time = datetime.now(beijing_tz)
+        print(f"🏠 本地环境，北京时间: {beijing_time.strftime('%Y-%m-%d %H:%M:%S')} CST")
+    
+    return beijing_time
+
+
+def _load():
+    """读取全部运行记录"""
+    try:
+        with open(WATERMARK_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_last_run(excel_file):
+    """上次成功运行的日期（datetime），没有记录时返回None"""
+    value = _load().get(os.path.basename(excel_file))
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        print(f"⚠️ 运行记录日期格式错误: {value}")
+        return None
+
+
+def elapsed_days(excel_file, current_date):
+    """距上次成功运行过了几天，没有记录时返回None"""
+    last_run = read_last_run(excel_file)
+    if last_run is None:
+        return None
+    return (datetime.strptime(current_date.strftime('%Y-%m-%d'), '%Y-%m-%d') - last_run).days
+
+
+def write_last_run(excel_file, current_date):
+    """记录本次成功运行的日期（临时文件 + 原子替换）"""
+    try:
+        records = _load()
+        records[os.path.basename(excel_file)] = current_date.strftime('%Y-%m-%d')
+        tmp_file = f"{WATERMARK_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, WATERMARK_FILE)
+    except OSError as e:
+        print(f"⚠️ 保存运行记录失败: {e}")
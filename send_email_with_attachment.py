@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import smtplib
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
 import os
@@ -12,6 +10,10 @@ from email.mime.base import MIMEBase
 from email import encoders
 from dotenv import load_dotenv
 
+from excel_loader import TABLE_FIELDS, load_table
+from font_resolver import setup_matplotlib_font
+from smtp_transport import send_mail
+
 # 加载环境变量
 load_dotenv()
 
@@ -19,12 +21,11 @@ def create_and_save_table_image():
     """创建并保存表格图片"""
     try:
         # 读取Excel文件
-        df = pd.read_excel('yxc.xlsx')
+        df = load_table('yxc.xlsx', TABLE_FIELDS)
         print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
         
         # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+        setup_matplotlib_font()
         
         # 创建图形
         fig, ax = plt.subplots(figsize=(20, 12))
@@ -148,15 +149,7 @@ def send_email_with_attachment():
         
         # 发送邮件
         print("📤 发送邮件...")
-        if config['smtp_port'] == 465:
-            server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-        else:
-            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-            server.starttls()
-        
-        server.login(config['username'], config['password'])
-        server.send_message(msg)
-        server.quit()
+        send_mail(config, msg)
         
         print("✅ 带附件的邮件发送成功！")
         print(f"📧 邮件已发送到: {', '.join(config['to_emails'])}")
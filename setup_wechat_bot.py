@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
-import requests
+from http_transport import post_json
 import json
 from dotenv import load_dotenv
 
@@ -46,7 +46,7 @@ def setup_wechat_bot():
                 }
             }
             
-            response = requests.post(webhook_url, json=data)
+            response = post_json(webhook_url, data)
             result = response.json()
             
             if result.get('errcode') == 0:
@@ -4,24 +4,31 @@
 智能Excel监控脚本 - 自动更新开始时间和剩余天数
 """
 
-import pandas as pd
 import schedule
 import time
-import smtplib
-import requests
+from http_transport import post_json
 import os
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from backup_store import BACKUP_DIR, backup_workbook
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from date_parser import parse_date_value
+from expiry_checker import ExpiryCheckerBase
+from expiry_engine import find_expired
+from run_watermark import get_beijing_time, write_last_run
+from notify_dispatcher import dispatch, enabled_senders
+from smtp_transport import close_transports, send_mail
 
 # 加载环境变量
 load_dotenv()
 
-class SmartExpiryChecker:
+class SmartExpiryChecker(ExpiryCheckerBase):
     def __init__(self):
+        super().__init__()
         self.excel_file = "yxc.xlsx"
-        self.backup_file = "yxc_backup.xlsx"
         self.notification_config = {
             'email': {
                 'enabled': os.getenv('EMAIL_ENABLED', 'false').lower() == 'true',
@@ -44,18 +51,18 @@ class SmartExpiryChecker:
         }
     
     def backup_excel(self):
-        """备份Excel文件"""
+        """备份Excel文件（去重快照 + 行级增量，见 backup_store）"""
         try:
-            import shutil
-            shutil.copy2(self.excel_file, self.backup_file)
-            print(f"✅ Excel文件已备份: {self.backup_file}")
+            backup_workbook(self.excel_file)
+            print(f"✅ Excel文件已备份到: {BACKUP_DIR}")
         except Exception as e:
             print(f"❌ 备份失败: {e}")
     
     def read_excel_file(self):
         """读取Excel文件"""
         try:
-            df = pd.read_excel(self.excel_file)
+            df = load_table(self.excel_file)
+            self.original_df = df.copy()
             print(f"✅ 成功读取Excel文件: {self.excel_file}")
             print(f"📊 表格形状: {df.shape}")
             print(f"📋 列名: {list(df.columns)}")
@@ -64,86 +71,21 @@ class SmartExpiryChecker:
             print(f"❌ 读取Excel文件失败: {e}")
             return None
     
-    def save_excel_file(self, df):
-        """保存Excel文件"""
-        try:
-            df.to_excel(self.excel_file, index=False)
-            print(f"✅ Excel文件已保存: {self.excel_file}")
-            return True
-        except Exception as e:
-            print(f"❌ 保存Excel文件失败: {e}")
-            return False
-    
     def find_columns(self, df):
         """查找关键列"""
-        columns = {}
-        
-        # 查找剩余天数列
-        possible_remaining = ['剩余天数', '剩余时间', '到期天数', '过期天数', '天数', 'days', 'remaining_days', '剩余', '到期', '过期']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_remaining:
-                if name in col_str:
-                    columns['remaining'] = col
-                    break
-            if 'remaining' in columns:
-                break
-        
-        # 查找总天数列
-        possible_total = ['总天数', '总时间', '总天', 'total_days', 'total', '天']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_total:
-                if name in col_str:
-                    columns['total'] = col
-                    break
-            if 'total' in columns:
-                break
-        
-        # 查找开始时间列
-        possible_start = ['开始时间', '开始日期', 'start_date', 'start_time', '开始']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_start:
-                if name in col_str:
-                    columns['start_date'] = col
-                    break
-            if 'start_date' in columns:
-                break
+        columns = resolve_columns(df.columns)
         
         # 如果没有找到，使用默认列名
-        if 'remaining' not in columns:
-            columns['remaining'] = df.columns[0] if len(df.columns) > 0 else None
-        if 'total' not in columns:
-            columns['total'] = df.columns[0] if len(df.columns) > 0 else None
-        if 'start_date' not in columns:
-            columns['start_date'] = df.columns[0] if len(df.columns) > 0 else None
+        for key in ('remaining', 'total', 'start_date'):
+            if key not in columns:
+                columns[key] = df.columns[0] if len(df.columns) > 0 else None
         
         print(f"🎯 找到的列: {columns}")
         return columns
     
     def parse_date(self, date_value):
         """解析日期格式"""
-        if pd.isna(date_value):
-            return None
-        
-        date_str = str(date_value)
-        
-        # 尝试不同的日期格式
-        formats = [
-            '%Y%m%d',      # 20250403
-            '%Y-%m-%d',    # 2025-04-03
-            '%Y/%m/%d',    # 2025/04/03
-            '%Y年%m月%d日', # 2025年04月03日
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        return None
+        return parse_date_value(date_value)
     
     def format_date(self, date_obj):
         """格式化日期为YYYYMMDD格式"""
@@ -175,89 +117,17 @@ class SmartExpiryChecker:
             print(f"❌ 计算剩余天数失败: {e}")
             return None
     
-    def update_expired_items(self, df, columns):
-        """更新到期项目"""
-        updated_items = []
-        current_date = datetime.now()
-        
-        for idx, row in df.iterrows():
-            remaining = row[columns['remaining']]
-            total = row[columns['total']]
-            start_date = row[columns['start_date']]
-            
-            # 如果剩余天数为0，需要重置
-            if pd.notna(remaining) and int(remaining) == 0:
-                row_num = row.get('行号', idx+1)
-                print(f"🔄 重置项目: {row.get(' 店铺名称', f'行{row_num}')}")
-                
-                # 更新开始时间为今天
-                new_start_date = self.format_date(current_date)
-                # 确保日期格式正确，保持与原始数据类型一致
-                if pd.api.types.is_integer_dtype(df[columns['start_date']]):
-                    df.at[idx, columns['start_date']] = int(new_start_date)
-                else:
-                    df.at[idx, columns['start_date']] = str(new_start_date)
-                
-                # 重置剩余天数为总天数
-                df.at[idx, columns['remaining']] = total
-                
-                updated_items.append({
-                    'row': row.get('行号', idx + 1),
-                    'name': row.get(' 店铺名称', f'行{row.get("行号", idx+1)}'),
-                    'address': row.get('地址', '未知地址'),
-                    'total_days': total,
-                    'old_start': start_date,
-                    'new_start': new_start_date
-                })
-        
-        return updated_items
-    
-    def update_remaining_days(self, df, columns):
-        """更新所有项目的剩余天数 - 每天减1"""
-        updated_count = 0
-        
-        for idx, row in df.iterrows():
-            current_remaining = row[columns['remaining']]
-            
-            # 如果当前剩余天数为0，跳过（这些会在update_expired_items中处理）
-            if pd.notna(current_remaining) and int(current_remaining) == 0:
-                row_num = row.get('行号', idx+1)
-                print(f"⏭️  跳过减1: {row.get(' 店铺名称', f'行{row_num}')} 已经是0天")
-                continue
-            
-            # 如果剩余天数不为0，每天减1
-            if pd.notna(current_remaining) and int(current_remaining) > 0:
-                old_remaining = int(current_remaining)
-                new_remaining = max(0, old_remaining - 1)  # 不能小于0
-                
-                df.at[idx, columns['remaining']] = new_remaining
-                updated_count += 1
-                row_num = row.get('行号', idx+1)
-                print(f"📅 剩余天数减1: {row.get(' 店铺名称', f'行{row_num}')} {old_remaining} → {new_remaining}")
-        
-        return updated_count
-    
     def check_expiry_items(self, df, columns):
         """检查剩余天数为0的项目"""
         expired_items = []
         
         try:
-            # 确保剩余天数列是数值类型
-            df[columns['remaining']] = pd.to_numeric(df[columns['remaining']], errors='coerce')
-            
-            # 查找剩余天数为0的项目
-            expired_mask = df[columns['remaining']] == 0
-            expired_df = df[expired_mask]
-            
-            if not expired_df.empty:
-                print(f"🚨 发现 {len(expired_df)} 个剩余天数为0的项目:")
-                for idx, row in expired_df.iterrows():
-                    item_info = {
-                        'row': row.get('行号', idx + 1),
-                        'data': row.to_dict()
-                    }
-                    expired_items.append(item_info)
-                    print(f"  行 {row.get('行号', idx + 1)}: {dict(row)}")
+            expired_items = find_expired(df, columns)
+            
+            if expired_items:
+                print(f"🚨 发现 {len(expired_items)} 个剩余天数为0的项目:")
+                for item in expired_items:
+                    print(f"  行 {item['row']}: {item['data']}")
             else:
                 print("✅ 没有发现剩余天数为0的项目")
                 
@@ -288,17 +158,7 @@ class SmartExpiryChecker:
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             # 发送邮件
-            if config['smtp_port'] == 465:
-                # 使用SSL连接（163邮箱推荐）
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                # 使用TLS连接
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("✅ 邮件通知发送成功")
             return True
@@ -347,14 +207,12 @@ class SmartExpiryChecker:
         """发送到期通知"""
         print(f"📧 开始发送到期通知，共有 {len(expired_items)} 个到期项目")
         
-        # 发送到期邮件通知
-        self.send_expiry_email_notification(expired_items)
-        
-        # 发送到期微信通知
-        self.send_expiry_wechat_notification(expired_items)
-        
-        # 发送到期短信通知
-        self.send_expiry_sms_notification(expired_items)
+        # 邮件、微信、短信并发发送
+        return dispatch(enabled_senders({
+            'email': lambda: self.send_expiry_email_notification(expired_items),
+            'wechat': lambda: self.send_expiry_wechat_notification(expired_items),
+            'sms': lambda: self.send_expiry_sms_notification(expired_items),
+        }, self.notification_config))
     
     def send_expiry_email_notification(self, expired_items):
         """发送到期邮件通知"""
@@ -404,15 +262,7 @@ class SmartExpiryChecker:
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             # 发送邮件
-            if config['smtp_port'] == 465:
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("✅ 到期邮件通知发送成功")
             return True
@@ -440,7 +290,7 @@ class SmartExpiryChecker:
                 }
             }
             
-            response = requests.post(config['webhook_url'], json=payload)
+            response = post_json(config['webhook_url'], payload)
             if response.status_code == 200:
                 print("✅ 到期微信通知发送成功")
                 return True
@@ -470,7 +320,7 @@ class SmartExpiryChecker:
                 "message": content
             }
             
-            response = requests.post(config['api_url'], json=payload)
+            response = post_json(config['api_url'], payload)
             if response.status_code == 200:
                 print("✅ 到期短信通知发送成功")
                 return True
@@ -498,14 +348,12 @@ class SmartExpiryChecker:
         """发送恭喜通知"""
         print("🎉 发送恭喜通知...")
         
-        # 发送恭喜邮件
-        self.send_congratulations_email()
-        
-        # 发送恭喜微信通知
-        self.send_congratulations_wechat()
-        
-        # 发送恭喜短信
-        self.send_congratulations_sms()
+        # 邮件、微信、短信并发发送
+        return dispatch(enabled_senders({
+            'email': self.send_congratulations_email,
+            'wechat': self.send_congratulations_wechat,
+            'sms': self.send_congratulations_sms,
+        }, self.notification_config))
     
     def send_congratulations_email(self):
         """发送恭喜邮件"""
@@ -548,15 +396,7 @@ class SmartExpiryChecker:
             msg.attach(MIMEText(body, 'plain', 'utf-8'))
             
             # 发送邮件
-            if config['smtp_port'] == 465:
-                server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-            else:
-                server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-                server.starttls()
-            
-            server.login(config['username'], config['password'])
-            server.send_message(msg)
-            server.quit()
+            send_mail(config, msg)
             
             print("✅ 恭喜邮件发送成功")
             return True
@@ -584,7 +424,7 @@ class SmartExpiryChecker:
                 }
             }
             
-            response = requests.post(config['webhook_url'], json=payload)
+            response = post_json(config['webhook_url'], payload)
             if response.status_code == 200:
                 print("✅ 恭喜微信通知发送成功")
                 return True
@@ -614,7 +454,7 @@ class SmartExpiryChecker:
                 "message": content
             }
             
-            response = requests.post(config['api_url'], json=payload)
+            response = post_json(config['api_url'], payload)
             if response.status_code == 200:
                 print("✅ 恭喜短信发送成功")
                 return True
@@ -628,7 +468,8 @@ class SmartExpiryChecker:
     
     def run_check(self):
         """执行智能检查流程"""
-        print(f"\n=== 开始执行智能检查任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+        self.current_date = get_beijing_time()
+        print(f"\n=== 开始执行智能检查任务 - {self.current_date.strftime('%Y-%m-%d %H:%M:%S')} ===")
         
         # 备份Excel文件
         self.backup_excel()
@@ -642,9 +483,13 @@ class SmartExpiryChecker:
         # 查找关键列
         columns = self.find_columns(df)
         
-        # 第一步：先更新剩余天数（每天减1）
-        updated_count = self.update_remaining_days(df, columns)
-        print(f"📅 更新了 {updated_count} 个项目的剩余天数（每天减1）")
+        # 第一步：先更新剩余天数（每天减1，日期模式下按到期日期推导）
+        needs_save = True
+        if self.expiry_mode == 'date':
+            needs_save = self.derive_remaining_days(df, columns)
+        else:
+            updated_count = self.update_remaining_days(df, columns)
+            print(f"📅 更新了 {updated_count} 个项目的剩余天数")
         
         # 第二步：检查到期项目（减1后可能变成0的项目）
         expired_items = self.check_expiry_items(df, columns)
@@ -658,15 +503,21 @@ class SmartExpiryChecker:
         updated_items = self.update_expired_items(df, columns)
         print(f"🔄 重置了 {len(updated_items)} 个到期项目")
         
-        # 保存更新后的Excel文件
-        if self.save_excel_file(df):
+        # 保存更新后的Excel文件（日期模式下只有重置或首次生成到期日期时才写入）
+        if not (needs_save or updated_items):
+            print("📄 日期模式下没有需要写入的变化，跳过保存")
+        elif self.save_excel_file(df):
             print("💾 Excel文件已更新并保存")
+            if self.expiry_mode != 'date':
+                write_last_run(self.excel_file, self.run_date())
         
         # 如果没有到期项目，发送恭喜通知
         if not expired_items:
             print("🎉 没有到期项目，发送恭喜通知")
             self.send_congratulations_notification()
         
+        # 关闭本次运行共用的SMTP连接并输出耗时
+        close_transports()
         print("=== 智能检查任务完成 ===\n")
 
 def main():
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SMTP连接复用 - 同一次运行内的所有邮件共用一个已登录的连接，服务器断开时自动重连
+
+每封邮件单独 connect + TLS握手 + login 要一到几秒；这里按 (服务器, 端口, 用户名) 保留连接，
+运行结束时 close_transports() 关闭连接并输出SMTP的总耗时。
+"""
+
+import atexit
+import os
+import smtplib
+import threading
+import time
+
+# 连接和收发的超时（秒）
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '30'))
+
+# 服务器已断开连接时的异常（空闲超时后服务器还可能回复 421，见 send）
+_DISCONNECTED = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+class SMTPTransport:
+    """一个已登录的SMTP连接：465端口用SSL，其他端口用STARTTLS"""
+
+    def __init__(self, config):
+        self.host = config['smtp_server']
+        self.port = int(config['smtp_port'])
+        self.username = config['username']
+        self.password = config['password']
+        self.server = None
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.sent = 0
+        self.seconds = 0.0
+
+    def connect(self):
+        """建立连接并登录"""
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            server.starttls()
+        server.login(self.username, self.password)
+        self.server = server
+        self.connects += 1
+        if self.connects > 1:
+            print(f"🔌 SMTP连接已断开，重新连接 {self.host}:{self.port}")
+
+    def _drop(self):
+        """丢弃当前连接（不等待服务器响应）"""
+        if self.server is not None:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+        self.server = None
+
+    def send(self, msg, to_addrs=None):
+        """发送一封邮件；连接已被服务器关闭时重连后重发一次"""
+        with self.lock:
+            start = time.perf_counter()
+            try:
+                if self.server is None:
+                    self.connect()
+                try:
+                    self.server.send_message(msg, to_addrs=to_addrs)
+                except _DISCONNECTED:
+                    self._drop()
+                    self.connect()
+                    self.server.send_message(msg, to_addrs=to_addrs)
+                except smtplib.SMTPResponseException as e:
+                    if e.smtp_code != 421:
+                        raise
+                    self._drop()
+                    self.connect()
+                    self.server.send_message(msg, to_addrs=to_addrs)
+                self.sent += 1
+            except Exception:
+                self._drop()
+                raise
+            finally:
+                self.seconds += time.perf_counter() - start
+
+    def close(self):
+        """退出登录并关闭连接"""
+        with self.lock:
+            if self.server is not None:
+                try:
+                    self.server.quit()
+                except Exception:
+                    pass
+            self.server = None
+
+
+def get_transport(config):
+    """按 (服务器, 端口, 用户名) 取共用的连接"""
+    key = (config['smtp_server'], int(config['smtp_port']), config['username'])
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = SMTPTransport(config)
+        return transport
+
+
+def send_mail(config, msg, to_addrs=None):
+    """用共用的连接发送邮件，失败时抛出异常"""
+    get_transport(config).send(msg, to_addrs=to_addrs)
+
+
+def close_transports():
+    """关闭所有连接，输出本次运行的SMTP耗时"""
+    with _transports_lock:
+        transports = list(_transports.values())
+        _transports.clear()
+    for transport in transports:
+        transport.close()
+        if transport.sent or transport.connects:
+            print(f"📧 SMTP {transport.host}: 发送 {transport.sent} 封邮件，连接 {transport.connects} 次，"
+                  f"耗时 {transport.seconds:.2f}秒")
+
+
+atexit.register(close_transports)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分页渲染 - 行数多的表格拆成多页（每页重复表头），在进程池里并行绘制，按页序发送
+
+整张表画在一张 16×15 的图上，几十行以后文字就看不清了，企业微信也不接收超过2MB的图片。
+"""
+
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import raster_table
+from image_encoder import IMAGE_MAX_BYTES
+from font_resolver import setup_matplotlib_font
+from render_cache import get_render, put_render, render_key
+
+# 分页模式: off=整张表一张图（默认）, auto=按行数和图片大小自动分页, 数字=每页固定行数
+TABLE_PAGES = os.getenv('TABLE_PAGES', 'off').lower()
+
+# 每页最多的行数（16×15的图按3倍行高能看清的行数）
+MAX_PAGE_ROWS = 30
+
+# 并行绘制的进程数
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+HEADER_FILL = '#f0f0f0'
+HIGHLIGHT_FILL = '#ff9999'
+HIGHLIGHT_COLOR = '#990000'
+
+
+def pages_enabled():
+    """是否使用分页模式"""
+    return TABLE_PAGES != 'off'
+
+
+def fixed_page_rows():
+    """TABLE_PAGES为数字时的每页行数，否则返回None"""
+    return int(TABLE_PAGES) if TABLE_PAGES.isdigit() and int(TABLE_PAGES) > 0 else None
+
+
+def split_rows(total, rows_per_page):
+    """把 total 行平均分成每页不超过 rows_per_page 行，返回 [(开始, 结束), ...]"""
+    if total == 0:
+        return [(0, 0)]
+    count = math.ceil(total / rows_per_page)
+    size = math.ceil(total / count)
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def draw_page(rows, headers, title, highlight, font_list, renderer):
+    """绘制一页，返回PNG字节（在子进程中运行，参数和返回值都要能pickle）"""
+    if renderer == 'pillow':
+        return raster_table.render_table(rows, headers, title, highlight=highlight,
+                                         font_size=8, dpi=150).getvalue()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # 子进程里直接按缓存的字体路径注册字体（font_list只用于渲染缓存的键）
+    setup_matplotlib_font()
+
+    # 图片高度随本页行数变化，30行时与整表模式的 16×15 相同
+    fig, ax = plt.subplots(figsize=(16, 2 + 0.43 * max(len(rows), 1)))
+    ax.axis('tight')
+    ax.axis('off')
+    table = ax.table(cellText=rows or [[''] * len(headers)], colLabels=headers,
+                     cellLoc='center', loc='center', bbox=[0, 0, 1, 1])
+    table.auto_set_font_size(False)
+    table.set_fontsize(8)
+    table.scale(1, 3.0)
+
+    highlight = set(highlight)
+    for i in range(len(rows) + 1):
+        for j in range(len(headers)):
+            if i == 0:
+                table[(i, j)].set_facecolor(HEADER_FILL)
+                table[(i, j)].set_text_props(weight='bold', color='#333333')
+            elif i - 1 in highlight:
+                table[(i, j)].set_facecolor(HIGHLIGHT_FILL)
+                table[(i, j)].set_text_props(weight='bold', color=HIGHLIGHT_COLOR)
+
+    plt.title(title, fontsize=16, fontweight='bold', pad=20)
+    img_buffer = io.BytesIO()
+    plt.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight', facecolor='white', edgecolor='none')
+    plt.close(fig)
+    return img_buffer.getvalue()
+
+
+def _render_all(jobs):
+    """绘制多页：多于一页时用进程池并行，进程池不可用时逐页绘制"""
+    if len(jobs) > 1 and RENDER_WORKERS > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(RENDER_WORKERS, len(jobs))) as pool:
+                return list(pool.map(draw_page, *zip(*jobs)))
+        except Exception as e:
+            print(f"⚠️ 并行绘制失败，改为逐页绘制: {e}")
+    return [draw_page(*job) for job in jobs]
+
+
+def render_pages(rows, headers, title, highlight=(), font_list=None, rows_per_page=None):
+    """
+    分页绘制表格，返回按页序排列的PNG字节列表
+
+    每页最多 MAX_PAGE_ROWS 行（各页行数尽量平均）；有图片超过 IMAGE_MAX_BYTES 时按比例减少每页行数重画。
+    已经画过的页直接用渲染缓存。
+    """
+    renderer = raster_table.renderer_name()
+    rows_per_page = rows_per_page or fixed_page_rows() or MAX_PAGE_ROWS
+    highlight = set(highlight)
+
+    while True:
+        ranges = split_rows(len(rows), max(rows_per_page, 1))
+        count = len(ranges)
+        jobs, keys, pages = [], [], [None] * count
+        for number, (start, stop) in enumerate(ranges):
+            page_rows = [list(map(str, row)) for row in rows[start:stop]]
+            page_title = f"{title}（第{number + 1}/{count}页）" if count > 1 else title
+            page_highlight = sorted(i - start for i in highlight if start <= i < stop)
+            key = render_key(page_rows, page_title, ['page', font_list, renderer, page_highlight], 150)
+            cached = get_render(key)
+            if cached is not None:
+                pages[number] = cached.getvalue()
+            else:
+                jobs.append((page_rows, headers, page_title, page_highlight, font_list, renderer))
+                keys.append((number, key))
+
+        for (number, key), data in zip(keys, _render_all(jobs)):
+            pages[number] = data
+            put_render(key, data)
+
+        largest = max(len(page) for page in pages)
+        if largest <= IMAGE_MAX_BYTES or rows_per_page <= 1:
+            print(f"✅ 表格分为 {count} 页，每页最多 {rows_per_page} 行，最大 {largest / 1024:.0f}KB")
+            return pages
+        # 图片太大：按超出的比例减少每页行数
+        rows_per_page = max(1, min(rows_per_page - 1, int(rows_per_page * IMAGE_MAX_BYTES / largest * 0.9)))
+        print(f"⚠️ 单页图片 {largest / 1024:.0f}KB 超过上限，改为每页 {rows_per_page} 行重新绘制")
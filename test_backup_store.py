@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试去重 + 增量备份存储
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import backup_store
+
+
+# 测试用的表格数据（备份目录由 conftest 指向临时目录）
+ROWS = {
+    '行号': list(range(1, 11)),
+    ' 店铺名称': [f'店铺{i}' for i in range(1, 11)],
+    '总天': [14] * 10,
+    '剩余': list(range(10)),
+    '开始时间': [20261001 + i for i in range(10)],
+    '备注1': ['大桶2个', None] * 5,
+}
+
+
+def edit(path, **changes):
+    """修改第一行并保存"""
+    df = pd.read_excel(path)
+    for column, value in changes.items():
+        df.loc[0, column] = value
+    df.to_excel(path, index=False)
+    return df
+
+
+def manifest():
+    """读取备份版本列表"""
+    with open(os.path.join(backup_store.BACKUP_DIR, 'manifest.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_identical_backup_is_skipped(make_workbook):
+    """内容没有变化时不新增版本"""
+    path = make_workbook(ROWS)
+    now = datetime(2026, 10, 18, 7)
+    first = backup_store.backup_workbook(path, now)
+    assert backup_store.backup_workbook(path, now + timedelta(hours=1)) == first
+    assert len(manifest()) == 1
+    assert manifest()[0]['kind'] == 'full'
+
+
+def test_delta_restores_exactly(make_workbook):
+    """小改动只存增量，恢复后的数据与原表一致"""
+    path = make_workbook(ROWS)
+    now = datetime(2026, 10, 18, 7)
+    backup_store.backup_workbook(path, now)
+    expected = edit(path, 剩余=13, 备注1='小桶')
+    backup_store.backup_workbook(path, now + timedelta(days=1))
+
+    entries = manifest()
+    assert [entry['kind'] for entry in entries] == ['full', 'delta']
+    assert len(os.listdir(os.path.join(backup_store.BACKUP_DIR, 'objects'))) == 1
+
+    out_file = os.path.join(os.path.dirname(path), 'restored.xlsx')
+    backup_store.restore(entries[1]['sha'][:12], out_file)
+    pd.testing.assert_frame_equal(pd.read_excel(out_file), expected, check_dtype=False)
+
+    backup_store.restore(entries[0]['sha'][:12], out_file)
+    assert pd.read_excel(out_file).loc[0, '剩余'] == 0
+
+
+def test_full_snapshot_every_n_versions(make_workbook):
+    """距上个完整快照的版本数达到 FULL_EVERY 时保存完整快照（每天一个版本，都在保留期内）"""
+    path = make_workbook(ROWS)
+    now = datetime(2026, 10, 18, 7)
+    backup_store.backup_workbook(path, now)
+    for i in range(1, backup_store.FULL_EVERY + 1):
+        edit(path, 剩余=100 + i)
+        backup_store.backup_workbook(path, now + timedelta(days=i))
+    kinds = [entry['kind'] for entry in manifest()]
+    assert kinds == ['full'] + ['delta'] * (backup_store.FULL_EVERY - 1) + ['full']
+
+
+def test_retention_and_restore_by_time(make_workbook):
+    """按日/周/月保留，删除的版本不再占用空间；按日期恢复当天最后一个版本"""
+    path = make_workbook(ROWS)
+    start = datetime(2025, 1, 1, 7)
+    for day in range(0, 400, 3):
+        edit(path, 剩余=day)
+        backup_store.backup_workbook(path, start + timedelta(days=day))
+
+    entries = manifest()
+    times = [datetime.strptime(entry['time'], backup_store.TIME_FORMAT) for entry in entries]
+    assert len(entries) <= backup_store.KEEP_DAILY + backup_store.KEEP_WEEKLY + backup_store.KEEP_MONTHLY
+    assert times[-1] == start + timedelta(days=399)
+    assert times[0] >= times[-1] - timedelta(days=31 * backup_store.KEEP_MONTHLY)
+
+    used = {entry['base'] for entry in entries}
+    objects = {name[:-5] for name in os.listdir(os.path.join(backup_store.BACKUP_DIR, 'objects'))}
+    assert objects == used
+
+    out_file = os.path.join(os.path.dirname(path), 'restored.xlsx')
+    point = times[-3].strftime('%Y-%m-%d')
+    assert backup_store.restore(point, out_file)['time'] == entries[-3]['time']
+    assert pd.read_excel(out_file).loc[0, '剩余'] == (times[-3] - start).days
+
+
+def test_same_day_rerun_keeps_pre_run_snapshot(make_workbook):
+    """同一天重新运行后，当天第一个版本（运行前的状态）仍然保留"""
+    path = make_workbook(ROWS)
+    now = datetime(2026, 10, 18, 7)
+    backup_store.backup_workbook(path, now - timedelta(days=1))
+    edit(path, 剩余=20)
+    backup_store.backup_workbook(path, now)
+    edit(path, 剩余=21)
+    backup_store.backup_workbook(path, now + timedelta(hours=1))
+    edit(path, 剩余=22)
+    backup_store.backup_workbook(path, now + timedelta(hours=2))
+    times = [entry['time'] for entry in manifest()]
+    assert now.strftime(backup_store.TIME_FORMAT) in times
+    assert (now + timedelta(hours=1)).strftime(backup_store.TIME_FORMAT) not in times
+    assert len(times) == 3
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 备份存储测试通过")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试整列日期解析
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from date_parser import parse_date_column, parse_date_value
+
+
+def test_single_format_integer_column():
+    """整数YYYYMMDD列，含空值和整数值的浮点数"""
+    dates, bad_rows = parse_date_column(pd.Series([20260810, np.nan, 20260901.0]), report=False)
+    assert dates.tolist()[0] == pd.Timestamp('2026-08-10')
+    assert pd.isna(dates.iloc[1])
+    assert dates.tolist()[2] == pd.Timestamp('2026-09-01')
+    assert bad_rows == []
+
+
+def test_mixed_formats_and_bad_rows():
+    """混合格式逐个回退，无法解析的行批量返回"""
+    column = pd.Series(['2026-08-10', '20260811', '2026/08/12', '2026年08月13日', '202510929', None])
+    dates, bad_rows = parse_date_column(column, report=False)
+    assert dates.iloc[:4].dt.day.tolist() == [10, 11, 12, 13]
+    assert bad_rows == [4]
+
+
+def test_parse_date_value():
+    """单值解析与原 parse_date 行为一致"""
+    assert parse_date_value(20250403) == datetime(2025, 4, 3)
+    assert parse_date_value('2025年04月03日') == datetime(2025, 4, 3)
+    assert parse_date_value('无') is None
+    assert parse_date_value(None) is None
+
+
+if __name__ == "__main__":
+    test_single_format_integer_column()
+    test_mixed_formats_and_bad_rows()
+    test_parse_date_value()
+    print("✅ 日期解析测试通过")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试表格缓存
+"""
+
+import os
+
+import pandas as pd
+
+import excel_cache
+import excel_loader
+from excel_loader import load_table
+
+
+def rows(remaining=(2, 0, 10)):
+    """测试用的表格数据"""
+    return {
+        '行号': [1, 2, 3],
+        ' 店铺名称': ['南四湖', '铭阳饭店', '和谐面馆'],
+        '地址': ['西苇路', '西苇路', '民泰路'],
+        '总天': [14, 14, 10],
+        '剩余': list(remaining),
+        '开始时间': [20260810, 20260810, 20260822],
+    }
+
+
+def cached_tables():
+    """缓存目录中的表格缓存文件"""
+    return {name for name in os.listdir(excel_cache.CACHE_DIR) if name.startswith('table-')}
+
+
+def count_parses(monkeypatch):
+    """统计 _read_sheet 的调用次数"""
+    calls = []
+    original = excel_loader._read_sheet
+
+    def wrapped(path, fields):
+        calls.append(path)
+        return original(path, fields)
+
+    monkeypatch.setattr(excel_loader, '_read_sheet', wrapped)
+    return calls
+
+
+def test_second_load_hits_cache(make_workbook, monkeypatch):
+    """同一工作簿第二次读取不再解析Excel，结果和列类型与第一次相同"""
+    path = make_workbook(rows())
+    calls = count_parses(monkeypatch)
+    first = load_table(path, report=False)
+    excel_cache._tables.clear()  # 模拟另一个脚本：只剩磁盘上的缓存
+    second = load_table(path, report=False)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert any(name.endswith(excel_cache.CACHE_FORMAT) for name in cached_tables())
+
+
+def test_changed_workbook_invalidates_cache(make_workbook):
+    """工作簿内容变化后重新解析，并清理旧内容的缓存文件"""
+    path = make_workbook(rows())
+    load_table(path, report=False)
+    old_files = cached_tables()
+
+    os.replace(make_workbook(rows(remaining=(1, 13, 9)), 'other.xlsx'), path)
+    df = load_table(path, report=False)
+    assert df['剩余'].tolist() == [1, 13, 9]
+    assert cached_tables() and not old_files & cached_tables()
+
+
+def test_returned_table_is_a_copy(make_workbook):
+    """修改读取到的表格不影响缓存"""
+    path = make_workbook(rows())
+    df = load_table(path, report=False)
+    df.loc[0, '剩余'] = 99
+    assert load_table(path, report=False).loc[0, '剩余'] == 2
+
+
+def test_fields_are_cached_separately(make_workbook):
+    """不同的列集合分别缓存"""
+    path = make_workbook(rows())
+    full = load_table(path, report=False)
+    pruned = load_table(path, ['remaining', 'total'], report=False)
+    assert len(full.columns) == 6
+    assert list(pruned.columns) == ['总天', '剩余']
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 表格缓存测试通过")
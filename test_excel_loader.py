@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按列读取Excel
+"""
+
+import pandas as pd
+
+from excel_loader import load_table
+
+ROWS = {
+    '行号': [1, 2, 3],
+    ' 店铺名称': ['南四湖', '铭阳饭店', '和谐面馆'],
+    '地址': ['西苇路', '西苇路', '民泰路'],
+    '总天': [14, 14, 10],
+    '剩余': [2, 0, 10],
+    '开始时间': [20260810, 20260810, 20260822],
+    '备注1': ['大桶2个', None, '大桶1个'],
+}
+
+
+def test_full_load_matches_read_excel(make_workbook):
+    """读取全部列时数据与pd.read_excel一致，并使用指定的列类型"""
+    path = make_workbook(ROWS)
+    df = load_table(path, report=False)
+    expected = pd.read_excel(path)
+    assert list(df.columns) == list(expected.columns)
+    assert df['剩余'].dtype == 'int16' and df['总天'].dtype == 'int16'
+    assert df['地址'].dtype == 'category' and df['备注1'].dtype == 'category'
+    assert df['剩余'].tolist() == expected['剩余'].tolist()
+    assert df['开始时间'].tolist() == expected['开始时间'].tolist()
+
+
+def test_only_requested_columns_are_loaded(make_workbook):
+    """只读取需要的逻辑列"""
+    df = load_table(make_workbook(ROWS), ['remaining', 'total', 'start_date'], report=False)
+    assert list(df.columns) == ['总天', '剩余', '开始时间']
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ Excel读取测试通过")
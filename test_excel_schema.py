@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试表头解析和缓存
+"""
+
+import os
+
+import excel_schema
+from excel_schema import resolve_columns
+
+HEADER = ['行号', ' 店铺名称', '地址', '总天', '剩余', '开始时间', '备注1', '备注2', '备注3']
+
+
+def test_resolve_current_layout():
+    """当前表格布局，包括前面带空格的 ' 店铺名称'"""
+    columns = resolve_columns(HEADER)
+    assert columns['name'] == ' 店铺名称'
+    assert (columns['remaining'], columns['total'], columns['start_date']) == ('剩余', '总天', '开始时间')
+    assert columns['notes'] == ['备注1', '备注2', '备注3']
+
+
+def test_generic_keyword_does_not_steal_columns():
+    """'天'和'到期'这类宽泛关键词不会抢走其他逻辑列"""
+    columns = resolve_columns(['剩余天数', '开始日期', '周期天', '到期日期'])
+    assert columns['remaining'] == '剩余天数'
+    assert columns['total'] == '周期天'
+    assert columns['expiry'] == '到期日期'
+
+
+def test_mapping_is_persisted_per_header(monkeypatch):
+    """同一表头只扫描一次，映射按表头哈希持久化"""
+    resolve_columns(HEADER)
+    assert os.path.exists(excel_schema.SCHEMA_CACHE_FILE)
+
+    excel_schema._memory_cache.clear()
+    scans = []
+    original_scan = excel_schema._scan
+    monkeypatch.setattr(excel_schema, '_scan', lambda header: scans.append(header) or original_scan(header))
+    assert resolve_columns(HEADER)['remaining'] == '剩余'
+    resolve_columns(HEADER + ['备注4'])
+    assert scans == [HEADER + ['备注4']]
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 表头解析测试通过")
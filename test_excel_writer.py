@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试只写回改动过的单元格
+"""
+
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from excel_writer import changed_cells, save_changes
+
+
+def formatted_workbook(tmp_path):
+    """在tmp_path下生成带格式和第二个工作表的测试Excel文件"""
+    path = str(tmp_path / 'yxc.xlsx')
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({
+            '行号': [1, 2, 3],
+            ' 店铺名称': ['南四湖', '铭阳饭店', '和谐面馆'],
+            '总天': [14, 14, 10],
+            '剩余': [2, 0, 10],
+            '开始时间': [20260810, 20260810, 20260822],
+            '备注1': ['大桶2个', None, '大桶1个'],
+        }).to_excel(writer, sheet_name='Sheet1', index=False)
+        pd.DataFrame({'说明': ['不要改动']}).to_excel(writer, sheet_name='说明', index=False)
+
+    workbook = load_workbook(path)
+    sheet = workbook['Sheet1']
+    sheet['B2'].font = Font(bold=True, color='FF0000')
+    sheet['D3'].fill = PatternFill('solid', fgColor='FFFF00')
+    sheet.column_dimensions['B'].width = 30
+    workbook.save(path)
+    return path
+
+
+def test_changed_cells_ignores_unchanged_and_empty():
+    """只返回值不同的单元格，两边都为空不算改动"""
+    before = pd.DataFrame({'剩余': [2, 0, 10], '备注1': ['a', None, 'b']})
+    after = before.copy()
+    after.loc[1, '剩余'] = 14
+    assert changed_cells(before, after) == {'剩余': [(1, 14)]}
+    assert changed_cells(before, before.copy()) == {}
+
+
+def test_patch_keeps_formatting_and_other_cells(tmp_path):
+    """写回改动后，格式、列宽、其他单元格和其他工作表保持不变"""
+    path = formatted_workbook(tmp_path)
+    before = pd.read_excel(path)
+    after = before.copy()
+    after.loc[0, '剩余'] = 1
+    after.loc[1, '剩余'] = 14
+    after.loc[1, '开始时间'] = 20261018
+
+    assert save_changes(path, before, after) == 3
+
+    workbook = load_workbook(path)
+    sheet = workbook['Sheet1']
+    assert sheet['D2'].value == 1 and sheet['D3'].value == 14 and sheet['E3'].value == 20261018
+    assert sheet['B2'].font.bold and sheet['D3'].fill.fgColor.rgb == '00FFFF00'
+    assert sheet.column_dimensions['B'].width == 30
+    assert workbook['说明']['A2'].value == '不要改动'
+    assert pd.read_excel(path).equals(after)
+
+
+def test_no_changes_skips_write(tmp_path):
+    """没有改动时不写文件"""
+    path = formatted_workbook(tmp_path)
+    before = pd.read_excel(path)
+    mtime = os.stat(path).st_mtime_ns
+    assert save_changes(path, before, before.copy()) == 0
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_new_column_is_appended(tmp_path):
+    """新增的列追加到表格最后"""
+    path = formatted_workbook(tmp_path)
+    before = pd.read_excel(path)
+    after = before.copy()
+    after['到期日期'] = [20260824, 20260824, 20260901]
+
+    save_changes(path, before, after)
+    df = pd.read_excel(path)
+    assert list(df.columns)[-1] == '到期日期'
+    assert df['到期日期'].tolist() == [20260824, 20260824, 20260901]
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ Excel写入测试通过")
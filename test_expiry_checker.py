@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试到期检查基类 - 三个监控器共用同一份剩余天数更新和到期重置
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from cloud_monitor import CloudExpiryChecker
+from expiry_checker import ExpiryCheckerBase
+from github_monitor import GitHubExpiryChecker
+from smart_monitor import SmartExpiryChecker
+from wechat_with_image_fix import WeChatImageSender
+
+COLUMNS = {'remaining': '剩余', 'total': '总天', 'start_date': '开始时间'}
+RUN_DATE = datetime(2026, 10, 18, 7, 0, tzinfo=timezone(timedelta(hours=8)))
+
+
+def make_df():
+    """构造测试表格"""
+    return pd.DataFrame({
+        ' 店铺名称': ['甲', '乙', '丙'],
+        '总天': [10, 7, 14],
+        '剩余': [1, 0, 5],
+        '开始时间': [20261009, 20261011, 20261009],
+    })
+
+
+def test_monitors_share_base():
+    """三个监控器都使用基类的剩余天数更新、重置和保存"""
+    for cls in (SmartExpiryChecker, GitHubExpiryChecker, CloudExpiryChecker):
+        assert issubclass(cls, ExpiryCheckerBase)
+        for name in ('run_date', 'save_excel_file', 'update_remaining_days', 'derive_remaining_days',
+                     'update_expired_items'):
+            assert getattr(cls, name) is getattr(ExpiryCheckerBase, name)
+
+
+def test_decrement_and_reset_use_run_date():
+    """每天减1后重置到期项目，开始时间为本次运行的北京日期"""
+    checker = ExpiryCheckerBase()
+    checker.excel_file = 'test_expiry_checker.xlsx'
+    checker.current_date = RUN_DATE
+    df = make_df()
+    assert checker.update_remaining_days(df, COLUMNS) == 2
+    assert df['剩余'].tolist() == [0, 0, 4]
+    updated = checker.update_expired_items(df, COLUMNS)
+    assert len(updated) == 2
+    assert df['剩余'].tolist() == [10, 7, 4]
+    assert df['开始时间'].tolist() == [20261018, 20261018, 20261009]
+
+
+def test_wechat_reset_matches_engine():
+    """企业微信报告的重置与基类结果相同"""
+    checker = ExpiryCheckerBase()
+    expected = make_df()
+    checker.update_expired_items(expected, COLUMNS)
+    df = make_df()
+    assert WeChatImageSender().reset_expired_items(df, COLUMNS) == 1
+    pd.testing.assert_frame_equal(df, expected)
+
+
+if __name__ == "__main__":
+    test_monitors_share_base()
+    test_decrement_and_reset_use_run_date()
+    test_wechat_reset_matches_engine()
+    print("✅ 到期检查基类测试通过")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试到期计算引擎 - 与原iterrows逐行逻辑的结果保持一致
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from expiry_engine import (advance_remaining, catch_up_remaining, decrement_remaining, derive_remaining,
+                           ensure_expiry_dates, find_expired, reset_expired)
+
+COLUMNS = {'remaining': '剩余', 'total': '总天', 'start_date': '开始时间'}
+
+
+def make_df(rows=200, seed=0, start_as_str=False):
+    """构造测试表格"""
+    rng = np.random.default_rng(seed)
+    total = rng.choice([7, 10, 14, 30], size=rows)
+    df = pd.DataFrame({
+        '行号': np.arange(1, rows + 1),
+        ' 店铺名称': [f'店铺{i}' for i in range(rows)],
+        '地址': rng.choice(['西苇路', '民泰路', '匡衡路'], size=rows),
+        '总天': total,
+        '剩余': rng.integers(0, 4, size=rows),
+        '开始时间': rng.choice([20260810, 20260816, 20260822], size=rows),
+    })
+    if start_as_str:
+        df['开始时间'] = df['开始时间'].astype(str)
+    return df
+
+
+def legacy_decrement(df, columns):
+    """原 update_remaining_days 逐行逻辑"""
+    updated_count = 0
+    for idx, row in df.iterrows():
+        current_remaining = row[columns['remaining']]
+        if pd.notna(current_remaining) and int(current_remaining) == 0:
+            continue
+        if pd.notna(current_remaining) and int(current_remaining) > 0:
+            df.at[idx, columns['remaining']] = max(0, int(current_remaining) - 1)
+            updated_count += 1
+    return updated_count
+
+
+def legacy_reset(df, columns, current_date):
+    """原 update_expired_items 逐行逻辑"""
+    rows = []
+    new_start_date = current_date.strftime('%Y%m%d')
+    for idx, row in df.iterrows():
+        remaining = row[columns['remaining']]
+        if pd.notna(remaining) and int(remaining) == 0:
+            if pd.api.types.is_integer_dtype(df[columns['start_date']]):
+                df.at[idx, columns['start_date']] = int(new_start_date)
+            else:
+                df.at[idx, columns['start_date']] = str(new_start_date)
+            df.at[idx, columns['remaining']] = row[columns['total']]
+            rows.append(row.get('行号', idx + 1))
+    return rows
+
+
+def test_decrement_matches_legacy():
+    """每日减1与原逻辑一致"""
+    expected = make_df()
+    actual = expected.copy()
+    assert decrement_remaining(actual, COLUMNS) == legacy_decrement(expected, COLUMNS)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_find_and_reset_match_legacy():
+    """到期检测和重置与原逻辑一致，并保持开始时间的数据类型"""
+    today = datetime(2026, 10, 18)
+    for start_as_str in (False, True):
+        expected = make_df(start_as_str=start_as_str)
+        actual = expected.copy()
+
+        legacy_decrement(expected, COLUMNS)
+        decrement_remaining(actual, COLUMNS)
+
+        expired = find_expired(actual, COLUMNS)
+        expected[COLUMNS['remaining']] = pd.to_numeric(expected[COLUMNS['remaining']], errors='coerce')
+        assert [item['row'] for item in expired] == expected.loc[expected['剩余'] == 0, '行号'].tolist()
+
+        legacy_rows = legacy_reset(expected, COLUMNS, today)
+        updated_items = reset_expired(actual, COLUMNS, today)
+        assert [item['row'] for item in updated_items] == legacy_rows
+        assert all(item['new_start'] == '20261018' for item in updated_items)
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_missing_values_are_left_alone():
+    """空值和负数不参与减1和重置"""
+    df = make_df(rows=5)
+    df['剩余'] = [np.nan, -1, 0, 1, 5]
+    assert decrement_remaining(df, COLUMNS) == 2
+    assert df['剩余'].tolist()[1:] == [-1, 0, 0, 4]
+    assert np.isnan(df['剩余'].iloc[0])
+    assert len(reset_expired(df, COLUMNS, datetime(2026, 10, 18))) == 2
+
+
+def test_date_mode_derives_remaining_from_expiry():
+    """日期模式：剩余天数由到期日期推导，重置时同步更新到期日期"""
+    df = make_df(rows=3)
+    df['总天'] = [10, 10, 7]
+    df['开始时间'] = [20261010, 20261008, 20261001]
+    columns = dict(COLUMNS)
+
+    assert ensure_expiry_dates(df, columns)
+    assert not ensure_expiry_dates(df, columns)
+    assert df['到期日期'].tolist() == [20261020, 20261018, 20261008]
+
+    today = datetime(2026, 10, 18)
+    derive_remaining(df, columns, today)
+    assert df['剩余'].tolist() == [2, 0, 0]
+
+    updated_items = reset_expired(df, columns, today)
+    assert [item['row'] for item in updated_items] == [2, 3]
+    # 行3在10-08到期、总天7，10-18才运行：最后一次到期是10-15，新周期到10-22，不往后推迟
+    assert df['到期日期'].tolist() == [20261020, 20261028, 20261022]
+    assert df['开始时间'].tolist() == [20261010, 20261018, 20261015]
+    assert df['剩余'].tolist() == [2, 10, 4]
+    assert derive_remaining(df, columns, today) == 0
+
+
+def replay_days(df, columns, elapsed, today):
+    """逐天执行"减1、到0重置"，最后一天（今天）只减1"""
+    for day in range(elapsed, 0, -1):
+        decrement_remaining(df, columns)
+        if day > 1:
+            reset_expired(df, columns, today - timedelta(days=day - 1))
+
+
+def test_catch_up_matches_day_by_day():
+    """补跑多天的结果与逐天执行完全一致"""
+    today = datetime(2026, 10, 18)
+    for elapsed in (1, 2, 3, 7, 15, 45):
+        for start_as_str in (False, True):
+            df = make_df(rows=300, seed=elapsed, start_as_str=start_as_str)
+            df['剩余'] = np.random.default_rng(elapsed).integers(0, 35, size=len(df))
+            expected = df.copy()
+            replay_days(expected, COLUMNS, elapsed, today)
+
+            catch_up_remaining(df, COLUMNS, elapsed, today)
+            assert df['剩余'].tolist() == expected['剩余'].tolist(), elapsed
+            assert df['开始时间'].astype(str).tolist() == expected['开始时间'].astype(str).tolist(), elapsed
+
+
+def test_catch_up_reports_missed_resets():
+    """漏跑期间到0的项目被找出，并记录最后一次重置的日期"""
+    df = make_df(rows=3)
+    df['总天'] = [7, 10, 14]
+    df['剩余'] = [1, 2, 9]
+    count, missed_items = catch_up_remaining(df, COLUMNS, 4, datetime(2026, 10, 18))
+    assert df['剩余'].tolist() == [4, 8, 5]
+    assert [(item['row'], item['resets'], item['last_reset']) for item in missed_items] == \
+        [(1, 1, '20261015'), (2, 1, '20261016')]
+    assert count == 3
+
+
+def test_advance_skips_when_already_run_today():
+    """今天已经运行过时不再减1，没有运行记录时按每天减1"""
+    df = make_df(rows=5)
+    before = df['剩余'].tolist()
+    assert advance_remaining(df, COLUMNS, 0, datetime(2026, 10, 18)) == (0, [])
+    assert df['剩余'].tolist() == before
+
+    expected = df.copy()
+    decrement_remaining(expected, COLUMNS)
+    advance_remaining(df, COLUMNS, None, datetime(2026, 10, 18))
+    assert df['剩余'].tolist() == expected['剩余'].tolist()
+
+
+if __name__ == "__main__":
+    test_decrement_matches_legacy()
+    test_find_and_reset_match_legacy()
+    test_missing_values_are_left_alone()
+    test_date_mode_derives_remaining_from_expiry()
+    test_catch_up_matches_day_by_day()
+    test_catch_up_reports_missed_resets()
+    test_advance_skips_when_already_run_today()
+    print("✅ 到期计算引擎测试通过")
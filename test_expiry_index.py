@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试到期索引
+"""
+
+import numpy as np
+import pandas as pd
+
+from expiry_index import ExpiryIndex
+from expiry_engine import find_expired
+
+REMAINING = [5, 0, 12, np.nan, 2, 0, 7, 6]
+
+
+def legacy_note3(remaining):
+    """原逐行分组逻辑（空值按正常处理）"""
+    labels = []
+    for value in remaining:
+        if pd.notna(value) and value < 3:
+            labels.append('即将到期')
+        elif pd.notna(value) and value < 7:
+            labels.append('1周内到期')
+        else:
+            labels.append('正常')
+    return labels
+
+
+def test_buckets_match_row_loop():
+    """分组标签和数量与逐行判断一致"""
+    index = ExpiryIndex(REMAINING)
+    expected = legacy_note3(REMAINING)
+    assert index.bucket_labels().tolist() == expected
+    assert index.bucket_counts() == {label: expected.count(label) for label in ('即将到期', '1周内到期', '正常')}
+
+
+def test_range_queries():
+    """区间查询和前K个"""
+    index = ExpiryIndex(REMAINING)
+    assert sorted(index.equal(0).tolist()) == [1, 5]
+    assert index.within(7).tolist() == [1, 5, 4, 0, 7]
+    assert index.between(5, 7).tolist() == [0, 7, 6]
+    assert index.top_k(3).tolist() == [1, 5, 4]
+    assert index.top_k(100).tolist() == [1, 5, 4, 0, 7, 6, 2]
+
+
+def test_random_against_scan():
+    """随机数据下与整列扫描结果一致"""
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 30, size=5000).astype(float)
+    values[rng.random(5000) < 0.05] = np.nan
+    index = ExpiryIndex(values)
+    for low, high in [(0, 0), (3, 6), (10, 40), (-5, 2)]:
+        expected = np.flatnonzero((values >= low) & (values <= high))
+        assert sorted(index.between(low, high).tolist()) == expected.tolist()
+    top = index.top_k(50)
+    assert np.all(values[top] <= np.nanmin(np.delete(values, top)))
+
+
+def test_find_expired_with_index():
+    """find_expired 使用索引时结果不变"""
+    df = pd.DataFrame({'行号': range(1, 9), '剩余': REMAINING})
+    columns = {'remaining': '剩余', 'row_number': '行号'}
+    index = ExpiryIndex.from_frame(df, columns)
+    assert find_expired(df.copy(), columns, index) == find_expired(df.copy(), columns)
+
+
+if __name__ == "__main__":
+    test_buckets_match_row_loop()
+    test_range_queries()
+    test_random_against_scan()
+    test_find_expired_with_index()
+    print("✅ 到期索引测试通过")
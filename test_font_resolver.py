@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试中文字体解析缓存
+"""
+
+import json
+import os
+
+import matplotlib
+import pytest
+
+import font_resolver
+
+# matplotlib自带的字体（没有中文字形）
+DEJAVU = os.path.join(matplotlib.get_data_path(), 'fonts', 'ttf', 'DejaVuSans.ttf')
+
+
+@pytest.fixture(autouse=True)
+def fresh_resolution():
+    """清空进程内的解析结果（字体缓存文件由 conftest 指向临时目录）"""
+    font_resolver.resolve_cjk_font.cache_clear()
+    yield
+    font_resolver.resolve_cjk_font.cache_clear()
+
+
+def write_cache(entry):
+    """写入字体缓存文件"""
+    with open(font_resolver.FONT_CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+
+
+def test_font_without_cjk_is_rejected():
+    """没有中文字形的字体不算能用"""
+    assert not font_resolver.renders_cjk(DEJAVU)
+    assert not font_resolver.renders_cjk('/nonexistent/font.ttf')
+
+
+def test_cached_path_is_used_without_probing(monkeypatch):
+    """缓存的字体文件没变时直接使用，不再检查候选字体"""
+    write_cache({'path': DEJAVU, 'family': 'Cached', 'state': font_resolver._file_state(DEJAVU)})
+
+    def no_probe():
+        raise AssertionError('不应重新检查字体')
+
+    monkeypatch.setattr(font_resolver, '_candidates', no_probe)
+    assert font_resolver.resolve_cjk_font() == {'path': DEJAVU, 'family': 'Cached'}
+
+
+def test_stale_cache_is_ignored():
+    """缓存的字体文件变了（或已删除）时重新检查"""
+    write_cache({'path': DEJAVU, 'family': 'Cached', 'state': [0, 0]})
+    assert font_resolver._load_cache() is None
+
+
+def test_scan_matches_keywords(tmp_path, monkeypatch):
+    """已知路径都没有时按文件名关键词扫描字体目录"""
+    for name in ('wqy-microhei.ttc', 'NotoSansCJK-Bold.otf', 'DejaVuSans.ttf'):
+        (tmp_path / name).touch()
+    monkeypatch.setattr(font_resolver, 'CJK_FONT_FILES', [])
+    monkeypatch.setattr(font_resolver, 'FONT_DIRS', [str(tmp_path)])
+    names = [os.path.basename(path) for path in font_resolver._candidates()]
+    assert sorted(names) == ['NotoSansCJK-Bold.otf', 'wqy-microhei.ttc']
+
+
+if __name__ == "__main__":
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 字体解析测试通过")
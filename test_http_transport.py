@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试HTTP连接复用：保持连接、5xx和限流错误码按退避重试、读超时不重试
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_transport
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """按 server.replies 的顺序返回 (状态码, 响应体)，记录每个请求的客户端端口"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.client_ports.append(self.client_address[1])
+        status, body, delay = self.server.replies.pop(0) if self.server.replies else (200, {'errcode': 0}, 0)
+        time.sleep(delay)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    """缩短重试的退避时间"""
+    monkeypatch.setattr(http_transport, 'HTTP_BACKOFF', 0.01)
+
+
+def start_server(replies=()):
+    """启动本地webhook服务器，返回 (server, url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+    server.replies = list(replies)
+    server.client_ports = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    http_transport.close_session()
+    return server, f"http://127.0.0.1:{server.server_port}/webhook"
+
+
+def test_text_and_image_share_connection():
+    """同一个机器人的两次请求走同一个连接"""
+    server, url = start_server()
+    try:
+        assert http_transport.post_json(url, {'msgtype': 'text'}).json()['errcode'] == 0
+        assert http_transport.post_json(url, {'msgtype': 'image'}).json()['errcode'] == 0
+        assert len(server.client_ports) == 2
+        assert len(set(server.client_ports)) == 1
+    finally:
+        server.shutdown()
+
+
+def test_retry_on_5xx_and_throttle_errcode():
+    """503 和 errcode 45009 都退避重试，直到成功"""
+    server, url = start_server([(503, {}, 0), (200, {'errcode': 45009, 'errmsg': 'api freq out of limit'}, 0)])
+    try:
+        response = http_transport.post_json(url, {'msgtype': 'text'})
+        assert response.json()['errcode'] == 0
+        assert len(server.client_ports) == 3
+    finally:
+        server.shutdown()
+
+
+def test_gives_up_after_retries():
+    """重试用完后返回最后一次的响应"""
+    server, url = start_server([(500, {}, 0)] * 5)
+    try:
+        response = http_transport.post_json(url, {'msgtype': 'text'}, retries=2)
+        assert response.status_code == 500
+        assert len(server.client_ports) == 3
+    finally:
+        server.shutdown()
+
+
+def test_other_errcode_not_retried():
+    """普通的业务错误（如webhook地址无效）不重试"""
+    server, url = start_server([(200, {'errcode': 93000, 'errmsg': 'invalid webhook url'}, 0)])
+    try:
+        assert http_transport.post_json(url, {'msgtype': 'text'}).json()['errcode'] == 93000
+        assert len(server.client_ports) == 1
+    finally:
+        server.shutdown()
+
+
+def test_read_timeout_not_retried():
+    """读超时说明服务器可能已经收到，不重试以免重复发送"""
+    server, url = start_server([(200, {'errcode': 0}, 0.5)])
+    try:
+        try:
+            http_transport.post_json(url, {'msgtype': 'text'}, timeout=(1, 0.1))
+            assert False, "应该抛出ReadTimeout"
+        except requests.ReadTimeout:
+            pass
+        assert len(server.client_ports) == 1
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ HTTP连接复用测试通过")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试图片编码：调色板量化、字节预算和降分辨率
+"""
+
+import io
+
+from PIL import Image
+
+from image_encoder import encode_image
+from raster_table import render_table
+
+
+def table_png(rows=60):
+    """用Pillow渲染器画一张带高亮行的表格"""
+    data = [[str(i), f'店铺{i}', '济宁市任城区', '14', str(i % 14), '20250901'] for i in range(rows)]
+    return render_table(data, ['行号', '店铺名称', '地址', '总天', '剩余', '开始时间'], '店铺监控数据表',
+                        highlight=[0, 5], dpi=150).getvalue()
+
+
+def test_palette_makes_table_smaller():
+    """调色板量化后的PNG比原图小，尺寸不变，高亮的红色还在"""
+    data = table_png()
+    encoded, settings = encode_image(data, max_bytes=10 * 1024 * 1024, colors=64)
+    assert len(encoded) < len(data)
+    assert settings['scale'] == 1.0 and settings['colors'] == 64
+    image = Image.open(io.BytesIO(encoded))
+    assert image.size == Image.open(io.BytesIO(data)).size
+    colors = image.convert('RGB').getcolors(maxcolors=1 << 16)
+    assert any(r > 200 and g < 180 and b < 180 for _, (r, g, b) in colors)
+
+
+def test_budget_lowers_resolution():
+    """超过预算时降低分辨率直到不超过预算，并报告缩放比例和dpi"""
+    data = table_png(200)
+    budget = len(encode_image(data, max_bytes=len(data))[0]) // 2
+    encoded, settings = encode_image(data, max_bytes=budget)
+    assert len(encoded) <= budget
+    assert settings['bytes'] == len(encoded)
+    assert 0.5 <= settings['scale'] < 1.0
+    assert settings['dpi'] < 150
+
+
+def test_not_larger_than_original():
+    """编码后没有变小时返回原图"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'white').save(buffer, format='PNG')
+    data = buffer.getvalue()
+    encoded, _ = encode_image(data)
+    assert encoded == data
+
+
+def test_invalid_data_returned_unchanged():
+    """无法解析的数据原样返回"""
+    assert encode_image(b'not-a-png')[0] == b'not-a-png'
+
+
+if __name__ == "__main__":
+    test_palette_makes_table_smaller()
+    test_budget_lowers_resolution()
+    test_not_larger_than_original()
+    test_invalid_data_returned_unchanged()
+    print("✅ 图片编码测试通过")
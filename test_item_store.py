@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试SQLite项目存储
+"""
+
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from item_store import ItemStore
+
+TODAY = datetime(2026, 10, 18)
+
+
+ROWS = {
+    '行号': [1, 2, 3, 4],
+    ' 店铺名称': ['南四湖', '铭阳饭店', '和谐面馆', '老街坊'],
+    '地址': ['西苇路', '西苇路', '民泰路', '民泰路'],
+    '总天': [14, 14, 10, 7],
+    '剩余': [0, 5, 10, 2],
+    '开始时间': [20261004, 20261009, 20261018, 20261013],
+    '备注1': ['大桶2个', None, '大桶1个', '大桶2个'],
+    '备注2': [None, '小桶', None, None],
+}
+
+
+def make_store(make_workbook):
+    """生成测试用的Excel文件，并导入到同目录的临时数据库"""
+    path = make_workbook(ROWS)
+    store = ItemStore(os.path.join(os.path.dirname(path), 'yxc.db'))
+    store.import_excel(path, TODAY)
+    return store, path
+
+
+def test_round_trip_keeps_columns(make_workbook):
+    """导入后再导出，列名、列顺序和数据保持不变"""
+    store, path = make_store(make_workbook)
+    original = pd.read_excel(path)
+    df = store.to_frame(TODAY)
+    assert list(df.columns) == list(original.columns)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), original, check_dtype=False)
+
+
+def test_expiry_index_is_used(make_workbook):
+    """到期查询走到期日期索引"""
+    store, _ = make_store(make_workbook)
+    plan = store.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT row_number FROM items WHERE expiry_date <= ?", ('2026-10-18',)).fetchall()
+    assert any('idx_items_expiry' in row[-1] for row in plan)
+
+
+def test_expiring_today_and_within_days(make_workbook):
+    """今天到期和N天内到期"""
+    store, _ = make_store(make_workbook)
+    assert [item['row'] for item in store.expiring(TODAY)] == [1]
+    assert [item['row'] for item in store.expiring(TODAY, 5)] == [1, 2, 4]
+    assert store.expiring(TODAY)[0]['data'][' 店铺名称'] == '南四湖'
+
+
+def test_remaining_follows_the_date(make_workbook):
+    """剩余天数按到期日期推导，第二天自动减1"""
+    store, _ = make_store(make_workbook)
+    df = store.to_frame(datetime(2026, 10, 19))
+    assert df['剩余'].tolist() == [0, 4, 9, 1]
+
+
+def test_reset_and_export(make_workbook):
+    """重置到期项目后导出到Excel"""
+    store, path = make_store(make_workbook)
+    updated = store.reset_expired(TODAY)
+    assert [(item['row'], item['total_days'], item['new_start']) for item in updated] == [(1, 14, '20261018')]
+    assert store.expiring(TODAY) == []
+
+    store.export_excel(path, TODAY)
+    df = pd.read_excel(path)
+    assert df.loc[0, '剩余'] == 14 and df.loc[0, '开始时间'] == 20261018
+    assert df.loc[1, '备注2'] == '小桶'
+
+
+
+def test_import_uses_start_date(make_workbook):
+    """到期日期按 开始时间 + 总天 计算，不受几天前留下的剩余天数影响；开始时间为空时才用剩余天数"""
+    store, path = make_store(make_workbook)
+    df = pd.read_excel(path)
+    df['剩余'] = [3, 8, 13, 5]  # 3天前运行后留下的剩余天数
+    df.loc[3, '开始时间'] = None
+    df.to_excel(path, index=False)
+    store.import_excel(path, TODAY)
+    assert store.to_frame(TODAY)['剩余'].tolist() == [0, 5, 10, 5]
+
+
+def test_reset_keeps_missed_cycles(make_workbook):
+    """漏跑后重置：按最后一次到期的日期重置，总天数为空的项目跳过"""
+    store, _ = make_store(make_workbook)
+    store.conn.execute("UPDATE items SET total_days = NULL WHERE row_number = 4")
+    store.conn.commit()
+    # 行1在10-18到期，10-21运行时应从10-18开始计算新周期；行4在10-20到期但没有总天数
+    later = datetime(2026, 10, 21)
+    updated = store.reset_expired(later)
+    assert [(item['row'], item['new_start']) for item in updated] == [(1, '20261018')]
+    assert store.to_frame(later)['剩余'].tolist()[0] == 11
+    assert [item['row'] for item in store.expiring(later)] == [4]
+    # 跨过一整个周期：10-18到期、总天14，11-05运行时最后一次到期是11-01
+    store.conn.execute("UPDATE items SET expiry_date = '2026-10-18' WHERE row_number = 1")
+    updated = store.reset_expired(datetime(2026, 11, 5))
+    assert updated[0]['new_start'] == '20261101'
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 项目存储测试通过")
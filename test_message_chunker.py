@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试消息分段：按UTF-8字节数拆分、在条目边界断开、编号、段数最少
+"""
+
+from message_chunker import chunk_message, send_in_parts, utf8_len
+
+
+def long_report(stores=400):
+    """剩余天数和备注分布都很长的统计文本"""
+    remaining = {day: day % 7 + 1 for day in range(stores)}
+    notes = {f'店铺{i}的备注': 1 for i in range(stores // 4)}
+    return "\n".join([
+        "📊 店铺监控数据报告 - 2026年10月18日 07:00",
+        "",
+        "📈 数据统计：",
+        f"• 总店铺数：{stores}个",
+        f"• 剩余天数分布：{remaining}",
+        f"• 备注1分布：{notes}",
+        "",
+        "详细数据请查看下方图片表格。",
+    ])
+
+
+def test_short_message_unchanged():
+    """不超长时原样返回一条，不加编号"""
+    assert chunk_message('🎉 今天没有到期的项目') == ['🎉 今天没有到期的项目']
+
+
+def test_parts_fit_and_are_numbered():
+    """每条不超过上限，按 （i/n） 编号"""
+    text = long_report()
+    parts = chunk_message(text, 2048)
+    assert len(parts) > 1
+    for number, part in enumerate(parts, 1):
+        assert utf8_len(part) <= 2048
+        assert part.startswith(f"（{number}/{len(parts)}）\n")
+
+
+def test_split_on_item_boundaries():
+    """分布字典在 ", " 处断开，去掉编号后拼回原文"""
+    text = long_report()
+    parts = chunk_message(text, 2048)
+    bodies = [part.split('\n', 1)[1] for part in parts]
+    assert ''.join(body.replace('\n', '') for body in bodies) == text.replace('\n', '')
+    original_lines = text.split('\n')
+    for body in bodies[:-1]:
+        last_line = body.split('\n')[-1]
+        assert last_line.endswith(', ') or any(line.endswith(last_line) for line in original_lines)
+
+
+def test_fewest_parts():
+    """10行各500字节，每条能装4行（含编号），应拆成3条"""
+    lines = ['好' * 166 + 'ab' for _ in range(10)]
+    assert utf8_len(lines[0]) == 500
+    parts = chunk_message('\n'.join(lines), 2048)
+    assert len(parts) == 3
+    assert [part.count('好' * 166) for part in parts] == [4, 4, 2]
+
+
+def test_larger_budget():
+    """上限更大时（如4096字节）段数更少"""
+    text = long_report()
+    assert len(chunk_message(text, 4096)) < len(chunk_message(text, 2048))
+    assert all(utf8_len(part) <= 4096 for part in chunk_message(text, 4096))
+
+
+def test_send_in_parts_stops_on_failure():
+    """按顺序发送，某一条失败后不再发送后面的"""
+    sent = []
+
+    def send(part):
+        sent.append(part)
+        return len(sent) < 2
+
+    assert not send_in_parts(send, long_report(), 2048)
+    assert len(sent) == 2
+    assert sent[0].startswith('（1/')
+
+
+if __name__ == "__main__":
+    test_short_message_unchanged()
+    test_parts_fit_and_are_numbered()
+    test_split_on_item_boundaries()
+    test_fewest_parts()
+    test_larger_budget()
+    test_send_in_parts_stops_on_failure()
+    print("✅ 消息分段测试通过")
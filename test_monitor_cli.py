@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试统一命令行入口：启动时不导入重量级模块，导入耗时在预算内
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import monitor_cli
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 冷启动导入 monitor_cli 的耗时预算（秒）；只导入标准库时实际约为几十毫秒
+IMPORT_BUDGET = float(os.getenv('CLI_IMPORT_BUDGET', '0.5'))
+
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'matplotlib', 'PIL', 'requests', 'smtplib']
+
+
+def run_python(code, cwd=HERE, **env):
+    """在新的解释器里运行代码（env为额外的环境变量），返回标准输出"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONPATH=HERE, **env)
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True,
+                            timeout=120, env=env)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def loaded_after(statements, modules=HEAVY_MODULES, cwd=HERE, **env):
+    """执行语句后已加载的重量级模块"""
+    code = (f"import sys\n{statements}\n"
+            f"print(','.join(m for m in {list(modules)!r} if m in sys.modules))")
+    lines = run_python(code, cwd, **env).strip().splitlines()
+    return [name for name in (lines[-1] if lines else '').split(',') if name]
+
+
+def test_import_loads_no_heavy_modules():
+    """导入 monitor_cli 和解析参数都不加载 pandas、matplotlib、requests、smtplib"""
+    assert loaded_after("import monitor_cli; monitor_cli.build_parser().parse_args(['check'])") == []
+
+
+def test_check_does_not_load_render_or_network_modules(tmp_path):
+    """check 只需要 pandas/openpyxl，不加载 matplotlib、requests、smtplib"""
+    shutil.copy(os.path.join(HERE, 'yxc.xlsx'), tmp_path / 'yxc.xlsx')
+    loaded = loaded_after("import monitor_cli; monitor_cli.main(['--file', 'yxc.xlsx', 'check'])",
+                          cwd=tmp_path, YXC_CACHE_DIR=str(tmp_path))
+    assert 'pandas' in loaded
+    assert not {'matplotlib', 'requests', 'smtplib'} & set(loaded)
+
+
+def test_notify_with_pillow_does_not_load_pyplot(tmp_path):
+    """TABLE_RENDERER=pillow 时 notify（导入流水线和各发送模块并生成图片）不加载 matplotlib.pyplot"""
+    shutil.copy(os.path.join(HERE, 'yxc.xlsx'), tmp_path / 'yxc.xlsx')
+    loaded = loaded_after("import monitor_cli; monitor_cli.main(['notify', '--test'])",
+                          ['matplotlib.pyplot', 'monitor_pipeline', 'PIL'], cwd=tmp_path,
+                          TABLE_RENDERER='pillow', EXCEL_FILE='yxc.xlsx', YXC_CACHE_DIR=str(tmp_path),
+                          TABLE_PAGES='off', STATE_FILE='')
+    assert 'monitor_pipeline' in loaded and 'PIL' in loaded
+    assert 'matplotlib.pyplot' not in loaded
+
+
+def test_notify_uses_file_argument(tmp_path):
+    """notify 处理 --file 指定的表格，不读写默认的 yxc.xlsx"""
+    shutil.copy(os.path.join(HERE, 'yxc.xlsx'), tmp_path / 'other.xlsx')
+    run_python("import monitor_cli; monitor_cli.main(['--file', 'other.xlsx', 'notify', '--test'])", cwd=tmp_path,
+               TABLE_RENDERER='pillow', EXCEL_FILE='yxc.xlsx', YXC_CACHE_DIR=str(tmp_path), TABLE_PAGES='off',
+               STATE_FILE='', STORAGE_BACKEND='excel', EXPIRY_MODE='decrement')
+    with open(tmp_path / 'last_run.json', encoding='utf-8') as f:
+        assert list(json.load(f)) == ['other.xlsx']
+    assert not (tmp_path / 'yxc.xlsx').exists()
+
+
+def test_import_time_budget():
+    """冷启动导入 monitor_cli 的耗时不超过预算"""
+    code = ("import time\nstart = time.perf_counter()\nimport monitor_cli\n"
+            "print(time.perf_counter() - start)")
+    # 取三次中最快的一次，避免偶发的磁盘抖动
+    elapsed = min(float(run_python(code).strip()) for _ in range(3))
+    assert elapsed < IMPORT_BUDGET, f"导入耗时 {elapsed:.3f}s 超过预算 {IMPORT_BUDGET}s"
+
+
+def test_simulate_does_not_write_workbook(tmp_path):
+    """simulate 只预演，不修改表格"""
+    excel_file = str(tmp_path / 'yxc.xlsx')
+    shutil.copy(os.path.join(HERE, 'yxc.xlsx'), excel_file)
+    with open(excel_file, 'rb') as f:
+        before = f.read()
+    assert monitor_cli.main(['--file', excel_file, 'simulate', '--days', '30']) == 0
+    with open(excel_file, 'rb') as f:
+        assert f.read() == before
+
+
+def test_missing_file_returns_error_code():
+    """读取失败时返回非0退出码"""
+    assert monitor_cli.main(['--file', '/nonexistent/yxc.xlsx', 'check']) == 2
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 命令行入口测试通过")
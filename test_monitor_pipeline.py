@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试每日监控流水线（不发送通知）
+"""
+
+import email
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import run_watermark
+from excel_schema import resolve_columns
+from monitor_pipeline import MonitorPipeline, build_stats
+from wechat_with_image_fix import get_beijing_time
+
+
+ROWS = {
+    '行号': [1, 2, 3, 4],
+    ' 店铺名称': ['南四湖', '铭阳饭店', '和谐面馆', '老街坊'],
+    '地址': ['西苇路', '西苇路', '民泰路', '民泰路'],
+    '总天': [14, 14, 10, 7],
+    '剩余': [1, 5, 10, 3],
+    '开始时间': [20261005, 20260927, 20261008, 20261014],
+    '备注1': ['大桶2个', None, '大桶1个', '大桶2个'],
+}
+
+
+def make_pipeline(path):
+    """指向测试文件、关闭所有通知渠道的流水线（备份目录和运行记录由 conftest 指向临时目录）"""
+    pipeline = MonitorPipeline()
+    pipeline.excel_file = path
+    pipeline.checker.excel_file = path
+    pipeline.expiry_mode = 'decrement'
+    pipeline.channels = {}
+    pipeline.outbox_db = os.path.join(os.path.dirname(path), 'outbox.db')
+    return pipeline
+
+
+def test_build_stats(make_workbook):
+    """剩余天数、备注和到期分布"""
+    df = pd.read_excel(make_workbook(ROWS))
+    stats = build_stats(df, resolve_columns(df.columns))
+    assert stats['total'] == 4
+    assert stats['remaining'] == {1: 1, 5: 1, 10: 1, 3: 1}
+    assert stats['notes'] == {'备注1': {'大桶2个': 2, '大桶1个': 1}}
+    assert stats['buckets'] == {'即将到期': 1, '1周内到期': 2, '正常': 1}
+    assert stats['urgent'] == [('南四湖', 1), ('老街坊', 3), ('铭阳饭店', 5)]
+
+
+def test_single_pass_report(make_workbook):
+    """读取一次、减1一次、重置一次，报告包含到期项目、重置项目和图片"""
+    path = make_workbook(ROWS)
+    pipeline = make_pipeline(path)
+    df = pd.read_excel(path)
+    columns = resolve_columns(df.columns)
+
+    report, needs_save = pipeline.compute(df, columns, datetime(2026, 10, 18))
+    assert needs_save
+    assert [item['row'] for item in report.expired_items] == [1]
+    assert [item['row'] for item in report.updated_items] == [1]
+    assert report.stats['remaining'][0] == 1  # 统计在重置之前
+    assert report.image and report.image_buffer().read(8) == b'\x89PNG\r\n\x1a\n'
+    assert df['剩余'].tolist() == [14, 4, 9, 2]
+    assert '今日到期：1个' in report.summary_text()
+
+
+def test_run_saves_once(make_workbook):
+    """完整运行后表格只被修改一次"""
+    path = make_workbook(ROWS)
+    make_pipeline(path).run()
+    df = pd.read_excel(path)
+    assert df['剩余'].tolist() == [14, 4, 9, 2]
+    assert df.loc[0, '开始时间'] != 20261005
+
+
+def test_second_run_same_day_does_not_decrement(make_workbook):
+    """同一天再次运行时不会重复减1，没有写入时不提示已保存"""
+    import contextlib
+    import io
+    path = make_workbook(ROWS)
+    make_pipeline(path).run()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        make_pipeline(path).run()
+    assert pd.read_excel(path)['剩余'].tolist() == [14, 4, 9, 2]
+    assert '💾 Excel文件已更新并保存' not in output.getvalue()
+
+
+def test_sqlite_backend(make_workbook):
+    """SQLite存储：首次运行从Excel导入，处理后导出回Excel"""
+    path = make_workbook(ROWS)
+    pipeline = make_pipeline(path)
+    pipeline.storage_backend = 'sqlite'
+    pipeline.item_db = os.path.join(os.path.dirname(path), 'yxc.db')
+    # 导入时到期日期按 开始时间 + 总天 计算：第1行今天到期，其余行与剩余天数一致
+    df = pd.read_excel(path)
+    today = pd.Timestamp(get_beijing_time().strftime('%Y-%m-%d'))
+    df['剩余'] = [0, 5, 10, 3]
+    df['开始时间'] = [int((today + pd.Timedelta(days=int(remaining - total))).strftime('%Y%m%d'))
+                  for remaining, total in zip(df['剩余'], df['总天'])]
+    df.to_excel(path, index=False)
+
+    pipeline.run()
+    df = pd.read_excel(path)
+    assert df.loc[0, '剩余'] == 14
+    assert df['剩余'].tolist()[1:] == [5, 10, 3]
+    assert os.path.exists(pipeline.item_db)
+
+
+def test_text_state_is_source_of_truth(make_workbook, monkeypatch):
+    """设置文本状态后，以它为准生成Excel，运行结果写回文本状态"""
+    path = make_workbook(ROWS)
+    pipeline = make_pipeline(path)
+    pipeline.state_file = os.path.join(os.path.dirname(path), 'yxc.csv')
+    pipeline.run()
+    state = pd.read_csv(pipeline.state_file)
+    assert state['剩余'].tolist() == [14, 4, 9, 2]
+
+    # 文本状态改过之后，下次运行按它重新生成Excel（第2行减到0后重置为14）
+    state.loc[1, '剩余'] = 1
+    state.to_csv(pipeline.state_file, index=False)
+    monkeypatch.setattr(run_watermark, 'WATERMARK_FILE', os.path.join(os.path.dirname(path), 'other.json'))
+    pipeline.run()
+    assert pd.read_excel(path)['剩余'].tolist() == [13, 14, 8, 1]
+    assert pd.read_csv(pipeline.state_file, encoding='utf-8-sig')['剩余'].tolist() == [13, 14, 8, 1]
+
+
+def test_paginated_images_are_sent_in_order(make_workbook, monkeypatch):
+    """分页模式下报告带各页图片，群消息经发件箱按页序逐张发送，邮件内嵌同样的各页图片"""
+    import table_pages
+    path = make_workbook(ROWS)
+    pipeline = make_pipeline(path)
+    pipeline.paginate = True
+    df = pd.read_excel(path)
+    monkeypatch.setattr(table_pages, 'MAX_PAGE_ROWS', 2)
+    report, _ = pipeline.compute(df, resolve_columns(df.columns), datetime(2026, 10, 18))
+    assert report.image is None and len(report.pages) == 2
+
+    class Recorder:
+        def __init__(self):
+            self.sent = []
+
+        def send_text_message(self, message):
+            self.sent.append(message)
+            return True
+
+        def send_image_message(self, image):
+            self.sent.append(image.getvalue())
+            return True
+
+    pipeline.wechat = Recorder()
+    pipeline.channels = {'wechat': True}
+    assert pipeline.notify(report) == {'wechat': True}
+    assert pipeline.wechat.sent == [report.summary_text()] + report.pages
+
+    # 邮件内嵌的也是重置前生成的各页图片，不根据重置后的表格重新生成
+    pipeline.checker.notification_config['email'].update(username='monitor@example.com', to_email='ops@example.com')
+    (kind, body), = pipeline.outbox_parts('email', report)
+    message = email.message_from_bytes(body)
+    images = [part.get_payload(decode=True) for part in message.walk() if part.get_content_maintype() == 'image']
+    assert kind == 'email' and images == report.pages
+
+
+def test_notifications_queued_before_save(make_workbook, monkeypatch):
+    """保存表格时通知已经在发件箱里，保存后崩溃也不会丢失到期提醒"""
+    import monitor_pipeline
+    from notification_outbox import NotificationOutbox
+    path = make_workbook(ROWS)
+    pipeline = make_pipeline(path)
+    pipeline.channels = {'wechat': True}
+    queued = []
+
+    def crash(*args):
+        outbox = NotificationOutbox(pipeline.outbox_db)
+        queued.extend(outbox.pending('wechat'))
+        outbox.close()
+        raise SystemExit('crash')
+
+    monkeypatch.setattr(monitor_pipeline, 'save_changes', crash)
+    try:
+        pipeline.run_excel(datetime(2026, 10, 18))
+    except SystemExit:
+        pass
+    assert queued and queued[0]['kind'] == 'text'
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 监控流水线测试通过")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试通知发件箱：幂等入箱、重新运行不重复发送、失败后按原消息重试、退避和放弃
+"""
+
+import time
+
+import notification_outbox
+from notification_outbox import NotificationOutbox, items_digest
+
+RUN_DATE = '2026-10-18'
+ITEMS = [{'row': 3}, {'row': 1}]
+
+
+def make_outbox(directory):
+    """临时目录中的发件箱"""
+    return NotificationOutbox(str(directory / 'outbox.db'))
+
+
+class Channel:
+    """记录收到的消息，fail_at 中的序号发送失败"""
+
+    def __init__(self, fail_at=()):
+        self.sent = []
+        self.fail_at = set(fail_at)
+        self.calls = 0
+
+    def __call__(self, channel, kind, body):
+        self.calls += 1
+        if self.calls in self.fail_at:
+            return False
+        self.sent.append((channel, kind, body))
+        return True
+
+
+def test_digest_ignores_order():
+    """项目集合的哈希与顺序无关"""
+    assert items_digest(ITEMS) == items_digest(list(reversed(ITEMS)))
+    assert items_digest(ITEMS) != items_digest(ITEMS[:1])
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    """同一天、同一渠道、同一批项目的消息只入箱一次"""
+    outbox = make_outbox(tmp_path)
+    parts = [('text', b'hello'), ('image', b'png')]
+    assert outbox.enqueue(RUN_DATE, 'wechat', ITEMS, parts) == 2
+    assert outbox.enqueue(RUN_DATE, 'wechat', list(reversed(ITEMS)), parts) == 0
+    assert outbox.enqueue(RUN_DATE, 'dingtalk', ITEMS, parts) == 2
+    assert len(outbox.pending('wechat')) == 2
+    outbox.close()
+
+
+def test_rerun_is_noop(tmp_path):
+    """送达后再运行：同一批项目，或到期项目已重置（项目为空）时都视为已发送"""
+    outbox = make_outbox(tmp_path)
+    outbox.enqueue(RUN_DATE, 'wechat', ITEMS, [('text', b'hello')])
+    channel = Channel()
+    assert outbox.drain(channel, ['wechat']) == {'wechat': True}
+    assert outbox.seen(RUN_DATE, 'wechat', ITEMS)
+    assert outbox.seen(RUN_DATE, 'wechat', [])
+    assert not outbox.seen(RUN_DATE, 'wechat', [{'row': 5}])
+    assert not outbox.seen('2026-10-19', 'wechat', [])
+    assert outbox.drain(channel, ['wechat']) == {'wechat': True}
+    assert channel.sent == [('wechat', 'text', b'hello')]
+    outbox.close()
+
+
+def test_failure_is_retried_from_stored_message(tmp_path):
+    """第2条失败后第3条不发送；重试时从第2条继续，已送达的第1条不重复"""
+    outbox = make_outbox(tmp_path)
+    parts = [('text', b'1'), ('image', b'2'), ('image', b'3')]
+    outbox.enqueue(RUN_DATE, 'wechat', ITEMS, parts)
+    channel = Channel(fail_at={2})
+    assert outbox.drain(channel, ['wechat']) == {'wechat': False}
+    assert [body for _, _, body in channel.sent] == [b'1']
+    assert outbox.drain(channel, ['wechat'], due_only=False) == {'wechat': True}
+    assert [body for _, _, body in channel.sent] == [b'1', b'2', b'3']
+    outbox.close()
+
+
+def test_backoff_and_give_up(tmp_path, monkeypatch):
+    """失败后等退避时间再重试，失败次数用完后不再重试"""
+    monkeypatch.setattr(notification_outbox, 'OUTBOX_BACKOFF', 0.2)
+    monkeypatch.setattr(notification_outbox, 'OUTBOX_MAX_ATTEMPTS', 3)
+    outbox = make_outbox(tmp_path)
+    outbox.enqueue(RUN_DATE, 'sms', ITEMS, [('sms', b'hello')])
+
+    def broken(channel, kind, body):
+        raise ConnectionError('network down')
+
+    assert outbox.drain(broken, ['sms']) == {'sms': False}
+    assert outbox.pending('sms') == []
+    time.sleep(0.25)
+    message = outbox.pending('sms')[0]
+    assert message['attempts'] == 1 and message['last_error'] == 'network down'
+    assert outbox.drain(broken, ['sms'], due_only=False) == {'sms': False}
+    assert outbox.drain(broken, ['sms'], due_only=False) == {'sms': False}
+    assert outbox.pending('sms', due_only=False) == []
+    assert ('sms', 'failed', 1) in outbox.summary()
+    outbox.close()
+
+
+def test_delivered_body_is_cleared(tmp_path):
+    """送达后清空消息内容，只保留幂等键"""
+    outbox = make_outbox(tmp_path)
+    outbox.enqueue(RUN_DATE, 'email', ITEMS, [('email', b'x' * 1000)])
+    outbox.drain(Channel(), ['email'])
+    row = outbox.conn.execute("SELECT status, body FROM outbox").fetchone()
+    assert row['status'] == 'delivered' and row['body'] is None
+    outbox.close()
+
+
+def test_drain_waits_past_notify_timeout(tmp_path, monkeypatch):
+    """投递不受 NOTIFY_TIMEOUT 限制：慢渠道发完后记为已送达，关闭连接前没有仍在发送的线程"""
+    import notify_dispatcher
+    monkeypatch.setattr(notify_dispatcher, 'NOTIFY_TIMEOUT', 0.05)
+    outbox = make_outbox(tmp_path)
+    outbox.enqueue(RUN_DATE, 'wechat', ITEMS, [('text', b'slow')])
+
+    def slow(channel, kind, body):
+        time.sleep(0.3)
+        return True
+
+    assert outbox.drain(slow, ['wechat']) == {'wechat': True}
+    assert outbox.pending('wechat', due_only=False) == []
+    outbox.close()
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 通知发件箱测试通过")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试并发通知分发：总耗时等于最慢的渠道，超时和异常记为失败
+"""
+
+import time
+
+from notify_dispatcher import dispatch, enabled_senders, succeeded
+
+
+def slow(seconds, result=True):
+    """耗时 seconds 秒后返回 result 的发送函数"""
+    def send():
+        time.sleep(seconds)
+        return result
+    return send
+
+
+def test_channels_sent_concurrently():
+    """三个各0.3秒的渠道，总耗时接近0.3秒而不是0.9秒"""
+    start = time.perf_counter()
+    outcomes = dispatch({'email': slow(0.3), 'wechat': slow(0.3), 'sms': slow(0.3, False)})
+    assert time.perf_counter() - start < 0.6
+    assert succeeded(outcomes) == {'email': True, 'wechat': True, 'sms': False}
+    assert outcomes['sms']['status'] == 'failed'
+
+
+def test_timeout_does_not_wait_for_slow_channel():
+    """超时的渠道记为timeout，不等它返回"""
+    start = time.perf_counter()
+    outcomes = dispatch({'email': slow(5), 'wechat': slow(0.05)}, timeouts={'email': 0.2})
+    assert time.perf_counter() - start < 1
+    assert outcomes['email']['status'] == 'timeout' and not outcomes['email']['success']
+    assert outcomes['wechat']['status'] == 'ok'
+
+
+def test_exception_is_recorded():
+    """发送函数抛出异常时记为error并保留错误信息"""
+    def broken():
+        raise ConnectionError('SMTP登录失败')
+    outcomes = dispatch({'email': broken, 'wechat': slow(0)})
+    assert outcomes['email']['status'] == 'error'
+    assert 'SMTP登录失败' in outcomes['email']['error']
+    assert outcomes['wechat']['success']
+
+
+def test_enabled_senders():
+    """只保留已启用的渠道"""
+    config = {'email': {'enabled': False}, 'wechat': {'enabled': True}, 'sms': {'enabled': False}}
+    senders = enabled_senders({'email': slow(0), 'wechat': slow(0), 'sms': slow(0)}, config)
+    assert list(senders) == ['wechat']
+
+
+if __name__ == "__main__":
+    test_channels_sent_concurrently()
+    test_timeout_does_not_wait_for_slow_channel()
+    test_exception_is_recorded()
+    test_enabled_senders()
+    print("✅ 并发通知分发测试通过")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Pillow表格渲染器
+"""
+
+import pandas as pd
+from PIL import Image
+
+import raster_table
+from wechat_with_image_fix import WeChatImageSender
+
+HEADERS = ['行号', '店铺名称', '剩余']
+
+
+def colors(img_buffer):
+    """图片中出现的所有颜色"""
+    image = Image.open(img_buffer).convert('RGB')
+    return {color for _, color in image.getcolors(maxcolors=1 << 20)}
+
+
+def test_png_grows_with_rows():
+    """输出PNG，行数越多图片越高"""
+    small = Image.open(raster_table.render_table([['1', '南四湖', '5']], HEADERS, '标题'))
+    large = Image.open(raster_table.render_table([['1', '南四湖', '5']] * 10, HEADERS, '标题'))
+    assert small.format == 'PNG'
+    assert large.size[0] == small.size[0] and large.size[1] > small.size[1]
+
+
+def test_header_and_highlight_fill():
+    """表头灰色底色；高亮行红色底色"""
+    rows = [['1', '南四湖', '0'], ['2', '铭阳饭店', '5']]
+    plain = colors(raster_table.render_table(rows, HEADERS, '标题'))
+    assert (0xf0, 0xf0, 0xf0) in plain
+    assert (0xff, 0x99, 0x99) not in plain
+
+    highlighted = colors(raster_table.render_table(rows, HEADERS, '标题', highlight=[0]))
+    assert (0xff, 0x99, 0x99) in highlighted
+
+    no_header = colors(raster_table.render_table(rows, HEADERS, '标题', header_style=False))
+    assert (0xf0, 0xf0, 0xf0) not in no_header
+
+
+def test_wechat_renderer_switch(monkeypatch):
+    """TABLE_RENDERER=pillow 时企业微信表格图片改用Pillow绘制"""
+    monkeypatch.setattr(raster_table, 'TABLE_RENDERER', 'pillow')
+    df = pd.DataFrame({
+        '行号': [1, 2],
+        ' 店铺名称': ['南四湖', '铭阳饭店'],
+        '地址': ['西苇路', '西苇路'],
+        '总天': [14, 14],
+        '剩余': [1, 5],
+        '开始时间': [20261005, 20260927],
+    })
+    image = WeChatImageSender().create_table_image(df)
+    assert image.read(8) == b'\x89PNG\r\n\x1a\n'
+    image.seek(0)
+    assert (0xff, 0x99, 0x99) in colors(image)
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ Pillow表格渲染测试通过")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试webhook令牌桶限流：配额内不等待，超出后排队，多个进程共用同一份配额
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import rate_limiter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+URL = 'https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=test'
+
+
+def drain(url=URL):
+    """把机器人的令牌清空（状态文件由 conftest 指向临时目录）"""
+    with open(rate_limiter.RATE_LIMIT_FILE, 'w', encoding='utf-8') as f:
+        json.dump({rate_limiter.bucket_key(url): {'tokens': 0, 'updated': time.time()}}, f)
+
+
+def test_is_webhook():
+    """只对企业微信和钉钉群机器人限流"""
+    assert rate_limiter.is_webhook(URL)
+    assert rate_limiter.is_webhook('https://oapi.dingtalk.com/robot/send?access_token=x')
+    assert not rate_limiter.is_webhook('https://api.sms-provider.com/send')
+
+
+def test_burst_then_queue():
+    """一分钟的配额可以直接发完，之后按速率排队"""
+    for _ in range(20):
+        assert rate_limiter.acquire(URL, per_minute=20) < 0.05
+    start = time.time()
+    rate_limiter.acquire(URL, per_minute=600)
+    assert time.time() - start >= 0.05
+
+
+def test_buckets_are_per_url():
+    """不同机器人的配额互不影响"""
+    drain()
+    assert rate_limiter.acquire('https://oapi.dingtalk.com/robot/send?access_token=x', per_minute=20) < 0.05
+
+
+def test_state_file_does_not_contain_url():
+    """状态文件里只保存地址的哈希，不保存webhook的key"""
+    rate_limiter.acquire(URL, per_minute=20)
+    with open(rate_limiter.RATE_LIMIT_FILE, 'r', encoding='utf-8') as f:
+        assert 'key=test' not in f.read()
+
+
+def test_max_wait_gives_up():
+    """排队时间超过上限时直接返回"""
+    drain()
+    start = time.time()
+    rate_limiter.acquire(URL, per_minute=1, max_wait=0.2)
+    assert time.time() - start < 0.5
+
+
+def test_processes_share_quota():
+    """两个进程各取5个令牌（每秒10个），共用配额时总共约需1秒，而不是各自0.5秒"""
+    drain()
+    code = ("import rate_limiter\n"
+            f"for _ in range(5): rate_limiter.acquire({URL!r}, per_minute=600)\n")
+    env = dict(os.environ, RATE_LIMIT_FILE=rate_limiter.RATE_LIMIT_FILE)
+    start = time.time()
+    processes = [subprocess.Popen([sys.executable, '-c', code], cwd=HERE, env=env, stdout=subprocess.DEVNULL)
+                 for _ in range(2)]
+    assert all(process.wait(timeout=60) == 0 for process in processes)
+    # 扣除解释器启动时间后，两个进程串行取令牌
+    assert time.time() - start >= 0.9
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ webhook限流测试通过")
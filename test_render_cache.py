@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试表格图片渲染缓存
+"""
+
+import os
+
+import pandas as pd
+
+import render_cache
+from wechat_with_image_fix import WeChatImageSender
+
+
+def test_key_depends_on_content_title_style_and_dpi():
+    """行内容、标题、样式、dpi任何一个不同，键都不同"""
+    rows = [['1', '南四湖', '14']]
+    key = render_cache.render_key(rows, '标题', 'wechat', 150)
+    assert key == render_cache.render_key([['1', '南四湖', '14']], '标题', 'wechat', 150)
+    assert key != render_cache.render_key([['1', '南四湖', '13']], '标题', 'wechat', 150)
+    assert key != render_cache.render_key(rows, '标题2', 'wechat', 150)
+    assert key != render_cache.render_key(rows, '标题', 'email', 150)
+    assert key != render_cache.render_key(rows, '标题', 'wechat', 300)
+
+
+def test_memory_and_disk_hits():
+    """内存命中；清空内存后从磁盘命中"""
+    assert render_cache.get_render('a') is None
+    render_cache.put_render('a', b'png-a')
+    assert render_cache.get_render('a').read() == b'png-a'
+    render_cache.clear_memory()
+    assert render_cache.get_render('a').read() == b'png-a'
+
+
+def test_lru_eviction(monkeypatch):
+    """内存按条数、磁盘按总大小淘汰最久没用的图片"""
+    monkeypatch.setattr(render_cache, 'MEMORY_ITEMS', 2)
+    monkeypatch.setattr(render_cache, 'DISK_BYTES', 35)
+    render_cache.put_render('a', b'x' * 10)
+    render_cache.put_render('b', b'x' * 10)
+    render_cache.get_render('a')  # a比b更近使用过
+    render_cache.put_render('c', b'x' * 10)
+    # 磁盘最多放3张，按最后使用时间淘汰：b最旧
+    for key, seconds in (('b', 1), ('c', 2), ('a', 3)):
+        os.utime(os.path.join(render_cache.RENDER_DIR, f'{key}.png'), (seconds, seconds))
+    assert list(render_cache._images) == ['a', 'c']
+    render_cache.put_render('d', b'x' * 10)
+    assert sorted(os.listdir(render_cache.RENDER_DIR)) == ['a.png', 'c.png', 'd.png']
+
+
+def test_renderer_uses_cache():
+    """同一份数据第二次生成图片时直接用缓存，数据变了重新绘制"""
+    df = pd.DataFrame({
+        '行号': [1, 2],
+        ' 店铺名称': ['南四湖', '铭阳饭店'],
+        '地址': ['西苇路', '西苇路'],
+        '总天': [14, 14],
+        '剩余': [1, 5],
+        '开始时间': [20261005, 20260927],
+    })
+    sender = WeChatImageSender()
+    first = sender.create_table_image(df).getvalue()
+    assert len(os.listdir(render_cache.RENDER_DIR)) == 1
+    assert sender.create_table_image(df).getvalue() == first
+
+    df.loc[1, '剩余'] = 4
+    assert sender.create_table_image(df).getvalue() != first
+    assert len(os.listdir(render_cache.RENDER_DIR)) == 2
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 渲染缓存测试通过")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试SMTP连接复用：一次运行只登录一次，服务器断开后自动重连
+"""
+
+import smtplib
+from email.mime.text import MIMEText
+
+import smtp_transport
+
+CONFIG = {'smtp_server': 'smtp.example.com', 'smtp_port': 587, 'username': 'monitor@example.com',
+          'password': 'secret'}
+
+
+class FakeSMTP:
+    """记录连接、登录和发送次数的SMTP服务器替身"""
+    instances = []
+    drop_after = None  # 发送这么多封后模拟服务器断开
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def send_message(self, msg, to_addrs=None):
+        if FakeSMTP.drop_after is not None and len(self.sent) >= FakeSMTP.drop_after:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append((msg['Subject'], to_addrs))
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def with_fake_smtp(test):
+    """在测试期间用 FakeSMTP 代替 smtplib.SMTP"""
+    def run():
+        original = smtplib.SMTP
+        FakeSMTP.instances, FakeSMTP.drop_after = [], None
+        smtplib.SMTP = FakeSMTP
+        try:
+            test()
+        finally:
+            smtplib.SMTP = original
+            smtp_transport.close_transports()
+    run.__name__ = test.__name__
+    return run
+
+
+def message(subject):
+    """标题为 subject 的纯文本邮件"""
+    msg = MIMEText('正文', 'plain', 'utf-8')
+    msg['Subject'] = subject
+    return msg
+
+
+@with_fake_smtp
+def test_one_login_per_run():
+    """多封邮件、多个收件人共用一个已登录的连接"""
+    smtp_transport.send_mail(CONFIG, message('到期通知'))
+    smtp_transport.send_mail(dict(CONFIG), message('恭喜通知'), to_addrs=['a@example.com', 'b@example.com'])
+    assert len(FakeSMTP.instances) == 1
+    server = FakeSMTP.instances[0]
+    assert server.logins == 1
+    assert [subject for subject, _ in server.sent] == ['到期通知', '恭喜通知']
+    transport = smtp_transport.get_transport(CONFIG)
+    assert transport.sent == 2 and transport.connects == 1
+    smtp_transport.close_transports()
+    assert server.closed
+
+
+@with_fake_smtp
+def test_reconnect_when_server_drops():
+    """服务器断开连接后重连并重发这封邮件"""
+    FakeSMTP.drop_after = 1
+    smtp_transport.send_mail(CONFIG, message('第一封'))
+    smtp_transport.send_mail(CONFIG, message('第二封'))
+    assert len(FakeSMTP.instances) == 2
+    assert FakeSMTP.instances[1].sent == [('第二封', None)]
+    assert smtp_transport.get_transport(CONFIG).connects == 2
+
+
+@with_fake_smtp
+def test_new_run_opens_new_connection():
+    """close_transports 之后的下一次运行重新连接"""
+    smtp_transport.send_mail(CONFIG, message('第一次运行'))
+    smtp_transport.close_transports()
+    smtp_transport.send_mail(CONFIG, message('第二次运行'))
+    assert len(FakeSMTP.instances) == 2
+
+
+if __name__ == "__main__":
+    test_one_login_per_run()
+    test_reconnect_when_server_drops()
+    test_new_run_opens_new_connection()
+    print("✅ SMTP连接复用测试通过")
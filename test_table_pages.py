@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分页渲染
+"""
+
+import io
+
+from PIL import Image
+
+import table_pages
+
+HEADERS = ['行号', '店铺名称', '剩余']
+
+
+def make_rows(count):
+    """生成测试用的表格行"""
+    return [[str(i + 1), f'店铺{i + 1}', str(i % 10)] for i in range(count)]
+
+
+def test_split_rows_is_balanced():
+    """各页行数尽量平均，不超过每页上限"""
+    assert table_pages.split_rows(98, 30) == [(0, 25), (25, 50), (50, 75), (75, 98)]
+    assert table_pages.split_rows(30, 30) == [(0, 30)]
+    assert table_pages.split_rows(0, 30) == [(0, 0)]
+
+
+def test_pages_in_order_with_header():
+    """分页后页序正确，每页都是PNG（多页时并行绘制）"""
+    pages = table_pages.render_pages(make_rows(65), HEADERS, '标题', highlight=[0, 64])
+    assert len(pages) == 3
+    heights = [Image.open(io.BytesIO(page)).size[1] for page in pages]
+    assert all(page[:8] == b'\x89PNG\r\n\x1a\n' for page in pages)
+    assert heights[0] >= heights[2]
+
+
+def test_byte_budget_shrinks_pages(monkeypatch):
+    """图片超过大小上限时自动减少每页行数"""
+    first = table_pages.render_pages(make_rows(30), HEADERS, '标题')
+    monkeypatch.setattr(table_pages, 'IMAGE_MAX_BYTES', len(first[0]) * 2 // 3)
+    pages = table_pages.render_pages(make_rows(30), HEADERS, '标题')
+    assert len(pages) > 1
+    assert max(len(page) for page in pages) <= table_pages.IMAGE_MAX_BYTES
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 分页渲染测试通过")
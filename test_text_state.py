@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试文本状态文件（CSV/JSONL）
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+import text_state
+
+
+# 测试用的表格数据（行号乱序，备注有空值）
+ROWS = {
+    '行号': [3, 1, 2],
+    ' 店铺名称': ['和谐面馆', '南四湖', '铭阳饭店'],
+    '总天': [10, 14, 14],
+    '剩余': [10.0, np.nan, 5.0],
+    '开始时间': [20261008, 20261005, 20260927],
+    '备注1': ['大桶1个', '大桶2个', None],
+}
+
+
+def read_lines(path):
+    """读取文本状态的各行"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return f.read().splitlines()
+
+
+def test_csv_is_sorted_and_canonical(make_workbook):
+    """按行号排序，整数不带小数点，空值为空"""
+    path = make_workbook(ROWS)
+    state = os.path.join(os.path.dirname(path), 'yxc.csv')
+    assert text_state.export_state(path, state)
+    assert read_lines(state) == [
+        '行号, 店铺名称,总天,剩余,开始时间,备注1',
+        '1,南四湖,14,,20261005,大桶2个',
+        '2,铭阳饭店,14,5,20260927,',
+        '3,和谐面馆,10,10,20261008,大桶1个',
+    ]
+    assert not text_state.export_state(path, state)
+
+
+def test_round_trip_is_stable(make_workbook):
+    """文本 → Excel → 文本 内容不变（CSV和JSONL）"""
+    for name in ('yxc.csv', 'yxc.jsonl'):
+        path = make_workbook(ROWS, f'{name}.xlsx')
+        state = os.path.join(os.path.dirname(path), name)
+        text_state.export_state(path, state)
+        before = read_lines(state)
+
+        rebuilt = os.path.join(os.path.dirname(path), f'rebuilt-{name}.xlsx')
+        assert text_state.build_workbook(rebuilt, state)
+        text_state.export_state(rebuilt, state)
+        assert read_lines(state) == before
+        assert pd.read_excel(rebuilt)['行号'].tolist() == [1, 2, 3]
+
+
+def test_one_cell_change_is_one_line(make_workbook):
+    """改一个单元格，文本状态只变一行"""
+    path = make_workbook(ROWS)
+    state = os.path.join(os.path.dirname(path), 'yxc.csv')
+    text_state.export_state(path, state)
+    before = read_lines(state)
+
+    df = pd.read_excel(path)
+    df.loc[df['行号'] == 2, '剩余'] = 4
+    df.to_excel(path, index=False)
+    text_state.export_state(path, state)
+    after = read_lines(state)
+    assert [i for i, (a, b) in enumerate(zip(before, after)) if a != b] == [2]
+
+
+def test_build_patches_existing_workbook(make_workbook):
+    """表头和行数不变时只改写不同的单元格，保留格式"""
+    path = make_workbook(ROWS)
+    state = os.path.join(os.path.dirname(path), 'yxc.csv')
+    text_state.export_state(path, state)
+    text_state.build_workbook(path, state)  # 先按行号排好序
+
+    workbook = load_workbook(path)
+    workbook.worksheets[0].column_dimensions['B'].width = 30
+    workbook.save(path)
+
+    lines = read_lines(state)
+    lines[1] = lines[1].replace(',,', ',7,')
+    with open(state, 'w', encoding='utf-8-sig') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    assert text_state.build_workbook(path, state)
+    assert pd.read_excel(path).loc[0, '剩余'] == 7
+    assert load_workbook(path).worksheets[0].column_dimensions['B'].width == 30
+
+
+def test_sync_bootstraps_then_follows_state(make_workbook):
+    """没有文本状态时先导出；之后以文本状态为准"""
+    path = make_workbook(ROWS)
+    state = os.path.join(os.path.dirname(path), 'yxc.csv')
+    assert not text_state.sync_workbook(path, '')
+    assert text_state.sync_workbook(path, state)
+    assert os.path.exists(state)
+
+    os.remove(path)
+    text_state.sync_workbook(path, state)
+    assert pd.read_excel(path)[' 店铺名称'].tolist() == ['南四湖', '铭阳饭店', '和谐面馆']
+
+
+if __name__ == "__main__":
+    import pytest
+    if pytest.main(['-q', __file__]) == 0:
+        print("✅ 文本状态测试通过")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本状态文件 - 用按行号排序的CSV/JSONL保存表格数据，作为提交到仓库的数据源
+
+xlsx是二进制文件，改一个单元格整个文件都会变，每天提交一次仓库就会越来越大。
+文本状态每行一个项目、行序和数值格式固定，改一个单元格只会改动一行；yxc.xlsx 按需由它重新生成。
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from excel_loader import load_table
+from excel_schema import resolve_columns
+from excel_writer import save_changes
+
+# 为空时不使用文本状态（只提交yxc.xlsx）；.jsonl 结尾用JSON Lines，其他用CSV
+STATE_FILE = os.getenv('STATE_FILE', '')
+
+
+def _is_jsonl(path):
+    """是否为JSON Lines格式"""
+    return path.lower().endswith('.jsonl')
+
+
+def canonical_frame(df):
+    """规范化表格：按行号排序（没有行号的行按原顺序排在最后），整数值统一写成整数"""
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object)
+        if series.dtype.kind == 'f':
+            values = series.dropna()
+            if len(values) and np.all(values == np.trunc(values)):
+                series = series.astype('Int64')
+        df[column] = series
+
+    row_col = resolve_columns(df.columns).get('row_number')
+    if row_col is not None:
+        keys = pd.to_numeric(df[row_col], errors='coerce')
+        df = df.iloc[np.argsort(keys.fillna(np.inf).to_numpy(), kind='stable')]
+    return df.reset_index(drop=True)
+
+
+def _json_value(value):
+    """转换为可写入JSON的值"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def to_text(df, path):
+    """把表格转成文本状态的内容"""
+    df = canonical_frame(df)
+    if _is_jsonl(path):
+        lines = [json.dumps([str(col) for col in df.columns], ensure_ascii=False)]
+        for row in df.itertuples(index=False):
+            lines.append(json.dumps([_json_value(value) for value in row], ensure_ascii=False))
+        return '\n'.join(lines) + '\n'
+    return df.to_csv(index=False, lineterminator='\n', date_format='%Y-%m-%d %H:%M:%S')
+
+
+def read_state(path):
+    """读取文本状态为表格"""
+    if _is_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines:
+            return pd.DataFrame()
+        return pd.DataFrame(lines[1:], columns=lines[0]).infer_objects()
+    return pd.read_csv(path, encoding='utf-8-sig')
+
+
+def write_state(df, path):
+    """写入文本状态（内容不变时不写文件），返回是否写入"""
+    text = to_text(df, path)
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    # CSV带BOM，用Excel直接打开时中文不乱码
+    with open(tmp_file, 'w', encoding='utf-8' if _is_jsonl(path) else 'utf-8-sig', newline='') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+    return True
+
+
+def export_state(excel_file, path=None):
+    """把Excel表格导出为文本状态，返回是否有变化"""
+    path = path or STATE_FILE
+    changed = write_state(load_table(excel_file), path)
+    print(f"📝 已更新文本状态: {path}" if changed else f"📝 文本状态没有变化: {path}")
+    return changed
+
+
+def build_workbook(excel_file, path=None):
+    """
+    按文本状态生成Excel表格，返回是否写入
+
+    表头和行数不变时只改写不同的单元格（保留格式），否则重新生成整个文件。
+    """
+    path = path or STATE_FILE
+    state = canonical_frame(read_state(path))
+    if os.path.exists(excel_file):
+        current = load_table(excel_file)
+        if list(current.columns) == list(state.columns) and len(current) == len(state):
+            # 可空整数列的 pd.NA 换成 None，按普通空值比较和写入
+            state = state.astype(object).where(state.notna(), None)
+            return save_changes(excel_file, current, state) > 0
+
+    state.to_excel(excel_file, index=False)
+    print(f"✅ 已根据 {path} 生成 {excel_file}")
+    return True
+
+
+def sync_workbook(excel_file, path=None):
+    """
+    运行前同步：有文本状态时以它为准生成Excel，还没有时先从Excel导出一份
+
+    没有配置 STATE_FILE 时什么也不做，返回False。
+    """
+    path = path or STATE_FILE
+    if not path:
+        return False
+    if os.path.exists(path):
+        build_workbook(excel_file, path)
+    else:
+        print(f"📝 还没有文本状态文件，从 {excel_file} 导出")
+        export_state(excel_file, path)
+    return True
+
+
+def main():
+    """命令行：python text_state.py export | build [Excel文件] [状态文件]"""
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    excel_file = sys.argv[2] if len(sys.argv) > 2 else 'yxc.xlsx'
+    path = sys.argv[3] if len(sys.argv) > 3 else (STATE_FILE or 'yxc.csv')
+    try:
+        if command == 'export':
+            export_state(excel_file, path)
+        elif command == 'build':
+            build_workbook(excel_file, path)
+        else:
+            print(main.__doc__)
+    except Exception as e:
+        print(f"❌ 处理文本状态失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
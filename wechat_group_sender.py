@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
+from http_transport import post_json
 import json
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -11,6 +11,12 @@ import base64
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from excel_loader import SUMMARY_FIELDS, TABLE_FIELDS, load_table
+from render_cache import get_render, put_render, render_key
+from image_encoder import encode_image
+from message_chunker import TEXT_MAX_BYTES, send_in_parts, utf8_len
+from raster_table import render_table, renderer_name, use_pillow
+from font_resolver import setup_matplotlib_font
 
 # 加载环境变量
 load_dotenv()
@@ -23,18 +29,12 @@ class WeChatGroupSender:
     def create_table_image(self):
         """创建表格图片"""
         try:
-            # 读取Excel文件
-            df = pd.read_excel('yxc.xlsx')
+            # 读取Excel文件（只读取表格图片用到的列）
+            df = load_table('yxc.xlsx', TABLE_FIELDS)
             print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
             
             # 设置中文字体
-            plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-            plt.rcParams['axes.unicode_minus'] = False
-            
-            # 创建图形
-            fig, ax = plt.subplots(figsize=(20, 12))
-            ax.axis('tight')
-            ax.axis('off')
+            setup_matplotlib_font()
             
             # 准备表格数据
             table_data = []
@@ -50,6 +50,26 @@ class WeChatGroupSender:
                     str(row.get('备注2', ''))
                 ])
             
+            # 同样的数据、标题和样式已经画过时直接用缓存的图片
+            current_date = datetime.now().strftime('%Y年%m月%d日')
+            title = f'店铺监控数据表 - {current_date}'
+            cache_key = render_key(table_data, title, ['legacy-20x12', renderer_name()], 300)
+            cached = get_render(cache_key)
+            if cached is not None:
+                return cached
+            
+            if use_pillow():
+                img_buffer = render_table(table_data, ['行号', '店铺名称', '地址', '总天', '剩余', '开始时间', '备注1', '备注2'],
+                                          title, dpi=300, row_scale=1.5, header_style=False)
+                put_render(cache_key, img_buffer.getvalue())
+                print("✅ 表格图片创建成功")
+                return img_buffer
+            
+            # 创建图形
+            fig, ax = plt.subplots(figsize=(20, 12))
+            ax.axis('tight')
+            ax.axis('off')
+            
             # 创建表格
             table = ax.table(
                 cellText=table_data,
@@ -65,8 +85,7 @@ class WeChatGroupSender:
             table.scale(1, 1.5)
             
             # 设置标题（包含发送日期）
-            current_date = datetime.now().strftime('%Y年%m月%d日')
-            plt.title(f'店铺监控数据表 - {current_date}', fontsize=16, fontweight='bold', pad=20)
+            plt.title(title, fontsize=16, fontweight='bold', pad=20)
             
             # 保存图片到内存
             img_buffer = io.BytesIO()
@@ -74,6 +93,7 @@ class WeChatGroupSender:
             img_buffer.seek(0)
             
             plt.close()
+            put_render(cache_key, img_buffer.getvalue())
             
             print("✅ 表格图片创建成功")
             return img_buffer
@@ -88,6 +108,10 @@ class WeChatGroupSender:
             print("❌ 未配置企业微信机器人webhook地址")
             return False
             
+        # 超过文本消息的字节上限时在条目边界处拆成多条，按顺序发送
+        if utf8_len(message) > TEXT_MAX_BYTES:
+            return send_in_parts(self.send_text_message, message)
+            
         try:
             data = {
                 "msgtype": "text",
@@ -96,7 +120,7 @@ class WeChatGroupSender:
                 }
             }
             
-            response = requests.post(self.webhook_url, json=data)
+            response = post_json(self.webhook_url, data)
             result = response.json()
             
             if result.get('errcode') == 0:
@@ -117,8 +141,9 @@ class WeChatGroupSender:
             return False
             
         try:
-            # 将图片转换为base64
-            image_base64 = base64.b64encode(image_buffer.getvalue()).decode('utf-8')
+            # 压到图片大小上限以内，再转换为base64
+            image_data, _ = encode_image(image_buffer.getvalue())
+            image_base64 = base64.b64encode(image_data).decode('utf-8')
             
             data = {
                 "msgtype": "image",
@@ -128,7 +153,7 @@ class WeChatGroupSender:
                 }
             }
             
-            response = requests.post(self.webhook_url, json=data)
+            response = post_json(self.webhook_url, data)
             result = response.json()
             
             if result.get('errcode') == 0:
@@ -145,8 +170,8 @@ class WeChatGroupSender:
     def send_comprehensive_message(self):
         """发送完整的监控报告到微信群"""
         try:
-            # 读取Excel文件获取统计信息
-            df = pd.read_excel('yxc.xlsx')
+            # 读取Excel文件获取统计信息（只需要剩余天数和备注列）
+            df = load_table('yxc.xlsx', SUMMARY_FIELDS)
             
             # 创建统计信息
             total_stores = len(df)
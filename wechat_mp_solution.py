@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
+from http_transport import post_json, request
 import json
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -30,7 +30,7 @@ class WeChatMPSender:
             
         try:
             url = f"https://api.weixin.qq.com/cgi-bin/token?grant_type=client_credential&appid={self.app_id}&secret={self.app_secret}"
-            response = requests.get(url)
+            response = request('GET', url)
             result = response.json()
             
             if 'access_token' in result:
@@ -58,7 +58,7 @@ class WeChatMPSender:
                 'media': ('image.png', image_buffer, 'image/png')
             }
             
-            response = requests.post(url, files=files)
+            response = request('POST', url, files=files, retries=0)
             result = response.json()
             
             if 'media_id' in result:
@@ -87,7 +87,7 @@ class WeChatMPSender:
                 "data": data
             }
             
-            response = requests.post(url, json=message_data)
+            response = post_json(url, message_data)
             result = response.json()
             
             if result.get('errcode') == 0:
@@ -1,131 +1,135 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
+from http_transport import post_json
 import json
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
 import io
 import base64
 import hashlib
-from datetime import datetime, timezone, timedelta
 import os
 from dotenv import load_dotenv
+from excel_loader import TABLE_FIELDS, load_table
+from run_watermark import get_beijing_time
+from excel_writer import save_changes
+from excel_schema import resolve_columns
+from date_parser import parse_date_column
+from expiry_engine import reset_expired
+from expiry_index import ExpiryIndex
+from render_cache import get_render, put_render, render_key
+from table_pages import render_pages
+from font_resolver import setup_matplotlib_font
+from raster_table import render_table, renderer_name, use_pillow
+from image_encoder import encode_image
+from message_chunker import TEXT_MAX_BYTES, send_in_parts, utf8_len
 
 # 加载环境变量
 load_dotenv()
 
-def get_beijing_time():
-    """获取北京时间"""
-    # 创建北京时区 (UTC+8)
-    beijing_tz = timezone(timedelta(hours=8))
-    
-    # 检查是否在GitHub Actions环境中
-    if os.getenv('GITHUB_ACTIONS') == 'true':
-        # GitHub Actions使用UTC时间，需要转换为北京时间
-        utc_now = datetime.now(timezone.utc)
-        beijing_time = utc_now.astimezone(beijing_tz)
-        print(f"🌍 GitHub Actions环境，UTC时间: {utc_now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-        print(f"🇨🇳 转换为北京时间: {beijing_time.strftime('%Y-%m-%d %H:%M:%S')} CST")
-    else:
-        # 本地环境，直接获取北京时间
-        beijing_time = datetime.now(beijing_tz)
-        print(f"🏠 本地环境，北京时间: {beijing_time.strftime('%Y-%m-%d %H:%M:%S')} CST")
-    
-    return beijing_time
+TABLE_HEADERS = ['行号', '店铺名称', '地址', '总天', '剩余', '开始时间', '备注1', '备注2', '备注3']
+
 
 class WeChatImageSender:
     def __init__(self):
         # 企业微信机器人webhook地址
         self.webhook_url = os.getenv('WECHAT_WEBHOOK_URL', '')
         
-    def create_table_image(self):
-        """创建表格图片"""
+    def setup_fonts(self):
+        """设置matplotlib中文字体，返回字体列表（字体路径解析一次后缓存，不重建字体缓存）"""
+        font_list = setup_matplotlib_font()
+        print(f"✅ 已设置字体: {font_list[0]}")
+        return font_list
+    
+    def table_rows(self, df, index=None):
+        """表格每行各单元格的文字（index为已建好的到期索引）"""
+        # 备注3按到期索引整列分组：<3 即将到期，<7 1周内到期，其余正常
+        if index is None:
+            index = ExpiryIndex(df['剩余'])
+        note3_labels = index.bucket_labels()
+        
+        # 准备表格数据
+        table_data = []
+        for position, (idx, row) in enumerate(df.iterrows()):
+            # 处理备注1和备注2的空值显示
+            note1 = row.get('备注1', '')
+            note2 = row.get('备注2', '')
+            if pd.isna(note1) or note1 == '':
+                note1 = ''
+            if pd.isna(note2) or note2 == '':
+                note2 = ''
+        
+            note3 = note3_labels[position]
+        
+            table_data.append([
+                str(row.get('行号', '')),
+                row.get(' 店铺名称', ''),
+                row.get('地址', ''),
+                str(row.get('总天', '')),
+                str(row.get('剩余', '')),
+                str(row.get('开始时间', '')),
+                str(note1),
+                str(note2),
+                str(note3)
+            ])
+        return table_data
+    
+    def create_table_pages(self, df=None, index=None):
+        """分页生成表格图片（每页重复表头，剩余0/1天的行高亮），返回按页序排列的PNG字节列表"""
         try:
-            # 读取Excel文件
-            df = pd.read_excel('yxc.xlsx')
+            if df is None:
+                df = load_table('yxc.xlsx', TABLE_FIELDS)
+            font_list = self.setup_fonts()
+            table_data = self.table_rows(df, index)
+            urgent_rows = [i for i, row in enumerate(table_data) if row[4] in ['0', '1']]
+            current_date = get_beijing_time().strftime('%Y年%m月%d日')
+            return render_pages(table_data, TABLE_HEADERS, f'店铺监控数据表 - {current_date}',
+                                highlight=urgent_rows, font_list=font_list)
+        except Exception as e:
+            print(f"❌ 分页创建表格图片失败: {e}")
+            return []
+    
+    def create_table_image(self, df=None, index=None):
+        """创建表格图片（df为None时读取Excel文件，index为已建好的到期索引）"""
+        try:
+            # 读取Excel文件（工作簿没有变化时命中表格缓存）
+            if df is None:
+                df = load_table('yxc.xlsx', TABLE_FIELDS)
             print(f"✅ 成功读取Excel文件，共 {len(df)} 行数据")
             
-            # 设置中文字体 - 支持本地和GitHub Actions环境
-            import platform
-            import os
-            
-            # 检查是否在GitHub Actions环境中
-            is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
-            system = platform.system()
-            
-            if is_github_actions or system == 'Linux':
-                # GitHub Actions或Linux环境 - 使用安装的中文字体
-                font_list = ['WenQuanYi Micro Hei', 'WenQuanYi Zen Hei', 'Noto Sans CJK SC', 'DejaVu Sans']
-                print("🔧 检测到GitHub Actions/Linux环境，使用中文字体")
-            elif system == 'Darwin':  # macOS
-                font_list = ['STHeiti', 'Hiragino Sans GB', 'PingFang SC', 'Arial Unicode MS']
-                print("🍎 检测到macOS环境，使用系统字体")
-            elif system == 'Windows':  # Windows
-                font_list = ['SimHei', 'Microsoft YaHei', 'KaiTi', 'FangSong']
-                print("🪟 检测到Windows环境，使用系统字体")
-            else:
-                font_list = ['DejaVu Sans']
-                print("⚠️ 未知环境，使用默认字体")
+            # Pillow渲染器不需要matplotlib，不导入pyplot
+            font_list = [] if use_pillow() else self.setup_fonts()
             
-            # 设置字体
-            plt.rcParams['font.sans-serif'] = font_list
-            plt.rcParams['axes.unicode_minus'] = False
+            table_data = self.table_rows(df, index)
+            
+            # 设置标题（包含发送日期）
+            current_date = get_beijing_time().strftime('%Y年%m月%d日')
+            title = f'店铺监控数据表 - {current_date}'
             
-            # 在GitHub Actions中重建字体缓存
-            if is_github_actions:
-                try:
-                    import matplotlib.font_manager as fm
-                    # 使用正确的方法重建字体缓存
-                    fm.fontManager.__init__()
-                    print("✅ 已重建字体缓存")
-                except Exception as e:
-                    print(f"⚠️ 字体缓存重建失败: {e}，但继续执行")
+            # 同样的数据、标题和字体已经画过时（例如同一次运行发给多个渠道）直接用缓存的图片
+            cache_key = render_key(table_data, title, ['wechat', font_list, renderer_name()], 150)
+            cached = get_render(cache_key)
+            if cached is not None:
+                return cached
             
-            print(f"✅ 已设置字体: {font_list[0]}")
+            # Pillow渲染器：直接画到画布上，不经过ax.table
+            if use_pillow():
+                urgent_rows = [i for i, row in enumerate(table_data) if row[4] in ['0', '1']]
+                img_buffer = render_table(table_data, TABLE_HEADERS, title, highlight=urgent_rows, font_size=8, dpi=150)
+                put_render(cache_key, img_buffer.getvalue())
+                print("✅ 表格图片创建成功（Pillow）")
+                return img_buffer
+            
+            import matplotlib.pyplot as plt
             
             # 创建图形 - 增加高度以适应更高的行高
             fig, ax = plt.subplots(figsize=(16, 15))
             ax.axis('tight')
             ax.axis('off')
             
-            # 准备表格数据
-            table_data = []
-            for idx, row in df.iterrows():
-                # 处理备注1和备注2的空值显示
-                note1 = row.get('备注1', '')
-                note2 = row.get('备注2', '')
-                if pd.isna(note1) or note1 == '':
-                    note1 = ''
-                if pd.isna(note2) or note2 == '':
-                    note2 = ''
-                
-                # 处理备注3的智能显示
-                remaining_days = int(row.get('剩余', 0))
-                if remaining_days < 3:
-                    note3 = '即将到期'
-                elif remaining_days < 7:
-                    note3 = '1周内到期'
-                else:
-                    note3 = '正常'
-                
-                table_data.append([
-                    str(row.get('行号', '')),
-                    row.get(' 店铺名称', ''),
-                    row.get('地址', ''),
-                    str(row.get('总天', '')),
-                    str(row.get('剩余', '')),
-                    str(row.get('开始时间', '')),
-                    str(note1),
-                    str(note2),
-                    str(note3)
-                ])
-            
             # 创建表格
             table = ax.table(
                 cellText=table_data,
-                colLabels=['行号', '店铺名称', '地址', '总天', '剩余', '开始时间', '备注1', '备注2', '备注3'],
+                colLabels=TABLE_HEADERS,
                 cellLoc='center',
                 loc='center',
                 bbox=[0, 0, 1, 1]
@@ -153,9 +157,7 @@ class WeChatImageSender:
                         table[(i, j)].set_facecolor('#ff9999')  # 更鲜艳的红色背景
                         table[(i, j)].set_text_props(weight='bold', color='#990000')  # 更深的红色粗体字体
             
-            # 设置标题（包含发送日期）
-            current_date = get_beijing_time().strftime('%Y年%m月%d日')
-            plt.title(f'店铺监控数据表 - {current_date}', fontsize=16, fontweight='bold', pad=20)
+            plt.title(title, fontsize=16, fontweight='bold', pad=20)
             
             # 保存图片到内存
             img_buffer = io.BytesIO()
@@ -164,6 +166,7 @@ class WeChatImageSender:
             img_buffer.seek(0)
             
             plt.close()
+            put_render(cache_key, img_buffer.getvalue())
             
             print("✅ 表格图片创建成功")
             return img_buffer
@@ -178,6 +181,10 @@ class WeChatImageSender:
             print("❌ 未配置企业微信机器人webhook地址")
             return False
             
+        # 超过文本消息的字节上限时在条目边界处拆成多条，按顺序发送
+        if utf8_len(message) > TEXT_MAX_BYTES:
+            return send_in_parts(self.send_text_message, message)
+            
         try:
             data = {
                 "msgtype": "text",
@@ -186,7 +193,7 @@ class WeChatImageSender:
                 }
             }
             
-            response = requests.post(self.webhook_url, json=data)
+            response = post_json(self.webhook_url, data)
             result = response.json()
             
             if result.get('errcode') == 0:
@@ -207,8 +214,8 @@ class WeChatImageSender:
             return False
             
         try:
-            # 将图片转换为base64
-            image_data = image_buffer.getvalue()
+            # 压到图片大小上限以内，再转换为base64
+            image_data, _ = encode_image(image_buffer.getvalue())
             image_base64 = base64.b64encode(image_data).decode('utf-8')
             
             # 计算MD5
@@ -224,7 +231,7 @@ class WeChatImageSender:
             
             print(f"📊 图片信息: 大小={len(image_data)}字节, MD5={md5_hash[:8]}...")
             
-            response = requests.post(self.webhook_url, json=data)
+            response = post_json(self.webhook_url, data)
             result = response.json()
             
             if result.get('errcode') == 0:
@@ -240,126 +247,43 @@ class WeChatImageSender:
     
     def calculate_remaining_days(self, df, columns):
         """基于实际日期计算剩余天数"""
-        updated_count = 0
         current_date = get_beijing_time()
+        today = pd.Timestamp(current_date.strftime('%Y-%m-%d'))
         
-        for idx, row in df.iterrows():
-            start_date_str = str(row[columns['start_date']])
-            total_days = int(row[columns['total']])
-            old_remaining = int(row[columns['remaining']])
-            
-            try:
-                # 解析开始时间
-                start_date = datetime.strptime(start_date_str, '%Y%m%d')
-                
-                # 确保两个datetime对象都是naive或都是aware
-                if current_date.tzinfo is not None:
-                    # 如果current_date有时区信息，将start_date也转换为相同时区
-                    start_date = start_date.replace(tzinfo=current_date.tzinfo)
-                elif start_date.tzinfo is not None:
-                    # 如果start_date有时区信息，将current_date也转换为相同时区
-                    current_date = current_date.replace(tzinfo=start_date.tzinfo)
-                
-                # 计算已过去的天数
-                days_passed = (current_date - start_date).days
-                
-                # 计算正确的剩余天数
-                correct_remaining = max(0, total_days - days_passed)
-                
-                # 更新剩余天数
-                df.at[idx, columns['remaining']] = correct_remaining
-                
-                row_num = row.get('行号', idx+1)
-                store_name = row.get(' 店铺名称', f'行{row_num}')
-                print(f"📊 {store_name}: 开始{start_date_str}, 总{total_days}天, 已过{days_passed}天, {old_remaining}→{correct_remaining}")
-                
-                if old_remaining != correct_remaining:
-                    updated_count += 1
-                    
-            except Exception as e:
-                print(f"❌ 处理行{idx+1}失败: {e}")
+        # 整列解析开始时间，无法解析的行会汇总提示并保持原值
+        start_dates, bad_rows = parse_date_column(df[columns['start_date']])
+        total_days = pd.to_numeric(df[columns['total']], errors='coerce')
+        old_remaining = pd.to_numeric(df[columns['remaining']], errors='coerce')
+        
+        # 计算已过去的天数和正确的剩余天数
+        days_passed = (today - start_dates).dt.days
+        correct_remaining = (total_days - days_passed).clip(lower=0)
+        valid = correct_remaining.notna()
         
+        changed = valid & (correct_remaining != old_remaining)
+        updated_count = int(changed.sum())
+        if valid.any():
+            df.loc[valid, columns['remaining']] = correct_remaining[valid].astype('int64')
+        
+        print(f"📊 已按开始时间计算 {int(valid.sum())} 个项目的剩余天数，{len(bad_rows)} 行无法解析")
         return updated_count
     
     def reset_expired_items(self, df, columns):
-        """重置剩余天数为0的项目"""
-        reset_count = 0
-        current_date = get_beijing_time()
-        
-        for idx, row in df.iterrows():
-            remaining = row[columns['remaining']]
-            total = row[columns['total']]
-            start_date = row[columns['start_date']]
-            
-            # 如果剩余天数为0，需要重置
-            if pd.notna(remaining) and int(remaining) == 0:
-                row_num = row.get('行号', idx+1)
-                store_name = row.get(' 店铺名称', f'行{row_num}')
-                print(f"🔄 重置项目: {store_name}")
-                
-                # 更新开始时间为今天
-                new_start_date = current_date.strftime('%Y%m%d')
-                print(f"   开始时间: {start_date} → {new_start_date}")
-                print(f"   剩余天数: 0 → {total}")
-                
-                # 确保日期格式正确，保持与原始数据类型一致
-                if pd.api.types.is_integer_dtype(df[columns['start_date']]):
-                    df.at[idx, columns['start_date']] = int(new_start_date)
-                else:
-                    df.at[idx, columns['start_date']] = str(new_start_date)
-                
-                # 重置剩余天数为总天数
-                df.at[idx, columns['remaining']] = total
-                
-                reset_count += 1
-        
-        return reset_count
+        """重置剩余天数为0的项目（见 expiry_engine.reset_expired），返回重置的项目数"""
+        return len(reset_expired(df, columns, get_beijing_time()))
 
     def find_columns(self, df):
         """查找关键列"""
-        columns = {}
-        
-        # 查找剩余天数列
-        possible_remaining = ['剩余天数', '剩余时间', '到期天数', '过期天数', '天数', 'days', 'remaining_days', '剩余', '到期', '过期']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_remaining:
-                if name in col_str:
-                    columns['remaining'] = col
-                    break
-            if 'remaining' in columns:
-                break
-        
-        # 查找总天数列
-        possible_total = ['总天数', '总时间', '总天', 'total_days', 'total', '天']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_total:
-                if name in col_str:
-                    columns['total'] = col
-                    break
-            if 'total' in columns:
-                break
-        
-        # 查找开始时间列
-        possible_start = ['开始时间', '开始日期', 'start_date', 'start_time', '开始']
-        for col in df.columns:
-            col_str = str(col).lower()
-            for name in possible_start:
-                if name in col_str:
-                    columns['start_date'] = col
-                    break
-            if 'start_date' in columns:
-                break
-        
+        columns = resolve_columns(df.columns)
         print(f"🎯 找到的列: {columns}")
         return columns
-
+    
     def send_comprehensive_report(self):
         """发送完整的监控报告"""
         try:
             # 读取Excel文件
-            df = pd.read_excel('yxc.xlsx')
+            df = load_table('yxc.xlsx')
+            original_df = df.copy()
             
             # 查找关键列
             columns = self.find_columns(df)
@@ -375,7 +299,7 @@ class WeChatImageSender:
             print(f"✅ 重置了 {reset_count} 个过期项目")
             
             # 保存更新后的Excel文件
-            df.to_excel('yxc.xlsx', index=False)
+            save_changes('yxc.xlsx', original_df, df)
             print("💾 已保存更新后的Excel文件")
             
             # 创建统计信息
@@ -386,16 +310,9 @@ class WeChatImageSender:
             note1_stats = df['备注1'].dropna().value_counts().to_dict()
             note2_stats = df['备注2'].dropna().value_counts().to_dict()
             
-            # 计算备注3的统计（基于剩余天数）
-            note3_stats = {'即将到期': 0, '1周内到期': 0, '正常': 0}
-            for idx, row in df.iterrows():
-                remaining_days = int(row.get('剩余', 0))
-                if remaining_days < 3:
-                    note3_stats['即将到期'] += 1
-                elif remaining_days < 7:
-                    note3_stats['1周内到期'] += 1
-                else:
-                    note3_stats['正常'] += 1
+            # 计算备注3的统计（基于剩余天数），图片复用同一份到期索引
+            index = ExpiryIndex.from_frame(df, columns)
+            note3_stats = index.bucket_counts()
             
             current_date = get_beijing_time().strftime('%Y年%m月%d日 %H:%M')
             
@@ -419,7 +336,7 @@ class WeChatImageSender:
             
             # 创建并发送图片
             print("🖼️  创建表格图片...")
-            image_buffer = self.create_table_image()
+            image_buffer = self.create_table_image(df, index)
             if image_buffer:
                 print("📤 发送表格图片...")
                 image_success = self.send_image_message(image_buffer)